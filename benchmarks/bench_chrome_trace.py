@@ -0,0 +1,65 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Chrome trace export of Iso14443ASession.send_apdu with the HydraNFC v2 driver (serial
+stand-in): time per APDU and peak memory (traced in a second run), for a growing number of APDUs, exporting
+everything or only the slow transactions.
+
+    $ python -m benchmarks.bench_chrome_trace
+"""
+
+import logging
+import os
+import time
+import tracemalloc
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.tools.chrome_trace import ChromeTraceWriter
+from pynfcreader.tools.tracing import Tracer
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def bench(nb_apdus: int, min_duration: int, trace_memory: bool) -> float:
+    with open(os.devnull, "w") as out, ChromeTraceWriter(out, min_duration=min_duration) as writer:
+        drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(iso14443a_card)))
+        logging.getLogger().setLevel(logging.WARNING)
+        hn = Iso14443ASession(drv=drv, block_size=120, tracer=Tracer(), latency=writer.recorder())
+        hn.connect()
+        hn.field_on()
+        hn.polling()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(nb_apdus):
+            with hn.transaction("transaction"):
+                hn.send_apdu(APDU)
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+    return (time.perf_counter() - start) / nb_apdus
+
+
+if __name__ == "__main__":
+    for min_duration in (0, 10 ** 6):
+        for nb_apdus in (1000, 10000):
+            elapsed = bench(nb_apdus, min_duration, trace_memory=False)
+            peak = bench(nb_apdus, min_duration, trace_memory=True)
+            print(f"min duration {min_duration / 1000:6.0f} us, {nb_apdus:5} APDUs: "
+                  f"{elapsed * 1e6:6.1f} us/APDU, peak {peak / 1024:6.1f} KiB")
@@ -0,0 +1,56 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+CRC_A of a frame: CRC function built at each call versus the one of pynfcreader.tools.crc.
+
+    $ python -m benchmarks.bench_crc
+"""
+
+import time
+
+import crcmod
+
+from pynfcreader.tools.crc import CRC_A
+
+NB_FRAMES = 2000
+FRAME = bytes.fromhex("0200a404000e325041592e5359532e444446303100")
+
+
+def bench_rebuilt() -> float:
+    start = time.perf_counter_ns()
+    for _ in range(NB_FRAMES):
+        crc16 = crcmod.mkCrcFun(0x11021, initCrc=0x6363, xorOut=0x0000, rev=True)
+        crc16(FRAME).to_bytes(2, "little")
+    return (time.perf_counter_ns() - start) / NB_FRAMES
+
+
+def bench_precomputed() -> float:
+    start = time.perf_counter_ns()
+    for _ in range(NB_FRAMES):
+        CRC_A.get(FRAME)
+    return (time.perf_counter_ns() - start) / NB_FRAMES
+
+
+def bench_check_many() -> float:
+    frames = [CRC_A.append(FRAME)] * NB_FRAMES
+    start = time.perf_counter_ns()
+    CRC_A.check_many(frames)
+    return (time.perf_counter_ns() - start) / NB_FRAMES
+
+
+if __name__ == "__main__":
+    print(f"mkCrcFun per frame : {bench_rebuilt():8.0f} ns/frame")
+    print(f"CRC_A.get          : {bench_precomputed():8.0f} ns/frame")
+    print(f"CRC_A.check_many   : {bench_check_many():8.0f} ns/frame")
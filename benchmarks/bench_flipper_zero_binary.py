@@ -0,0 +1,49 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Frame throughput of the Flipper Zero text CLI and binary framing over a local pty.
+
+    $ python -m benchmarks.bench_flipper_zero_binary
+"""
+
+import time
+
+from pynfcreader.devices.flipper_zero import FlipperZero
+from tests.flipper_zero_stand_in import PtyFlipperZero
+
+NB_FRAMES = 2000
+FRAME = bytes(range(64))
+
+
+def bench(binary: bool) -> float:
+    stand_in = PtyFlipperZero(card=lambda data: data)
+    drv = FlipperZero(stand_in.port, debug=False, binary=binary)
+    stand_in.start()
+    drv.connect()
+    assert drv.binary == binary
+
+    start = time.perf_counter()
+    for _ in range(NB_FRAMES):
+        assert drv.write(FRAME) == FRAME
+    elapsed = time.perf_counter() - start
+
+    drv.close()
+    stand_in.close()
+    return NB_FRAMES / elapsed
+
+
+if __name__ == "__main__":
+    print(f"text CLI : {bench(False):8.0f} frames/s")
+    print(f"binary   : {bench(True):8.0f} frames/s")
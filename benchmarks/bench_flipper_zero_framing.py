@@ -0,0 +1,60 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-command latency of the Flipper Zero driver against a scripted serial port.
+
+"before": responses are terminated by the 0.1 s serial timeout (former read_all).
+"after": responses are delimited by the CLI prompt.
+
+    $ python -m benchmarks.bench_flipper_zero_framing
+"""
+
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+
+
+class TimeoutFramedFlipperZero(FlipperZero):
+
+    def connect(self):
+        FlipperZero.connect(self)
+        self.cnx.set_timeout(0.1)
+
+    def read_all(self):
+        r = ""
+        d = self.cnx.readline().decode()
+        while d != "":
+            r += d
+            d = self.cnx.readline().decode()
+        return r
+
+
+def bench(drv_class, nb_cmd: int) -> float:
+    cnx = SerialCnx("stand-in", baudrate=115200 * 8, cnx=ScriptedFlipperZero(latency=0.001))
+    drv = drv_class(debug=False, cnx=cnx)
+    drv.connect()
+    start = time.perf_counter()
+    for _ in range(nb_cmd):
+        assert drv.write(bytes.fromhex("00A4040000")) == bytes.fromhex("9000")
+    return (time.perf_counter() - start) / nb_cmd
+
+
+if __name__ == "__main__":
+    before = bench(TimeoutFramedFlipperZero, 10)
+    after = bench(FlipperZero, 500)
+    print(f"before (timeout framing) : {before * 1000:8.3f} ms/command")
+    print(f"after  (prompt framing)  : {after * 1000:8.3f} ms/command")
@@ -0,0 +1,57 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-frame cost of one write() per frame versus a pipelined batch of frames.
+
+    $ python -m benchmarks.bench_flipper_zero_pipeline
+"""
+
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+
+NB_FRAMES = 200
+
+
+def get_flipper_zero() -> FlipperZero:
+    cnx = SerialCnx("stand-in", baudrate=115200 * 8, cnx=ScriptedFlipperZero(latency=0.001))
+    drv = FlipperZero(debug=False, cnx=cnx)
+    drv.connect()
+    return drv
+
+
+def bench_per_call() -> float:
+    drv = get_flipper_zero()
+    start = time.perf_counter()
+    for hit in range(NB_FRAMES):
+        drv.write(bytes([0x02, 0x20, hit]))
+    return (time.perf_counter() - start) / NB_FRAMES
+
+
+def bench_pipeline() -> float:
+    drv = get_flipper_zero()
+    start = time.perf_counter()
+    with drv.pipeline() as pipe:
+        for hit in range(NB_FRAMES):
+            pipe.send(bytes([0x02, 0x20, hit]))
+    assert len(pipe.results) == NB_FRAMES
+    return (time.perf_counter() - start) / NB_FRAMES
+
+
+if __name__ == "__main__":
+    print(f"per call : {bench_per_call() * 1e6:8.1f} us/frame")
+    print(f"pipeline : {bench_pipeline() * 1e6:8.1f} us/frame")
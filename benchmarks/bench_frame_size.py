@@ -0,0 +1,60 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+250 bytes APDU exchange time with HydraNFC v2, 16 bytes frames versus the frame
+sizes negotiated in the RATS / ATS (FSD 128 bytes, FSC 256 bytes).
+
+The stand-in answers each write after a 1 ms USB round trip.
+
+    $ python -m benchmarks.bench_frame_size
+"""
+
+import logging
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2
+
+NB_APDUS = 50
+APDU = bytes(range(250)).hex()
+
+
+def bench(negotiated: bool) -> tuple:
+    card = PiccSimulator(apdu_handler=lambda apdu: apdu + bytes.fromhex("9000"))
+    card.field_on()
+    card.write_bits(b"\x26", 7)
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(card=card.write,
+                                                                                           latency=0.001)))
+    drv.enter_bbio()
+    if not negotiated:
+        drv.max_frame_size = 16
+    hn = Iso14443ASession(drv=drv, block_size=None if negotiated else 16)
+    hn.polling()
+    card.nb_tpdus = 0
+    start = time.perf_counter()
+    for _ in range(NB_APDUS):
+        hn.send_apdu(APDU)
+    return (time.perf_counter() - start) / NB_APDUS, card.nb_tpdus / NB_APDUS
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    for negotiated in (False, True):
+        duration, nb_tpdus = bench(negotiated)
+        label = "negotiated" if negotiated else "16 bytes"
+        print(f"{label:10} : {duration * 1000:6.2f} ms, {nb_tpdus:4.0f} TPDUs / APDU")
@@ -0,0 +1,63 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Hexdump of a short APDU, a long R-APDU and an ISO 15693 memory dump: per byte
+formatting (previous implementation) versus pynfcreader.tools.utils.
+
+    $ python -m benchmarks.bench_hexdump
+"""
+
+import io
+import re
+import time
+
+from pynfcreader.tools import utils
+
+NB_ROUNDS = 200
+DATA = {"APDU (13 bytes)": bytes.fromhex("00A4040007A000000004101000"),
+        "R-APDU (256 bytes)": bytes(range(256)),
+        "memory dump (8 KiB)": bytes(range(256)) * 32}
+
+
+def per_byte_pretty_print_block(msg):
+    def ascii_printable(data):
+        return re.sub(r'[^\x20-\x7E]', '.', data.decode(encoding='ascii', errors='replace'))
+
+    lst = []
+    for hit in range(0, len(msg), 16):
+        block1 = msg[hit:hit + 8]
+        hex1 = " ".join(f"{c:02X}" for c in block1)
+        block2 = msg[hit + 8:hit + 16]
+        hex2 = " ".join(f"{c:02X}" for c in block2)
+        lpart = f"{hex1}   {hex2}"
+        lst.append(f'{lpart}{" " * (49 - len(lpart))}      {ascii_printable(block1)}   {ascii_printable(block2)}')
+    return lst
+
+
+def bench(function, data) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(NB_ROUNDS):
+        function(data)
+    return (time.perf_counter_ns() - start) / NB_ROUNDS / 1000
+
+
+if __name__ == "__main__":
+    for name, data in DATA.items():
+        assert per_byte_pretty_print_block(data) == utils.get_pretty_print_block(data)
+        print(name)
+        print(f"\tper byte                 : {bench(per_byte_pretty_print_block, data):8.1f} us")
+        print(f"\tget_pretty_print_block   : {bench(utils.get_pretty_print_block, data):8.1f} us")
+        print(f"\twrite_pretty_print_block : "
+              f"{bench(lambda msg: utils.write_pretty_print_block(io.StringIO(), msg), data):8.1f} us")
@@ -0,0 +1,51 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ISO 14443 A activation time with HydraNFC v2, polling() versus polling_burst().
+
+The stand-in answers each write after a 1 ms USB round trip.
+
+    $ python -m benchmarks.bench_hydra_nfc_v2_burst
+"""
+
+import logging
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+NB_POLLING = 200
+
+
+def bench(burst: bool) -> float:
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(card=iso14443a_card,
+                                                                                           latency=0.001)))
+    drv.enter_bbio()
+    hn = Iso14443ASession(drv=drv)
+    start = time.perf_counter()
+    for _ in range(NB_POLLING):
+        if burst:
+            hn.polling_burst()
+        else:
+            hn.polling()
+    return (time.perf_counter() - start) / NB_POLLING
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    print(f"polling()       : {bench(False) * 1000:6.2f} ms")
+    print(f"polling_burst() : {bench(True) * 1000:6.2f} ms")
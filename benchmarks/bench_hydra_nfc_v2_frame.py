@@ -0,0 +1,54 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Transceive latency of the HydraNFC v2 driver, one write per field versus one write per frame.
+
+Each serial write costs 0.5 ms in the stand-in, as a USB CDC transfer would.
+
+    $ python -m benchmarks.bench_hydra_nfc_v2_frame
+"""
+
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2
+
+NB_FRAMES = 500
+
+
+class FieldPerWriteHydraNFCv2(HydraNFCv2):
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        self._hydranfc.write(b"\x05")
+        self._hydranfc.write(int(transmitter_add_crc).to_bytes(1, byteorder="big"))
+        self._hydranfc.write(len(data).to_bytes(1, byteorder="big"))
+        self._hydranfc.write(data)
+        rx_len = int.from_bytes(self._hydranfc.read(1), byteorder="little")
+        return self._hydranfc.read(rx_len)
+
+
+def bench(drv_class) -> float:
+    drv = drv_class(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(write_cost=0.0005)))
+    drv.enter_bbio()
+    start = time.perf_counter()
+    for _ in range(NB_FRAMES):
+        drv.write(bytes.fromhex("9320"), transmitter_add_crc=False)
+    return (time.perf_counter() - start) / NB_FRAMES
+
+
+if __name__ == "__main__":
+    print(f"one write per field : {bench(FieldPerWriteHydraNFCv2) * 1e6:8.1f} us/frame")
+    print(f"one write per frame : {bench(HydraNFCv2) * 1e6:8.1f} us/frame")
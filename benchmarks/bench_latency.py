@@ -0,0 +1,54 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cost of the latency spans on Iso14443ASession.send_apdu with the HydraNFC v2 driver
+(serial stand-in without transfer cost), without and with a LatencyRecorder, then
+the recorded spans.
+
+    $ python -m benchmarks.bench_latency
+"""
+
+import logging
+import time
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.tools.latency import LatencyRecorder
+from pynfcreader.tools.tracing import Tracer
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+NB_APDUS = 2000
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def bench(latency: LatencyRecorder) -> float:
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(iso14443a_card)))
+    logging.getLogger().setLevel(logging.WARNING)
+    hn = Iso14443ASession(drv=drv, block_size=120, tracer=Tracer(), latency=latency)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    start = time.perf_counter()
+    for _ in range(NB_APDUS):
+        hn.send_apdu(APDU)
+    return (time.perf_counter() - start) / NB_APDUS
+
+
+if __name__ == "__main__":
+    latency = LatencyRecorder()
+    print(f"without recorder : {bench(None) * 1e6:6.1f} us/APDU")
+    print(f"with recorder    : {bench(latency) * 1e6:6.1f} us/APDU")
+    print(latency.summary())
@@ -0,0 +1,53 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Host-side cost of Iso14443ASession.send_apdu against the PICC simulator, without
+any reader: TPDU building and parsing, chaining, and the session logs.
+
+    $ python -m benchmarks.bench_picc_simulator
+"""
+
+import logging
+import os
+import time
+
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+
+NB_APDUS = 2000
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def bench(debug: bool, block_size: int) -> float:
+    card = PiccSimulator(apdu_handler=lambda apdu: apdu + bytes.fromhex("9000"))
+    hn = Iso14443ASession(drv=card, block_size=block_size)
+    # Format the logs without printing them
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+    logging.disable(logging.NOTSET if debug else logging.CRITICAL)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    nb_tpdus = card.nb_tpdus
+    start = time.perf_counter()
+    for _ in range(NB_APDUS):
+        hn.send_apdu(APDU)
+    return (time.perf_counter() - start) / (card.nb_tpdus - nb_tpdus)
+
+
+if __name__ == "__main__":
+    for block_size in (120, 4):
+        for debug in (False, True):
+            elapsed = bench(debug, block_size)
+            print(f"block size {block_size:3}, logs {'on ' if debug else 'off'}: {elapsed * 1e6:6.1f} us/TPDU")
@@ -0,0 +1,50 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ReaderPool throughput against the number of scripted Flipper Zero readers.
+
+    $ python -m benchmarks.bench_reader_pool
+"""
+
+import logging
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.pool import ReaderPool
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+from tests.hydra_nfc_v2_stand_in import iso14443a_card
+
+
+def stand_in_flipper_zero(port, **kwargs):
+    cnx = SerialCnx(port, 115200, cnx=ScriptedFlipperZero(latency=0.002, card=iso14443a_card))
+    return FlipperZero(port, cnx=cnx, **kwargs)
+
+
+def read_card(session):
+    session.polling()
+    return session.send_apdu("00 B0 00 00 02")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    for nb_readers in (1, 2, 4, 8):
+        for use_processes in (False, True):
+            pool = ReaderPool(stand_in_flipper_zero, Iso14443ASession, ports=[f"stand-in-{hit}" for hit in range(nb_readers)],
+                              drv_kwargs={"debug": False}, use_processes=use_processes)
+            pool.open()
+            pool.run([read_card] * 50 * nb_readers)
+            pool.close()
+            print(f"{nb_readers} readers, {'processes' if use_processes else 'threads  '}: {pool.throughput:7.1f} jobs/s")
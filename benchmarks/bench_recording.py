@@ -0,0 +1,62 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cost of recording an exchange on the I/O path: synchronous CSV row versus background Recorder.
+
+Events are interleaved with a short sleep standing for the serial I/O wait,
+and only the time spent in the recording call is measured.
+
+    $ python -m benchmarks.bench_recording
+"""
+
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+from pynfcreader.devices.recording import Recorder
+
+NB_EVENTS = 20000
+IO_WAIT = 0.00005
+DATA = b"nfc send 1 00a404000e325041592e5359532e444446303100\r\n"
+
+
+def bench_sync(path: Path) -> float:
+    writer = csv.writer(path.open(mode="w", newline="", encoding="utf-8"))
+    elapsed = 0
+    for _ in range(NB_EVENTS):
+        start = time.perf_counter_ns()
+        writer.writerow(["W", DATA.decode()])
+        elapsed += time.perf_counter_ns() - start
+        time.sleep(IO_WAIT)
+    return elapsed / NB_EVENTS
+
+
+def bench_recorder(path: Path) -> float:
+    recorder = Recorder(str(path))
+    elapsed = 0
+    for _ in range(NB_EVENTS):
+        start = time.perf_counter_ns()
+        recorder.record("W", DATA)
+        elapsed += time.perf_counter_ns() - start
+        time.sleep(IO_WAIT)
+    recorder.close()
+    return elapsed / NB_EVENTS
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"synchronous csv : {bench_sync(Path(tmp) / 'sync.csv'):6.0f} ns/event")
+        print(f"Recorder        : {bench_recorder(Path(tmp) / 'recorder.csv'):6.0f} ns/event")
@@ -0,0 +1,77 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+End-to-end ISO 14443 A transaction time replayed from a capture, with the
+recorded reader latencies, for several replay speeds and with or without the
+session debug logs.
+
+The capture is made on the Flipper Zero stand-in (2 ms per exchange).
+
+    $ python -m benchmarks.bench_timed_replay
+"""
+
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pynfcreader.devices.connection import SerialCnx, SerialCnxReplay
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+from tests.hydra_nfc_v2_stand_in import iso14443a_card
+
+NB_APDUS = 20
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def run_session(drv) -> float:
+    hn = Iso14443ASession(drv=drv, block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    start = time.perf_counter()
+    for _ in range(NB_APDUS):
+        hn.send_apdu(APDU)
+    return (time.perf_counter() - start) / NB_APDUS
+
+
+def record(path: Path):
+    stand_in = ScriptedFlipperZero(latency=0.002, card=iso14443a_card)
+    drv = FlipperZero(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=stand_in, recording=str(path)))
+    logging.disable(logging.CRITICAL)
+    run_session(drv)
+    drv.close()
+
+
+def bench(path: Path, speed: float, debug: bool) -> float:
+    drv = FlipperZero("replay", debug=debug, cnx=SerialCnxReplay(path, speed=speed))
+    # Format the debug logs without printing them
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+    logging.disable(logging.NOTSET if debug else logging.CRITICAL)
+    elapsed = run_session(drv)
+    drv.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "capture.trace"
+        record(path)
+        for speed in (1, 10, 0):
+            for debug in (False, True):
+                elapsed = bench(path, speed, debug)
+                print(f"speed {speed:2}, debug logs {'on ' if debug else 'off'}: {elapsed * 1000:7.3f} ms/APDU")
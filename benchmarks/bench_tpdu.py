@@ -0,0 +1,48 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Decoding of the TPDUs received by an emulation dispatcher (examples/emu_flipper_zero_*).
+
+    $ python -m benchmarks.bench_tpdu
+"""
+
+import time
+
+from pynfcreader.sessions.iso14443.tpdu import Tpdu
+
+NB_LOOPS = 100000
+FRAMES = [bytes.fromhex(hit) for hit in ("1200a404000e325041592e5359532e4444463031cafe",
+                                         "0300cafe",
+                                         "a3cafe",
+                                         "f201cafe")]
+
+
+def dispatch(frame: bytes) -> bytes:
+    tpdu = Tpdu(frame)
+    if tpdu.r:
+        return b""
+    if tpdu.s:
+        return tpdu.get_wtx_reply() if tpdu.is_wtx() else b""
+    if tpdu.i:
+        return tpdu.inf if tpdu.is_chaining() else b""
+    return b""
+
+
+if __name__ == "__main__":
+    start = time.perf_counter_ns()
+    for _ in range(NB_LOOPS):
+        for frame in FRAMES:
+            dispatch(frame)
+    print(f"dispatch: {(time.perf_counter_ns() - start) / NB_LOOPS / len(FRAMES):6.0f} ns/TPDU")
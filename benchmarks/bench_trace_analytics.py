@@ -0,0 +1,64 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Statistics of a HydraNFC v2 capture made of many sessions: one process versus the process pool.
+
+    $ python -m benchmarks.bench_trace_analytics
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pynfcreader.devices import trace
+from pynfcreader.tools.crc import CRC_A
+from pynfcreader.tools.trace_analytics import analyse, summary
+
+NB_SESSIONS = 1000
+NB_APDUS = 50
+CAPDU = bytes.fromhex("00a404000e325041592e5359532e444446303100")
+
+
+def make_capture(path: Path):
+    timestamp = 0
+    with trace.TraceWriter(path, trace.DEVICE_HYDRA_NFC_V2) as writer:
+        def exchange(command: bytes, resp: bytes, latency: int):
+            nonlocal timestamp
+            writer.write("W", command, binary=True, timestamp=timestamp)
+            timestamp += latency
+            writer.write("R", bytes([len(resp)]) + resp, binary=True, timestamp=timestamp)
+            timestamp += 20000
+
+        for _ in range(NB_SESSIONS):
+            writer.write("W", b"\x03\x06", binary=True, timestamp=timestamp)
+            exchange(b"\x08", b"\x44\x00", 100000)
+            exchange(b"\x05\x01\x02\xE0\x80", CRC_A.append(bytes.fromhex("0578807002")), 800000)
+            for hit in range(NB_APDUS):
+                pcb = 0x02 | (hit & 1)
+                exchange(bytes([0x05, 0x01, 1 + len(CAPDU), pcb]) + CAPDU,
+                         CRC_A.append(bytes([pcb]) + hit.to_bytes(4, "big") + b"\x90\x00"), 2000000 + hit * 1000)
+            writer.write("W", b"\x02", binary=True, timestamp=timestamp)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "capture.trace"
+        make_capture(path)
+        for processes in (1, max(os.cpu_count() or 1, 4)):
+            start = time.perf_counter()
+            stats = analyse(path, processes=processes)
+            print(f"{processes:3d} process(es): {time.perf_counter() - start:6.2f} s")
+        print(summary(stats))
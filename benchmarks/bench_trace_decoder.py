@@ -0,0 +1,62 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Decoding of the APDUs of HydraNFC v2 captures of increasing size: throughput and peak memory.
+
+    $ python -m benchmarks.bench_trace_decoder
+"""
+
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from pynfcreader.devices import trace
+from pynfcreader.tools.crc import CRC_A
+from pynfcreader.tools.trace_decoder import read_apdus
+
+CAPDU = bytes.fromhex("00a404000e325041592e5359532e444446303100")
+
+
+def make_capture(path: Path, nb_apdus: int):
+    with trace.TraceWriter(path, trace.DEVICE_HYDRA_NFC_V2) as writer:
+        writer.write("W", b"\x03\x06\x08", binary=True)
+        writer.write("R", b"\x02\x44\x00", binary=True)
+        writer.write("W", b"\x05\x01\x02\xE0\x80", binary=True)
+        writer.write("R", b"\x07" + CRC_A.append(bytes.fromhex("0578807002")), binary=True)
+        for hit in range(nb_apdus):
+            pcb = 0x02 | (hit & 1)
+            writer.write("W", bytes([0x05, 0x01, 1 + len(CAPDU), pcb]) + CAPDU, binary=True)
+            resp = CRC_A.append(bytes([pcb]) + hit.to_bytes(4, "big") + b"\x90\x00")
+            writer.write("R", bytes([len(resp)]) + resp, binary=True)
+
+
+def bench(path: Path) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    nb_apdus = sum(1 for _ in read_apdus(path))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return nb_apdus, elapsed, peak
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        for nb_apdus in (10000, 100000):
+            path = Path(tmp) / f"capture_{nb_apdus}.trace"
+            make_capture(path, nb_apdus)
+            nb, elapsed, peak = bench(path)
+            print(f"{nb:7d} APDUs: {elapsed / nb * 1e6:6.2f} us/APDU, peak memory {peak / 1024:6.1f} KiB")
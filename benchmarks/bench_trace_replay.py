@@ -0,0 +1,75 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replaying the end of a large capture: CSV walk (SerialCnxVirtual) versus
+memory-mapped trace with its side index (SerialCnxReplay).
+
+Each test case opens the capture and replays its last exchanges.
+
+    $ python -m benchmarks.bench_trace_replay
+"""
+
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+from pynfcreader.devices import trace
+from pynfcreader.devices.connection import SerialCnxReplay, SerialCnxVirtual
+
+NB_EXCHANGES = 200000
+NB_CASES = 5
+DATA = bytes.fromhex("00a404000e325041592e5359532e444446303100")
+
+
+def make_captures(tmp: Path):
+    with (tmp / "capture.csv").open(mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Type", "Data"])
+        for hit in range(NB_EXCHANGES):
+            writer.writerow(["W", DATA.hex()])
+            writer.writerow(["R", f"{hit:08x}9000"])
+    trace.csv_to_trace(tmp / "capture.csv", tmp / "capture.trace", binary=True)
+
+
+def bench_csv(tmp: Path) -> float:
+    start = time.perf_counter()
+    for _ in range(NB_CASES):
+        cnx = SerialCnxVirtual(str(tmp / "capture.csv"))
+        cnx.set_binary(True)
+        for _ in range(NB_EXCHANGES - 1):
+            cnx.write(DATA)
+            cnx.read(6)
+        cnx.write(DATA)
+        assert cnx.read(6) == bytes.fromhex(f"{NB_EXCHANGES - 1:08x}9000")
+    return (time.perf_counter() - start) / NB_CASES
+
+
+def bench_mapped(tmp: Path) -> float:
+    start = time.perf_counter()
+    for _ in range(NB_CASES):
+        cnx = SerialCnxReplay(tmp / "capture.trace")
+        cnx.seek(2 * (NB_EXCHANGES - 1))
+        cnx.write(DATA)
+        assert cnx.read(6) == bytes.fromhex(f"{NB_EXCHANGES - 1:08x}9000")
+        cnx.close()
+    return (time.perf_counter() - start) / NB_CASES
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        make_captures(Path(tmp))
+        print(f"csv walk        : {bench_csv(Path(tmp)) * 1000:8.2f} ms/case")
+        print(f"mapped + index  : {bench_mapped(Path(tmp)) * 1000:8.2f} ms/case")
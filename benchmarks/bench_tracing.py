@@ -0,0 +1,54 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cost of the session tracing on Iso14443ASession.send_apdu, against the PICC simulator:
+without any sink, with the default LoggingSink and the logger at WARNING, and with
+the logs formatted (INFO) into a null handler.
+
+    $ python -m benchmarks.bench_tracing
+"""
+
+import logging
+import time
+
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.tools.tracing import LoggingSink, Tracer
+
+NB_APDUS = 5000
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def bench(tracer: Tracer, level: int) -> float:
+    card = PiccSimulator(apdu_handler=lambda apdu: apdu + bytes.fromhex("9000"))
+    logger = card.get_logger()
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(level)
+    hn = Iso14443ASession(drv=card, block_size=120, tracer=tracer)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    start = time.perf_counter()
+    for _ in range(NB_APDUS):
+        hn.send_apdu(APDU)
+    return (time.perf_counter() - start) / NB_APDUS
+
+
+if __name__ == "__main__":
+    logger = logging.getLogger()
+    for name, tracer, level in (("no sink", Tracer(), logging.WARNING),
+                                ("LoggingSink, WARNING", Tracer(LoggingSink(logger)), logging.WARNING),
+                                ("LoggingSink, INFO", Tracer(LoggingSink(logger)), logging.INFO)):
+        print(f"{name:22}: {bench(tracer, level) * 1e6:6.1f} us/APDU")
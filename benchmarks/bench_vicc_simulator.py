@@ -0,0 +1,69 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Iso15693Session on a population of simulated tags: 16 slots inventory of the
+field, then get_all_auto() and a bulk memory read of every tag.
+The tags answer without latency: the host-side cost only is measured.
+
+    $ python -m benchmarks.bench_vicc_simulator
+"""
+
+import logging
+import random
+import time
+
+from pynfcreader.devices.vicc_simulator import Vicc, ViccSimulator
+from pynfcreader.sessions.iso15693.iso15693 import Iso15693Session
+
+NB_TAGS = 500
+NB_BLOCKS = 64
+
+
+def bench():
+    rand = random.Random(0)
+    tags = [Vicc(bytes.fromhex("E004") + rand.randbytes(6), nb_blocks=NB_BLOCKS) for _ in range(NB_TAGS)]
+    card = ViccSimulator(tags)
+    hn = Iso15693Session(drv=card)
+    logging.disable(logging.CRITICAL)
+    hn.connect()
+    hn.field_on()
+
+    start = time.perf_counter()
+    uids = hn.inventory_all()
+    inventory = time.perf_counter() - start
+    assert len(uids) == NB_TAGS
+    print(f"inventory       : {inventory * 1000:8.2f} ms, {card.nb_requests} requests, "
+          f"{card.nb_collisions} collisions")
+
+    # get_all_auto() needs a single tag answering: the others are kept quiet
+    for uid in uids:
+        hn.stay_quiet(uid=uid[::-1])
+    start = time.perf_counter()
+    for uid in uids:
+        hn.reset_to_ready(flags=b"\x22", uid_opt=uid[::-1])
+        hn.get_all_auto()
+        hn.stay_quiet(uid=uid[::-1])
+    elapsed = time.perf_counter() - start
+    print(f"get_all_auto    : {elapsed / NB_TAGS * 1000:8.2f} ms/tag")
+
+    start = time.perf_counter()
+    for uid in uids:
+        hn.read_multiple_blocks(flags=b"\x22", uid_opt=uid[::-1], nb_blocks=bytes([NB_BLOCKS - 1]))
+    elapsed = time.perf_counter() - start
+    print(f"bulk memory read: {elapsed / NB_TAGS * 1000:8.2f} ms/tag")
+
+
+if __name__ == "__main__":
+    bench()
@@ -73,7 +73,7 @@ class Emu(Iso14443ASession):
                     print("s block")
                 elif tpdu.i:
                     print("i block")
-                    capdu += tpdu.get_inf_field()
+                    capdu += tpdu.inf
 
                     if tpdu.is_chaining() is False:
                         rapdu = self.process_function(capdu.hex())
@@ -162,7 +162,7 @@ class Emu(Iso14443ASession):
                 elif tpdu.s:
                     print("s block")
                     # Deselect
-                    if len(tpdu._inf_field) == 0:
+                    if len(tpdu.inf) == 0:
                         rtpdu, crc = "C2E0B4", False
                     # Otherwise, it is a WTX
 
@@ -1,29 +1,110 @@
+import asyncio
 import csv
+import os
+import random
+import time
 from pathlib import Path
 
 import serial
 import serial.tools.list_ports
 
+from pynfcreader.devices import trace
+from pynfcreader.devices.recording import Recorder
+
+
+class ResponseFramer:
+    """
+    Incremental response framer.
+
+    Received bytes are stored in a preallocated buffer and only the newly received
+    part is scanned for the terminator, so a response is returned as soon as its
+    end marker is seen instead of waiting for the link to be silent.
+    Bytes received after the terminator are kept for the next frame.
+    """
+
+    def __init__(self, cnx, size: int = 4096):
+        self._cnx = cnx
+        self._buf = bytearray(size)
+        self._start = 0
+        self._end = 0
+
+    def reset(self):
+        self._start = 0
+        self._end = 0
+
+    def _append(self, data: bytes):
+        size = len(data)
+        if self._end + size > len(self._buf):
+            # Move the pending frame to the front, grow the buffer only if still too small
+            pending = self._end - self._start
+            self._buf[:pending] = self._buf[self._start:self._end]
+            self._start, self._end = 0, pending
+            if pending + size > len(self._buf):
+                self._buf.extend(bytes(pending + size - len(self._buf)))
+        self._buf[self._end:self._end + size] = data
+        self._end += size
+
+    def read_until(self, terminator: bytes) -> bytes:
+        scan = self._start
+        while True:
+            index = self._buf.find(terminator, scan, self._end)
+            if index != -1:
+                stop = index + len(terminator)
+                break
+
+            scan = max(self._start, self._end - len(terminator) + 1)
+            data = self._cnx.read(max(1, self._cnx.in_waiting))
+            if not data:
+                # Timeout: return what has been received so far
+                stop = self._end
+                break
+            self._append(data)
+
+        return self._pop(stop)
+
+    def read(self, size: int) -> bytes:
+        while self._end - self._start < size:
+            data = self._cnx.read(max(size - (self._end - self._start), self._cnx.in_waiting))
+            if not data:
+                break
+            self._append(data)
+
+        return self._pop(min(self._start + size, self._end))
+
+    def _pop(self, stop: int) -> bytes:
+        frame = bytes(self._buf[self._start:stop])
+        self._start = stop
+        if self._start == self._end:
+            self.reset()
+        return frame
+
 
 class SerialCnx:
-    def __init__(self, port: str, baudrate: int, timeout=None, recording: str = ""):
+    def __init__(self, port: str, baudrate: int, timeout=None, recording: str = "", cnx=None,
+                 device: int = trace.DEVICE_UNKNOWN):
         self.port: str = port
         self.baudrate: int = baudrate
         self.timeout: int = timeout
-        self.cnx = serial.Serial(self.port, baudrate=self.baudrate, timeout=self.timeout)
-        self.recording_writer = None
-        self._recording_init(recording)
+        if cnx is None:
+            cnx = serial.Serial(self.port, baudrate=self.baudrate, timeout=self.timeout)
+        self.cnx = cnx
+        self._framer = ResponseFramer(self.cnx)
+        self.binary = False
+        self.recorder = Recorder(recording, device=device) if recording != "" else None
+
+    def _recording_write(self, mode: str, data: bytes):
+        if self.recorder:
+            self.recorder.record(mode, data, self.binary)
 
-    def _recording_init(self, recording):
-        if recording != "":
-            self.recording_writer = csv.writer(Path(recording).open(mode="w", newline="", encoding="utf-8"))
-            self.recording_writer.writerow(["Type", "Data"])
+    def mark(self, label: str):
+        if self.recorder:
+            self.recorder.mark(label)
 
-    def _recording_write(self, mode: str, data: str):
-        if self.recording_writer:
-            self.recording_writer.writerow([mode, data])
+    def set_binary(self, binary: bool):
+        self.binary = binary
 
     def reset_input_buffer(self):
+        self._framer.reset()
         self.cnx.reset_input_buffer()
 
     def reset_output_buffer(self):
@@ -34,25 +115,110 @@ class SerialCnx:
 
     def close(self):
         self.cnx.close()
+        if self.recorder:
+            self.recorder.close()
 
     def readline(self):
         data = self.cnx.readline()
-        self._recording_write("R", data.decode())
+        self._recording_write("R", data)
         return data
 
+    def read_until(self, terminator: bytes) -> bytes:
+        data = self._framer.read_until(terminator)
+        self._recording_write("R", data)
+        return data
+
+    def read(self, size: int) -> bytes:
+        data = self._framer.read(size)
+        self._recording_write("R", data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
     def write(self, data: bytes):
-        self._recording_write("W", data.decode())
+        self._recording_write("W", data)
         self.cnx.write(data)
 
 
-class SerialCnxVirtual:
-    def __init__(self, log: str = ""):
+class ReplayDivergence(Exception):
+    """
+    Frame written during a strict replay which differs from the recorded one.
+    """
+
+    def __init__(self, index: int, expected: bytes, actual: bytes):
+        self.index = index
+        self.expected = bytes(expected)
+        self.actual = bytes(actual)
+        super().__init__(self.diff())
+
+    def diff(self) -> str:
+        offset = next((i for i, (e, a) in enumerate(zip(self.expected, self.actual)) if e != a),
+                      min(len(self.expected), len(self.actual)))
+        return (f"Replay divergence at exchange {self.index}, byte {offset}:\n"
+                f"\texpected: {self.expected.hex(' ').upper()}\n"
+                f"\tactual:   {self.actual.hex(' ').upper()}\n"
+                f"\t          {'   ' * offset}^")
+
+
+class StrictReplay:
+    """
+    Verification of the written frames against the recorded W rows.
+
+    When strict, a written frame different from the recorded one raises
+    ReplayDivergence, or, when collect is set, is appended to divergences and
+    the replay goes on. The comparison is done on the raw bytes.
+    """
+
+    def _init_strict(self, strict: bool, collect: bool):
+        self.strict = strict
+        self.collect = collect
+        self.divergences = []
+
+    def _check_write(self, index: int, direction: str, expected: bytes, actual: bytes):
+        if expected == actual and direction == "W":
+            return
+        divergence = ReplayDivergence(index, expected if direction == "W" else b"", actual)
+        if not self.collect:
+            raise divergence
+        self.divergences.append(divergence)
+
+
+class SerialCnxVirtual(StrictReplay):
+    """
+    Replay of a CSV recording.
+
+    Recordings made before the prompt framing hold one R row per line read, a
+    response being ended by an empty row (read timeout): read_until() joins the
+    R rows until the terminator is seen, and skips the empty row ending them.
+    """
+
+    def __init__(self, log: str = "", strict: bool = False, collect: bool = False):
         self.reader = csv.reader(Path(log).open(mode="r", encoding="utf-8", newline=""))
+        self.binary = False
+        self._init_strict(strict, collect)
+        self.position = -1
+        self._next_row = None
         self._log_get_line()
 
     def _log_get_line(self):
+        self.position += 1
+        if self._next_row is not None:
+            row, self._next_row = self._next_row, None
+            return row
         return next(self.reader)
 
+    def _log_peek_line(self):
+        if self._next_row is None:
+            self._next_row = next(self.reader, None)
+        return self._next_row
+
+    def _log_next_is_read(self, data: str = None) -> bool:
+        row = self._log_peek_line()
+        return row is not None and row[0] == "R" and (data is None or row[1] == data)
+
     def reset_input_buffer(self):
         pass
 
@@ -62,12 +228,306 @@ class SerialCnxVirtual:
     def set_timeout(self, timeout: int):
         pass
 
+    def set_binary(self, binary: bool):
+        self.binary = binary
+
+    def mark(self, label: str):
+        pass
+
     def close(self):
         pass
 
     def readline(self):
         data = self._log_get_line()
-        return data[1].encode()
+        return bytes.fromhex(data[1]) if self.binary else data[1].encode()
+
+    def read_until(self, terminator: bytes) -> bytes:
+        data = self.readline()
+        if terminator in data or not self._log_next_is_read():
+            return data
+        while terminator not in data and self._log_next_is_read():
+            data += self.readline()
+        if self._log_next_is_read(""):
+            self._log_get_line()
+        return data
+
+    def read(self, size: int) -> bytes:
+        return self.readline()
+
+    def readinto(self, buffer) -> int:
+        data = self.readline()
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data: bytes):
+        row = self._log_get_line()
+        if self.strict:
+            expected = bytes.fromhex(row[1]) if self.binary else row[1].encode()
+            self._check_write(self.position - 1, row[0], expected, data)
+
+
+class SerialCnxReplay(StrictReplay):
+    """
+    Replay of a binary trace (pynfcreader.devices.trace), memory-mapped.
+
+    Unlike SerialCnxVirtual, the replay can seek to any record, e.g. to replay a
+    session from one of its markers. Several cursors can share the same mapping:
+
+        capture = MappedTrace("capture.trace")
+        first = SerialCnxReplay(capture)
+        second = SerialCnxReplay(capture, start=capture.find_marker("select"))
+
+    :param log: trace path or MappedTrace
+    :param start: index of the first record to replay
+    :param strict: compare the written frames with the recorded ones (see StrictReplay)
+
+    The recorded timing can be reproduced, to measure the end-to-end
+    transaction time of the session layer under the reader latencies:
+    a received frame is delivered once the recorded delay since the previous
+    frame has elapsed, divided by speed. The time spent by the host between a
+    received frame and the next written frame is the actual one.
+
+    :param speed: timing scale: 1 for real time, 10 for ten times faster, 0 to replay as fast as possible
+    :param jitter: maximum random delay (seconds) added to each received frame
+    :param card_delay: delay (seconds) added to each frame received after a written frame
+    :param seed: seed of the jitter
+    :param clock: time source (seconds), and sleep: function waiting a delay (seconds),
+                  e.g. to simulate the timing without waiting
+    """
+
+    def __init__(self, log, start: int = 0, strict: bool = False, collect: bool = False,
+                 speed: float = 0, jitter: float = 0, card_delay: float = 0, seed=None,
+                 clock=time.perf_counter, sleep=time.sleep):
+        self._owner = not isinstance(log, trace.MappedTrace)
+        self.trace = trace.MappedTrace(log) if self._owner else log
+        self.position = start
+        self.binary = False
+        self._init_strict(strict, collect)
+        self.speed = speed
+        self.jitter = jitter
+        self.card_delay = card_delay
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._sleep = sleep
+        self._anchor = None
+        self._last_direction = None
+
+    def cursor(self, start: int = None) -> "SerialCnxReplay":
+        return SerialCnxReplay(self.trace, self.position if start is None else start, self.strict, self.collect,
+                               self.speed, self.jitter, self.card_delay, clock=self._clock, sleep=self._sleep)
+
+    def seek(self, index: int):
+        if not 0 <= index <= len(self.trace):
+            raise Exception(f"Cannot seek to record {index}: the trace has {len(self.trace)} records")
+        self.position = index
+        self._anchor = None
+        self._last_direction = None
+
+    def seek_marker(self, label: str):
+        index = self.trace.find_marker(label, self.position)
+        if index == -1:
+            raise Exception(f"Marker {label} not found in the trace")
+        self.seek(index)
+
+    def tell(self) -> int:
+        return self.position
+
+    def _next_record(self) -> trace.TraceRecord:
+        while self.position < len(self.trace):
+            record = self.trace[self.position]
+            self.position += 1
+            if record.direction != "M":
+                self._wait(record)
+                return record
+        raise Exception("End of the replayed trace")
+
+    def _wait(self, record: trace.TraceRecord):
+        if record.direction == "R":
+            delay = 0
+            if self.speed and self._anchor is not None:
+                delay += (record.timestamp - self._anchor[1]) / 1e9 / self.speed
+            if self._last_direction == "W":
+                delay += self.card_delay
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            if delay > 0 and self._anchor is not None:
+                remaining = self._anchor[0] + delay - self._clock()
+                if remaining > 0:
+                    self._sleep(remaining)
+        self._last_direction = record.direction
+        self._anchor = (self._clock(), record.timestamp)
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def set_timeout(self, timeout: int):
+        pass
+
+    def set_binary(self, binary: bool):
+        self.binary = binary
+
+    def mark(self, label: str):
+        pass
+
+    def close(self):
+        if self._owner:
+            self.trace.close()
+
+    def readline(self) -> bytes:
+        return self._next_record().data
+
+    def read_until(self, terminator: bytes) -> bytes:
+        return self.readline()
+
+    def read(self, size: int) -> bytes:
+        return self.readline()
+
+    def readinto(self, buffer) -> int:
+        data = self.readline()
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data: bytes):
+        record = self._next_record()
+        if self.strict:
+            self._check_write(self.position - 1, record.direction, record.data, data)
+
+
+class AsyncSerialCnx(asyncio.Protocol):
+    """
+    asyncio serial connection.
+
+    Received bytes are accumulated by the protocol callbacks and read back with
+    awaitable read_until()/read(). Use open() for a serial port (POSIX), or pass
+    the instance as protocol factory of any asyncio transport (e.g. a socket
+    pair to talk to a stand-in).
+    The timeout (seconds, None to wait forever) applies to each read, and
+    raises asyncio.TimeoutError when it expires.
+    """
+
+    def __init__(self, timeout=None, recording: str = "", device: int = trace.DEVICE_UNKNOWN):
+        self.timeout = timeout
+        self.binary = False
+        self.recorder = Recorder(recording, device=device) if recording != "" else None
+        self._buf = bytearray()
+        self._scan = 0
+        self._waiter = None
+        self._eof = False
+        self._serial = None
+        self._transport = None
+        self._writer = None
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int, timeout=None, recording: str = "",
+                   device: int = trace.DEVICE_UNKNOWN):
+        loop = asyncio.get_running_loop()
+        cnx = cls(timeout, recording, device)
+        cnx._serial = serial.Serial(port, baudrate=baudrate, timeout=0)
+        await loop.connect_read_pipe(lambda: cnx, cnx._serial)
+        pipe = os.fdopen(os.dup(cnx._serial.fileno()), "wb", buffering=0)
+        cnx._writer, _ = await loop.connect_write_pipe(asyncio.Protocol, pipe)
+        return cnx
+
+    def connection_made(self, transport):
+        self._transport = transport
+        if isinstance(transport, asyncio.WriteTransport):
+            self._writer = transport
+
+    def data_received(self, data: bytes):
+        self._buf += data
+        self._wakeup()
+
+    def eof_received(self):
+        self._eof = True
+        self._wakeup()
+
+    def connection_lost(self, exc):
+        self._eof = True
+        self._wakeup()
+
+    def _wakeup(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _wait_data(self):
+        if self._eof:
+            raise Exception("Serial connection closed")
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    def reset_input_buffer(self):
+        self._buf.clear()
+        self._scan = 0
+
+    def reset_output_buffer(self):
+        pass
+
+    def set_timeout(self, timeout):
+        self.timeout = timeout
+
+    def set_binary(self, binary: bool):
+        self.binary = binary
+
+    def _recording_write(self, mode: str, data: bytes):
+        if self.recorder:
+            self.recorder.record(mode, data, self.binary)
+
+    def mark(self, label: str):
+        if self.recorder:
+            self.recorder.mark(label)
+
+    def close(self):
+        for transport in (self._transport, self._writer):
+            if transport is not None:
+                transport.close()
+        if self._serial is not None:
+            self._serial.close()
+        if self.recorder:
+            self.recorder.close()
+
+    async def _read_until(self, terminator: bytes) -> bytes:
+        while True:
+            index = self._buf.find(terminator, self._scan)
+            if index != -1:
+                break
+            self._scan = max(0, len(self._buf) - len(terminator) + 1)
+            await self._wait_data()
+
+        stop = index + len(terminator)
+        data = bytes(self._buf[:stop])
+        del self._buf[:stop]
+        self._scan = 0
+        return data
+
+    async def _read(self, size: int) -> bytes:
+        while len(self._buf) < size:
+            await self._wait_data()
+
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        self._scan = 0
+        return data
+
+    async def read_until(self, terminator: bytes) -> bytes:
+        data = await asyncio.wait_for(self._read_until(terminator), self.timeout)
+        self._recording_write("R", data)
+        return data
+
+    async def readline(self) -> bytes:
+        return await self.read_until(b"\n")
+
+    async def read(self, size: int) -> bytes:
+        data = await asyncio.wait_for(self._read(size), self.timeout)
+        self._recording_write("R", data)
+        return data
 
     def write(self, data: bytes):
-        a = self._log_get_line()
+        data = bytes(data)
+        self._recording_write("W", data)
+        self._writer.write(data)
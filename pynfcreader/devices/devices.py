@@ -19,6 +19,11 @@ from abc import ABCMeta, abstractmethod
 class Devices:
     __metaclass__ = ABCMeta
 
+    # pynfcreader.tools.latency.LatencyRecorder of the driver requests, if any
+    latency = None
+    # Largest frame (CRC included) the reader can receive, for the FSD negotiation
+    max_frame_size = 256
+
     @abstractmethod
     def connect(self):
         pass
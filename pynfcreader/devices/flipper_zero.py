@@ -13,45 +13,151 @@
 # limitations under the License.
 
 import logging
+import struct
 import sys
+import time
 
 import serial
 import serial.tools.list_ports
 
+from pynfcreader.devices import trace
 from pynfcreader.devices.devices import Devices
-from pynfcreader.devices.connection import SerialCnx, SerialCnxVirtual
+from pynfcreader.devices.connection import AsyncSerialCnx, SerialCnx, SerialCnxReplay, SerialCnxVirtual
+from pynfcreader.tools.tracing import get_logger
 
-class FlipperZero(Devices):
 
-    def __init__(self, port: str = "", baudrate: int = 115200 * 8, debug: bool = True, recording="", log=""):
+class FlipperZeroPipeline:
+    """
+    Queue of reader commands sent to the Flipper Zero in a single serial write.
 
-        self._port = port if port != "" else self.auto_search()
-        self._baudrate = baudrate
-        if log == "":
-            self.cnx = SerialCnx(self._port, baudrate=115200 * 8, timeout=None, recording=recording)
-        else:
-            self.cnx = SerialCnxVirtual(log)
+    The CLI processes the queued lines one after the other, so the responses are
+    read back in order, each one being delimited by the prompt.
+
+        with fz.pipeline() as pipe:
+            pipe.reqa()
+            pipe.send(bytes.fromhex("9320"), transmitter_add_crc=False)
+        atqa, uid = pipe.results
+
+    send() and reqa() return the index of the response in results, which holds
+    the responses of all the flushed batches. flush() returns those of its batch.
+    """
+
+    def __init__(self, drv):
+        self._drv = drv
+        self._cmds = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._cmds)
+
+    def _add(self, cmd: bytes) -> int:
+        self._cmds.append(cmd)
+        return len(self.results) + len(self._cmds) - 1
+
+    def send(self, data: bytes, transmitter_add_crc=True) -> int:
+        return self._add(self._drv.build_send_cmd(data, transmitter_add_crc))
+
+    def reqa(self) -> int:
+        return self._add(self._drv.build_reqa_cmd())
+
+    def flush(self) -> list:
+        cmds, self._cmds = self._cmds, []
+        if not cmds:
+            return []
+        self._drv.cnx.reset_input_buffer()
+        self._drv.cnx.reset_output_buffer()
+        self._drv.cnx.write(b"".join(cmds))
+        batch = [self._drv.read_resp() for _ in cmds]
+        self.results += batch
+        return batch
 
-        self.__logger = logging.getLogger()
-        stream_handler = logging.StreamHandler()
-        stream_debug_formatter = logging.Formatter('%(levelname)s  ::  %(message)s')
-        stream_handler.setFormatter(stream_debug_formatter)
 
-        self.__logger.setLevel(logging.INFO)
-        stream_handler.setLevel(logging.INFO)
+class AsyncFlipperZeroPipeline(FlipperZeroPipeline):
+    """
+    FlipperZeroPipeline for AsyncFlipperZero.
+
+        async with fz.pipeline() as pipe:
+            pipe.reqa()
+        atqa, = pipe.results
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.flush()
+
+    async def flush(self) -> list:
+        cmds, self._cmds = self._cmds, []
+        if not cmds:
+            return []
+        self._drv.cnx.reset_input_buffer()
+        self._drv.cnx.write(b"".join(cmds))
+        batch = [await self._drv.read_resp() for _ in cmds]
+        self.results += batch
+        return batch
+
+
+class FlipperZero(Devices):
+    """
+    Flipper Zero running the NFC CLI.
+
+    By default, frames are exchanged as hexadecimal text through the CLI.
+    With binary=True, connect() asks the firmware for the binary framing mode
+    ("nfc binary") and falls back to the text CLI if it is not supported.
+    A binary frame is: type (1 byte) | payload length (2 bytes, little endian) | payload
+    """
+
+    # The CLI prints its prompt once the output of a command is complete
+    PROMPT = b"\r\n>: "
+
+    # Host to Flipper binary frames
+    FRAME_CLI = 0x00
+    FRAME_SEND = 0x01
+    FRAME_REQA = 0x02
+    FRAME_EMU_RESP = 0x03
+    # Flipper to host binary frames
+    FRAME_CLI_RESP = 0x80
+    FRAME_RESP = 0x81
+    FRAME_EMU_CMD = 0x82
+    FRAME_EMU_FIELD = 0x83
+
+    def __init__(self, port: str = "", baudrate: int = 115200 * 8, debug: bool = True, recording="", log="", cnx=None,
+                 binary: bool = False):
+
+        self._port = port if port != "" or cnx is not None else self.auto_search()
+        self._baudrate = baudrate
+        self._binary_requested = binary
+        self.binary = False
+        self.cnx = cnx if cnx is not None else self._open_cnx(recording, log)
+
+        self.__logger = get_logger(debug)
 
         self._python_ver = sys.version[0]
 
-        if debug:
-            self.__logger.setLevel(logging.DEBUG or logging.INFO)
-            stream_handler.setLevel(logging.DEBUG or logging.INFO)
+    def _open_cnx(self, recording, log):
+        if log == "":
+            return SerialCnx(self._port, baudrate=115200 * 8, timeout=None, recording=recording,
+                             device=trace.DEVICE_FLIPPER_ZERO)
+        if trace.is_trace(log):
+            return SerialCnxReplay(log)
+        return SerialCnxVirtual(log)
 
-        self.__logger.addHandler(stream_handler)
+    @staticmethod
+    def search_ports() -> list:
+        return [port.device for port in serial.tools.list_ports.comports() if "Flipper" in port.description]
 
     def auto_search(self) -> str:
-        for port in serial.tools.list_ports.comports():
-            if "Flipper" in port.description:
-                return port.device
+        for port in self.search_ports():
+            return port
         print("Error. No flipper zero device found")
         exit(1)
 
@@ -69,9 +175,15 @@ class FlipperZero(Devices):
         while "Firmware version:" not in r:
             r = self.cnx.readline().decode()
 
-        self.cnx.readline().decode()
+        # The timeout is only a safety net: responses are delimited by the CLI prompt
+        self.cnx.set_timeout(1)
+        self.cnx.read_until(self.PROMPT)
 
-        self.cnx.set_timeout(0.1)
+        if self._binary_requested:
+            self.binary = "Binary mode" in self.cli(b"nfc binary")
+            self.cnx.set_binary(self.binary)
+            self.__logger.info(f"Binary framing {'enabled' if self.binary else 'not supported, text CLI used'}")
+            self.__logger.info("")
 
     def close(self):
         self.cnx.close()
@@ -79,122 +191,312 @@ class FlipperZero(Devices):
     def get_logger(self):
         return self.__logger
 
-    def set_mode_iso14443A(self):
+    @staticmethod
+    def build_frame(frame_type: int, payload: bytes = b"") -> bytes:
+        return struct.pack("<BH", frame_type, len(payload)) + payload
+
+    def read_frame(self):
+        header = self.cnx.read(3)
+        if len(header) != 3:
+            raise Exception("No binary frame received from the Flipper Zero")
+        frame_type, size = struct.unpack("<BH", header)
+        return frame_type, self.cnx.read(size) if size else b""
+
+    def cli(self, cmd: bytes) -> str:
         self.cnx.reset_input_buffer()
         self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc mode_14443_a\r\n")
-        r = self.read_all()
+        if self.binary:
+            self.cnx.write(self.build_frame(self.FRAME_CLI, cmd))
+            return self.read_frame()[1].decode()
+        self.cnx.write(cmd + b"\r\n")
+        return self.read_all()
+
+    def set_mode_iso14443A(self):
+        r = self.cli(b"nfc mode_14443_a")
         assert "Set mode ISO 14443 A" in r
 
     def set_mode_emu_iso14443A(self):
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc mode_emu_14443_a\r\n")
-        return self.read_all()
+        return self.cli(b"nfc mode_emu_14443_a")
         # assert "Set mode ISO 14443 A" in r
 
     def set_mode_iso14443B(self):
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc mode_14443_b\r\n")
-        return self.read_all()
+        return self.cli(b"nfc mode_14443_b")
 
     def set_mode_iso15693(self):
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc mode_15693\r\n")
-        return self.read_all()
+        return self.cli(b"nfc mode_15693")
 
     def set_mode_emu_iso15693(self):
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc mode_emu_15693\r\n")
-        return self.read_all()
+        return self.cli(b"nfc mode_emu_15693")
 
     def start_emulation(self):
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc run_emu\r\n")
-        self.read_all()
+        self.cli(b"nfc run_emu")
         self.cnx.set_timeout(None)
 
     def emu_get_cmd(self) -> str:
+        if self.binary:
+            frame_type, payload = self.read_frame()
+            if frame_type == self.FRAME_EMU_FIELD:
+                return "on" if payload[0] else "off"
+            return payload.hex().upper()
         return str(self.cnx.readline().decode()).strip()
 
     def emu_send_resp(self, resp: bytes, flipper_add_crc=False) -> None:
+        if self.binary:
+            self.cnx.write(self.build_frame(self.FRAME_EMU_RESP, bytes([flipper_add_crc]) + resp))
+            return
 
         crc = b"1" if flipper_add_crc else b"0"
         self.cnx.write(crc + resp.hex().encode() + b"\n")
 
     def read_all(self):
-        r = ""
-        d = self.cnx.readline().decode()
-        while d != "":
-            r += d
-            d = self.cnx.readline().decode()
-        return r
+        return self.cnx.read_until(self.PROMPT).decode()
 
     def field_off(self):
         self.__logger.debug("Field off")
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc off\r\n")
-        r = self.read_all()
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        r = self.cli(b"nfc off")
+        if self.latency is not None:
+            self.latency.record_span("drv.field_off", start, time.perf_counter_ns())
         assert "Field is off" in r
 
     def field_on(self):
         self.__logger.debug("Field on")
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc on\r\n")
-        self.read_all()
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        self.cli(b"nfc on")
+        if self.latency is not None:
+            self.latency.record_span("drv.field_on", start, time.perf_counter_ns())
 
     def write_bits(self, data=b"", num_bits=0):
+        latency = self.latency
+        if latency is not None:
+            start = time.perf_counter_ns()
 
         self.cnx.reset_input_buffer()
         self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc reqa\r\n")
-        resp = bytes.fromhex(self.read_all().split("\r\n")[1])
-
-        self.__logger.debug(f"\t<{' '.join(f'{hit:02X}' for hit in resp)}")
-        self.__logger.debug("")
+        cmd = self.build_reqa_cmd()
+        if latency is not None:
+            sent = time.perf_counter_ns()
+        self.cnx.write(cmd)
+        raw = self.read_raw_resp()
+        if latency is not None:
+            received = time.perf_counter_ns()
+        resp = self.decode_resp(raw)
+        if latency is not None:
+            latency.record_split("drv.write_bits", start, sent, received, time.perf_counter_ns())
+
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(f"\t<{resp.hex()}")
+            self.__logger.debug("")
 
         return resp
 
     def set_uid(self, uid: str):
         self.__logger.debug(f"set uid: {uid}")
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc set_uid {uid}\r\n")
-        r = self.read_all()
+        r = self.cli(b"nfc set_uid {uid}")
 
     def set_sak(self, sak: int):
         assert sak in range(256)
         self.__logger.debug(f"set sak: {sak}")
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc set_sak {sak:02X}\r\n")
-        r = self.read_all()
+        r = self.cli(b"nfc set_sak {sak:02X}")
 
     def set_atqa(self, atqa: str):
         self.__logger.debug(f"set atqa: {atqa}")
-        self.cnx.reset_input_buffer()
-        self.cnx.reset_output_buffer()
-        self.cnx.write(b"nfc set_sak atqa\r\n")
-        r = self.read_all()
+        r = self.cli(b"nfc set_sak atqa")
+
+    def build_send_cmd(self, data: bytes, transmitter_add_crc=True) -> bytes:
+        if self.binary:
+            return self.build_frame(self.FRAME_SEND, bytes([transmitter_add_crc]) + data)
+        add_crc = 1 if transmitter_add_crc else 0
+        return f"nfc send {add_crc} {data.hex()}\r\n".encode()
+
+    def build_reqa_cmd(self) -> bytes:
+        if self.binary:
+            return self.build_frame(self.FRAME_REQA)
+        return b"nfc reqa\r\n"
+
+    @staticmethod
+    def parse_resp(r: str) -> bytes:
+        # Command echo, then the response
+        return bytes.fromhex(r.split("\r\n")[1])
+
+    def read_raw_resp(self):
+        if self.binary:
+            return self.read_frame()[1]
+        return self.read_all()
+
+    def decode_resp(self, raw) -> bytes:
+        if self.binary:
+            return raw
+        return self.parse_resp(raw)
+
+    def read_resp(self) -> bytes:
+        return self.decode_resp(self.read_raw_resp())
+
+    def pipeline(self) -> FlipperZeroPipeline:
+        return FlipperZeroPipeline(self)
 
     def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        latency = self.latency
+        if latency is not None:
+            start = time.perf_counter_ns()
+
         self.cnx.reset_input_buffer()
         self.cnx.reset_output_buffer()
-        add_crc = 1 if transmitter_add_crc else 0
 
-        self.__logger.debug("write")
-        self.__logger.debug(f"\t>{data.hex()}")
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("write")
+            self.__logger.debug(f"\t>{data.hex()}")
+
+        cmd = self.build_send_cmd(data, transmitter_add_crc)
+        if latency is not None:
+            sent = time.perf_counter_ns()
+        self.cnx.write(cmd)
+        raw = self.read_raw_resp()
+        if latency is not None:
+            received = time.perf_counter_ns()
+        resp = self.decode_resp(raw)
+        if latency is not None:
+            latency.record_split("drv.write", start, sent, received, time.perf_counter_ns())
+
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(f"\t<{resp.hex()}")
+            self.__logger.debug("")
+
+        return resp
+
+
+class AsyncFlipperZero(FlipperZero):
+    """
+    asyncio version of FlipperZero: connect() and all the I/O methods are coroutines.
+
+    The connection is opened by connect(), unless an AsyncSerialCnx is given.
+    """
+
+    def __init__(self, port: str = "", baudrate: int = 115200 * 8, debug: bool = True, cnx=None, binary: bool = False):
+        FlipperZero.__init__(self, port, baudrate, debug, cnx=cnx, binary=binary)
+
+    def _open_cnx(self, recording, log):
+        return None
+
+    async def connect(self):
+        logger = self.get_logger()
+        logger.info("Connect to Flipper Zero")
+        logger.info("")
+
+        if self.cnx is None:
+            self.cnx = await AsyncSerialCnx.open(self._port, baudrate=115200 * 8, device=trace.DEVICE_FLIPPER_ZERO)
+
+        self.cnx.reset_input_buffer()
+
+        r = (await self.cnx.readline()).decode()
+
+        while "Firmware version:" not in r:
+            r = (await self.cnx.readline()).decode()
+
+        # The timeout is only a safety net: responses are delimited by the CLI prompt
+        self.cnx.set_timeout(1)
+        await self.cnx.read_until(self.PROMPT)
+
+        if self._binary_requested:
+            self.binary = "Binary mode" in await self.cli(b"nfc binary")
+            self.cnx.set_binary(self.binary)
+            logger.info(f"Binary framing {'enabled' if self.binary else 'not supported, text CLI used'}")
+            logger.info("")
+
+    async def read_frame(self):
+        header = await self.cnx.read(3)
+        frame_type, size = struct.unpack("<BH", header)
+        return frame_type, await self.cnx.read(size) if size else b""
+
+    async def read_all(self):
+        return (await self.cnx.read_until(self.PROMPT)).decode()
+
+    async def read_raw_resp(self):
+        if self.binary:
+            return (await self.read_frame())[1]
+        return await self.read_all()
+
+    async def read_resp(self) -> bytes:
+        return self.decode_resp(await self.read_raw_resp())
+
+    async def cli(self, cmd: bytes) -> str:
+        self.cnx.reset_input_buffer()
+        if self.binary:
+            self.cnx.write(self.build_frame(self.FRAME_CLI, cmd))
+            return (await self.read_frame())[1].decode()
+        self.cnx.write(cmd + b"\r\n")
+        return await self.read_all()
+
+    async def set_mode_iso14443A(self):
+        r = await self.cli(b"nfc mode_14443_a")
+        assert "Set mode ISO 14443 A" in r
 
-        self.cnx.write(f"nfc send {add_crc} {data.hex()}\r\n".encode())
-        resp = bytes.fromhex(self.read_all().split("\r\n")[1])
+    async def set_mode_emu_iso14443A(self):
+        return await self.cli(b"nfc mode_emu_14443_a")
 
-        self.__logger.debug(f"\t<{data.hex()}")
-        self.__logger.debug("")
+    async def set_mode_iso14443B(self):
+        return await self.cli(b"nfc mode_14443_b")
 
+    async def set_mode_iso15693(self):
+        return await self.cli(b"nfc mode_15693")
+
+    async def set_mode_emu_iso15693(self):
+        return await self.cli(b"nfc mode_emu_15693")
+
+    async def start_emulation(self):
+        await self.cli(b"nfc run_emu")
+        self.cnx.set_timeout(None)
+
+    async def emu_get_cmd(self) -> str:
+        if self.binary:
+            frame_type, payload = await self.read_frame()
+            if frame_type == self.FRAME_EMU_FIELD:
+                return "on" if payload[0] else "off"
+            return payload.hex().upper()
+        return (await self.cnx.readline()).decode().strip()
+
+    async def field_off(self):
+        self.get_logger().debug("Field off")
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        r = await self.cli(b"nfc off")
+        if self.latency is not None:
+            self.latency.record_span("drv.field_off", start, time.perf_counter_ns())
+        assert "Field is off" in r
+
+    async def field_on(self):
+        self.get_logger().debug("Field on")
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        await self.cli(b"nfc on")
+        if self.latency is not None:
+            self.latency.record_span("drv.field_on", start, time.perf_counter_ns())
+
+    def pipeline(self) -> AsyncFlipperZeroPipeline:
+        return AsyncFlipperZeroPipeline(self)
+
+    async def write_bits(self, data=b"", num_bits=0):
+        return await self._transceive("drv.write_bits", self.build_reqa_cmd)
+
+    async def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        return await self._transceive("drv.write", self.build_send_cmd, data, transmitter_add_crc)
+
+    async def _transceive(self, name: str, build, *args):
+        latency = self.latency
+        if latency is None:
+            self.cnx.reset_input_buffer()
+            self.cnx.write(build(*args))
+            return await self.read_resp()
+
+        start = time.perf_counter_ns()
+        self.cnx.reset_input_buffer()
+        cmd = build(*args)
+        sent = time.perf_counter_ns()
+        self.cnx.write(cmd)
+        raw = await self.read_raw_resp()
+        received = time.perf_counter_ns()
+        resp = self.decode_resp(raw)
+        latency.record_split(name, start, sent, received, time.perf_counter_ns())
         return resp
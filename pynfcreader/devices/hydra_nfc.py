@@ -12,69 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import logging
-import sys
+from pynfcreader.devices import trace
+from pynfcreader.devices.hydra_nfc_v2 import BbioFrameBuilder, HydraNFCv2
 
-from pynfcreader.devices.devices import Devices
-from pyHydrabus import NFC
 
+class HydraNFC(HydraNFCv2):
+    """
+    HydraNFC (v1 shield) in BBIO NFC reader mode (NFC1).
 
-class HydraNFC(Devices):
+    The requests are the HydraNFC v2 ones, except for the bits write which sends
+    any data instead of a REQA only. There is no ISO 14443 B support.
+    """
 
-    def __init__(self, port="C0M8", debug: bool = True):
-        self._port = port
-        self._hydranfc = None
+    MODE_BYTE = b"\x0C"
+    MODE_NAME = b"NFC1"
+    DEVICE = trace.DEVICE_HYDRA_NFC
 
-        self.__logger = logging.getLogger()
-        stream_handler = logging.StreamHandler()
-        stream_debug_formatter = logging.Formatter('%(levelname)s  ::  %(message)s')
-        stream_handler.setFormatter(stream_debug_formatter)
+    def __init__(self, port="C0M8", debug: bool = True, recording="", log="", cnx=None):
+        HydraNFCv2.__init__(self, port, debug, recording=recording, log=log, cnx=cnx)
 
-        self.__logger.setLevel(logging.INFO)
-        stream_handler.setLevel(logging.INFO)
+    @staticmethod
+    def _add_write_bits(frame: BbioFrameBuilder, data: bytes, num_bits: int):
+        frame.add_write_bits(data, num_bits)
 
-        self._python_ver = sys.version[0]
-
-        if debug:
-            self.__logger.setLevel(logging.DEBUG or logging.INFO)
-            stream_handler.setLevel(logging.DEBUG or logging.INFO)
-
-        self.__logger.addHandler(stream_handler)
-
-    def connect(self):
-        self.__logger.info("Connect to HydraNFC")
-        self.__logger.info("")
-        self._hydranfc = NFC(self._port)
-
-    def get_logger(self):
-        return self.__logger
-
-    def set_mode_iso14443A(self):
-        self._hydranfc.mode = self._hydranfc.MODE_ISO_14443A
-
-    def set_mode_iso15693(self):
-        self._hydranfc.mode = self._hydranfc.MODE_ISO_15693
-
-    def field_off(self):
-        self.__logger.debug("Field off")
-        self._hydranfc.rf = 0
-
-    def field_on(self):
-        self.__logger.debug("Field on")
-        self._hydranfc.rf = 1
-
-    def write_bits(self, data=b"", num_bits=0):
-        resp = self._hydranfc.write_bits(data, num_bits)
-        self.__logger.debug(f"\t<{' '.join(f'{hit:02X}' for hit in resp)}")
-        self.__logger.debug("")
-        return resp
-
-    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
-        self.__logger.debug("write")
-        self.__logger.debug(f"\t>{data.hex()}")
-
-        resp = self._hydranfc.write(data, transmitter_add_crc)
-        self.__logger.debug(f"\t<{data.hex()}")
-        self.__logger.debug("")
-
-        return resp
+    def set_mode_iso14443B(self):
+        raise Exception("ISO 14443 B is not supported by HydraNFC")
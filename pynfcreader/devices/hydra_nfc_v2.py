@@ -12,110 +12,406 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
 import sys
+import time
 
+from pynfcreader.devices import trace
+from pynfcreader.devices.connection import AsyncSerialCnx, SerialCnx, SerialCnxReplay, SerialCnxVirtual
 from pynfcreader.devices.devices import Devices
-import serial
+from pynfcreader.tools.tracing import get_logger
 import serial.tools.list_ports
 
+
+class BbioFrameBuilder:
+    """
+    BBIO NFC reader requests assembled in a reusable preallocated buffer.
+
+    Opcode, CRC flag, length and payload are written in place, so a request is
+    sent with a single serial write (one USB transfer) instead of one per field.
+    """
+
+    OPCODE_FIELD_OFF = 0x02
+    OPCODE_FIELD_ON = 0x03
+    OPCODE_WRITE_BITS = 0x04
+    OPCODE_TRANSCEIVE = 0x05
+    OPCODE_MODE_ISO14443A = 0x06
+    OPCODE_MODE_ISO15693 = 0x07
+    OPCODE_REQA = 0x08
+    OPCODE_MODE_ISO14443B = 0x09
+
+    def __init__(self, size: int = 3 + 255):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._len = 0
+
+    def clear(self):
+        self._len = 0
+
+    def _reserve(self, size: int) -> int:
+        offset = self._len
+        if offset + size > len(self._buf):
+            self._view.release()
+            self._buf.extend(bytes(offset + size - len(self._buf)))
+            self._view = memoryview(self._buf)
+        self._len += size
+        return offset
+
+    def add_opcode(self, opcode: int):
+        self._buf[self._reserve(1)] = opcode
+
+    def add_transceive(self, data: bytes, transmitter_add_crc=True):
+        size = len(data)
+        if size > 255:
+            raise Exception(f"Frame too long for HydraNFC v2: {size} bytes")
+        offset = self._reserve(3 + size)
+        self._buf[offset] = self.OPCODE_TRANSCEIVE
+        self._buf[offset + 1] = int(transmitter_add_crc)
+        self._buf[offset + 2] = size
+        self._buf[offset + 3:offset + 3 + size] = data
+
+    def add_write_bits(self, data: bytes, num_bits: int):
+        offset = self._reserve(2 + len(data))
+        self._buf[offset] = self.OPCODE_WRITE_BITS
+        self._buf[offset + 1:offset + 1 + len(data)] = data
+        self._buf[offset + 1 + len(data)] = num_bits
+
+    def frame(self) -> memoryview:
+        return self._view[:self._len]
+
+
+class BbioBurst:
+    """
+    Sequence of BBIO operations sent back-to-back in a single write.
+
+    The responses are then parsed from the stream in order. results is aligned
+    with the queued operations: None for the operations without response.
+
+        with hydranfc.burst() as burst:
+            burst.field_on()
+            burst.write_bits(b"\\x26", 7)
+            burst.write(bytes.fromhex("9320"), transmitter_add_crc=False)
+        _, atqa, uid = burst.results
+    """
+
+    def __init__(self, drv):
+        self._drv = drv
+        self._frame = BbioFrameBuilder(size=512)
+        self._has_resp = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self._has_resp)
+
+    def _add(self, has_resp: bool) -> int:
+        self._has_resp.append(has_resp)
+        return len(self.results) + len(self._has_resp) - 1
+
+    def field_on(self) -> int:
+        self._frame.add_opcode(BbioFrameBuilder.OPCODE_FIELD_ON)
+        return self._add(False)
+
+    def field_off(self) -> int:
+        self._frame.add_opcode(BbioFrameBuilder.OPCODE_FIELD_OFF)
+        return self._add(False)
+
+    def set_mode_iso14443A(self) -> int:
+        self._frame.add_opcode(BbioFrameBuilder.OPCODE_MODE_ISO14443A)
+        return self._add(False)
+
+    def set_mode_iso14443B(self) -> int:
+        self._frame.add_opcode(BbioFrameBuilder.OPCODE_MODE_ISO14443B)
+        return self._add(False)
+
+    def set_mode_iso15693(self) -> int:
+        self._frame.add_opcode(BbioFrameBuilder.OPCODE_MODE_ISO15693)
+        return self._add(False)
+
+    def write_bits(self, data=b"", num_bits=0) -> int:
+        self._drv._add_write_bits(self._frame, data, num_bits)
+        return self._add(True)
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True) -> int:
+        self._frame.add_transceive(data, transmitter_add_crc)
+        return self._add(True)
+
+    def execute(self) -> list:
+        has_resp, self._has_resp = self._has_resp, []
+        if not has_resp:
+            return self.results
+        self._drv.write_raw(self._frame.frame())
+        self._frame.clear()
+        self.results += [self._drv.read_resp() if hit else None for hit in has_resp]
+        return self.results
+
+
 class HydraNFCv2(Devices):
+    """
+    HydraNFC v2 in BBIO NFC reader mode.
 
-    def __init__(self, port="", debug=True):
+    The serial connection is opened by connect(), unless one is given (cnx).
+    The BBIO exchanges can be recorded (recording=) and replayed (log=), as the
+    Flipper Zero ones.
+    """
 
-        self._port = port if port != "" else self.auto_search()
-        self._hydranfc = None
+    MODE_BYTE = b"\x0E"
+    MODE_NAME = b"NFC2"
+    DEVICE = trace.DEVICE_HYDRA_NFC_V2
+    # Response length on a single byte
+    max_frame_size = 255
 
-        self.__logger = logging.getLogger()
-        stream_handler = logging.StreamHandler()
-        stream_debug_formatter = logging.Formatter('%(levelname)s  ::  %(message)s')
-        stream_handler.setFormatter(stream_debug_formatter)
+    def __init__(self, port="", debug=True, recording="", log="", cnx=None):
 
-        self.__logger.setLevel(logging.INFO)
-        stream_handler.setLevel(logging.INFO)
+        self._port = port if port != "" or cnx is not None or log != "" else self.auto_search()
+        self._recording = recording
+        self._log = log
+        self._hydranfc = cnx
+        self._frame = BbioFrameBuilder()
+        # Response: length (1 byte) + data (up to 255 bytes)
+        self._rx_buf = bytearray(1 + 255)
+        self._rx_view = memoryview(self._rx_buf)
 
-        self._python_ver = sys.version[0]
+        self.__logger = get_logger(debug)
 
-        if debug:
-            self.__logger.setLevel(logging.DEBUG or logging.INFO)
-            stream_handler.setLevel(logging.DEBUG or logging.INFO)
+        self._python_ver = sys.version[0]
 
-        self.__logger.addHandler(stream_handler)
+    @staticmethod
+    def search_ports() -> list:
+        return [port.device for port in serial.tools.list_ports.comports() if "HydraBus" in port.description]
 
     def auto_search(self) -> str:
-        for port in serial.tools.list_ports.comports():
-            if "HydraBus" in port.description:
-                return port.device
+        for port in self.search_ports():
+            return port
         print("Error. No flipper zero device found")
         exit(1)
 
     def enter_bbio(self):
-        self._hydranfc.timeout = 0.01
+        self._hydranfc.set_timeout(0.01)
         for _ in range(20):
             self._hydranfc.write(b"\x00")
             if b"BBIO1" in self._hydranfc.read(5):
                 self._hydranfc.reset_input_buffer()
-                self._hydranfc.timeout = None
+                self._hydranfc.set_timeout(None)
 
                 # We enter reader mode
-                self._hydranfc.write(b"\x0E")
-                if self._hydranfc.read(4) != b"NFC2":
+                self._hydranfc.write(self.MODE_BYTE)
+                if self._hydranfc.read(4) != self.MODE_NAME:
                     raise Exception("Cannot enter BBIO Reader mode")
                 return
         raise Exception("Cannot enter BBIO mode.")
 
+    def _open_cnx(self):
+        if self._log == "":
+            return SerialCnx(self._port, baudrate=115200, timeout=None, recording=self._recording, device=self.DEVICE)
+        if trace.is_trace(self._log):
+            return SerialCnxReplay(self._log)
+        return SerialCnxVirtual(self._log)
+
     def connect(self):
         self.__logger.info("Connect to HydraNFC")
         self.__logger.info("")
-        self._hydranfc = serial.Serial(self._port, timeout=None)
+        if self._hydranfc is None:
+            self._hydranfc = self._open_cnx()
+        self._hydranfc.set_binary(True)
         self.enter_bbio()
 
+    def close(self):
+        self._hydranfc.close()
+
     def get_logger(self):
         return self.__logger
 
+    def _send_opcode(self, opcode: int):
+        self._frame.clear()
+        self._frame.add_opcode(opcode)
+        self._hydranfc.write(self._frame.frame())
+
+    def write_raw(self, data):
+        self._hydranfc.write(data)
+
+    def burst(self) -> BbioBurst:
+        return BbioBurst(self)
+
+    def read_raw_resp(self) -> memoryview:
+        # Valid until the next response
+        self._hydranfc.readinto(self._rx_view[:1])
+        rx_len = self._rx_buf[0]
+        rx_len = self._hydranfc.readinto(self._rx_view[1:1 + rx_len])
+        return self._rx_view[1:1 + rx_len]
+
+    def read_resp(self) -> bytes:
+        return bytes(self.read_raw_resp())
+
     def set_mode_iso14443A(self):
-        self._hydranfc.write(b"\x06")
+        self._send_opcode(BbioFrameBuilder.OPCODE_MODE_ISO14443A)
 
     def set_mode_iso14443B(self):
-        self._hydranfc.write(b"\x09")
+        self._send_opcode(BbioFrameBuilder.OPCODE_MODE_ISO14443B)
 
     def set_mode_iso15693(self):
-        self._hydranfc.write(b"\x07")
+        self._send_opcode(BbioFrameBuilder.OPCODE_MODE_ISO15693)
 
     def field_off(self):
         self.__logger.debug("Field off")
-        self._hydranfc.write(b"\x02")
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        self._send_opcode(BbioFrameBuilder.OPCODE_FIELD_OFF)
+        if self.latency is not None:
+            self.latency.record_span("drv.field_off", start, time.perf_counter_ns())
 
     def field_on(self):
         self.__logger.debug("Field on")
-        self._hydranfc.write(b"\x03")
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        self._send_opcode(BbioFrameBuilder.OPCODE_FIELD_ON)
+        if self.latency is not None:
+            self.latency.record_span("drv.field_on", start, time.perf_counter_ns())
+
+    @staticmethod
+    def _add_write_bits(frame: BbioFrameBuilder, data: bytes, num_bits: int):
+        # HydraNFC v2 firmware only sends REQA
+        frame.add_opcode(BbioFrameBuilder.OPCODE_REQA)
 
     def write_bits(self, data=b"", num_bits=0):
-        # resp = self._hydranfc.write_bits(data, num_bits)
+        latency = self.latency
+        if latency is not None:
+            start = time.perf_counter_ns()
 
-        self._hydranfc.write(b"\x08")
-        rx_len = int.from_bytes(self._hydranfc.read(1), byteorder="little")
-        resp = self._hydranfc.read(rx_len)
+        self._frame.clear()
+        self._add_write_bits(self._frame, data, num_bits)
+        if latency is not None:
+            sent = time.perf_counter_ns()
+        self._hydranfc.write(self._frame.frame())
+        raw = self.read_raw_resp()
+        if latency is not None:
+            received = time.perf_counter_ns()
+        resp = bytes(raw)
+        if latency is not None:
+            latency.record_split("drv.write_bits", start, sent, received, time.perf_counter_ns())
 
-        self.__logger.debug(f"\t<{' '.join(f'{hit:02X}' for hit in resp)}")
-        self.__logger.debug("")
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(f"\t<{resp.hex()}")
+            self.__logger.debug("")
 
         return resp
 
     def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
-        self.__logger.debug("write")
-        self.__logger.debug(f"\t>{data.hex()}")
+        latency = self.latency
+        if latency is not None:
+            start = time.perf_counter_ns()
 
-        self._hydranfc.write(b"\x05")
-        self._hydranfc.write(int(transmitter_add_crc).to_bytes(1, byteorder="big"))
-        self._hydranfc.write(len(data).to_bytes(1, byteorder="big"))
-        self._hydranfc.write(data)
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("write")
+            self.__logger.debug(f"\t>{data.hex()}")
+
+        self._frame.clear()
+        self._frame.add_transceive(data, transmitter_add_crc)
+        if latency is not None:
+            sent = time.perf_counter_ns()
+        self._hydranfc.write(self._frame.frame())
+        raw = self.read_raw_resp()
+        if latency is not None:
+            received = time.perf_counter_ns()
+        resp = bytes(raw)
+        if latency is not None:
+            latency.record_split("drv.write", start, sent, received, time.perf_counter_ns())
+
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(f"\t<{resp.hex()}")
+            self.__logger.debug("")
+
+        return resp
+
+
+class AsyncHydraNFCv2(HydraNFCv2):
+    """
+    asyncio version of HydraNFCv2: connect() and all the I/O methods are coroutines.
+
+    The connection is opened by connect(), unless an AsyncSerialCnx is given.
+    """
+
+    def __init__(self, port="", debug=True, recording="", cnx=None):
+        HydraNFCv2.__init__(self, port, debug, recording=recording, cnx=cnx)
+
+    async def enter_bbio(self):
+        self._hydranfc.set_timeout(0.01)
+        for _ in range(20):
+            self._hydranfc.write(b"\x00")
+            try:
+                r = await self._hydranfc.read(5)
+            except asyncio.TimeoutError:
+                continue
+            if b"BBIO1" in r:
+                self._hydranfc.reset_input_buffer()
+                self._hydranfc.set_timeout(None)
+
+                # We enter reader mode
+                self._hydranfc.write(self.MODE_BYTE)
+                if await self._hydranfc.read(4) != self.MODE_NAME:
+                    raise Exception("Cannot enter BBIO Reader mode")
+                return
+        raise Exception("Cannot enter BBIO mode.")
+
+    async def connect(self):
+        self.get_logger().info("Connect to HydraNFC")
+        self.get_logger().info("")
+        if self._hydranfc is None:
+            self._hydranfc = await AsyncSerialCnx.open(self._port, baudrate=115200, recording=self._recording,
+                                                       device=self.DEVICE)
+        self._hydranfc.set_binary(True)
+        await self.enter_bbio()
+
+    async def read_raw_resp(self) -> bytes:
+        rx_len = (await self._hydranfc.read(1))[0]
+        return await self._hydranfc.read(rx_len) if rx_len else b""
+
+    async def read_resp(self) -> bytes:
+        return await self.read_raw_resp()
+
+    async def set_mode_iso14443A(self):
+        HydraNFCv2.set_mode_iso14443A(self)
+
+    async def set_mode_iso14443B(self):
+        HydraNFCv2.set_mode_iso14443B(self)
+
+    async def set_mode_iso15693(self):
+        HydraNFCv2.set_mode_iso15693(self)
+
+    async def field_off(self):
+        HydraNFCv2.field_off(self)
+
+    async def field_on(self):
+        HydraNFCv2.field_on(self)
 
-        rx_len = int.from_bytes(self._hydranfc.read(1), byteorder="little")
+    async def write_bits(self, data=b"", num_bits=0):
+        start = time.perf_counter_ns() if self.latency is not None else 0
+        self._frame.clear()
+        self._add_write_bits(self._frame, data, num_bits)
+        return await self._transceive("drv.write_bits", start)
 
-        resp = self._hydranfc.read(rx_len)
+    async def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        start = time.perf_counter_ns() if self.latency is not None else 0
+        self._frame.clear()
+        self._frame.add_transceive(data, transmitter_add_crc)
+        return await self._transceive("drv.write", start)
 
-        self.__logger.debug(f"\t<{data.hex()}")
-        self.__logger.debug("")
+    async def _transceive(self, name: str, start: int):
+        latency = self.latency
+        if latency is None:
+            self._hydranfc.write(self._frame.frame())
+            return await self.read_resp()
 
+        sent = time.perf_counter_ns()
+        self._hydranfc.write(self._frame.frame())
+        resp = await self.read_raw_resp()
+        received = time.perf_counter_ns()
+        latency.record_split(name, start, sent, received, time.perf_counter_ns())
         return resp
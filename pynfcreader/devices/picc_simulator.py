@@ -0,0 +1,231 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+
+from pynfcreader.devices.devices import Devices
+from pynfcreader.tools import utils
+from pynfcreader.tools.tracing import get_logger
+
+FS = {0: 16, 1: 24, 2: 32, 3: 40, 4: 48, 5: 64, 6: 96, 7: 128, 8: 256}
+
+
+class PiccSimulator(Devices):
+    """
+    Software ISO 14443-4 card (PICC), type A or B, seen through the reader driver interface.
+
+    It answers to the activation (REQA/anticollision/SELECT/RATS/PPS, or REQB/ATTRIB),
+    then to the I/R/S-blocks: the APDUs are given to apdu_handler, the chained command
+    blocks are acknowledged and the response is chained according to the reader FSD.
+    Responses are returned with their CRC, as a reader returns them.
+
+        card = PiccSimulator(apdu_handler=lambda apdu: bytes.fromhex("9000"), wtx=1)
+        hn = Iso14443ASession(drv=card, block_size=120)
+
+    :param apdu_handler: callable apdu -> response APDU. By default, 90 00
+    :param fsci: card frame size index (FSC), announced in the ATS and ATQB
+    :param processing_time: card processing time (seconds) of each APDU
+    :param wtx: number of S(WTX) requests sent before each APDU response
+    :param wtxm: WTX multiplier of the S(WTX) requests
+    """
+
+    def __init__(self, apdu_handler=None, uid: bytes = bytes.fromhex("01020304"), atqa: bytes = bytes.fromhex("4400"),
+                 sak: int = 0x20, pupi: bytes = bytes.fromhex("01020304"), historical_bytes: bytes = b"",
+                 fsci: int = 8, processing_time: float = 0.0, wtx: int = 0, wtxm: int = 1, debug: bool = False):
+        self.apdu_handler = apdu_handler if apdu_handler is not None else (lambda apdu: bytes.fromhex("9000"))
+        self.uid = uid
+        self.atqa = atqa
+        self.sak = sak
+        self.pupi = pupi
+        self.historical_bytes = historical_bytes
+        self.fsci = fsci
+        self.processing_time = processing_time
+        self.wtx = wtx
+        self.wtxm = wtxm
+
+        self.mode = "A"
+        self.field = False
+        self.state = "idle"
+        self.fsd = 16
+        self.nb_tpdus = 0
+        self._cid = None
+        self._reset_protocol()
+
+        self.__logger = get_logger(debug)
+
+        self._python_ver = sys.version[0]
+
+    @property
+    def fsc(self) -> int:
+        return FS[self.fsci]
+
+    def connect(self):
+        self.__logger.info("Connect to the PICC simulator")
+        self.__logger.info("")
+
+    def close(self):
+        pass
+
+    def get_logger(self):
+        return self.__logger
+
+    def set_mode_iso14443A(self):
+        self.mode = "A"
+
+    def set_mode_iso14443B(self):
+        self.mode = "B"
+
+    def set_mode_iso15693(self):
+        raise Exception("ISO 15693 is not supported by the PICC simulator")
+
+    def field_off(self):
+        self.__logger.debug("Field off")
+        self.field = False
+        self.state = "idle"
+
+    def field_on(self):
+        self.__logger.debug("Field on")
+        self.field = True
+        self.state = "idle"
+        self._reset_protocol()
+
+    def _reset_protocol(self):
+        # The card block number is 1 at the activation: the first reader I-block has the block number 0
+        self._block_nb = 1
+        self._last_block = b""
+        self._command = b""
+        self._response = []
+        self._wtx_left = 0
+
+    def _crc(self, data: bytes) -> bytes:
+        if self.mode == "A":
+            return utils.crc_iso14443a_append(data)
+        return utils.crc_iso14443b_append(data)
+
+    def write_bits(self, data=b"", num_bits=0):
+        if not self.field or self.mode != "A" or data[:1] not in (b"\x26", b"\x52"):
+            return b""
+        self.state = "ready"
+        return self.atqa
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        if not self.field:
+            return b""
+        data = bytes(data)
+        if self.state == "protocol":
+            return self._process_block(data)
+        if self.mode == "A":
+            return self._activate_a(data)
+        return self._activate_b(data)
+
+    def _activate_a(self, data: bytes) -> bytes:
+        if self.state == "ready" and data == b"\x93\x20":
+            bcc = self.uid[0] ^ self.uid[1] ^ self.uid[2] ^ self.uid[3]
+            return self.uid + bytes([bcc])
+        if self.state == "ready" and data[:2] == b"\x93\x70" and data[2:6] == self.uid:
+            self.state = "active"
+            return self._crc(bytes([self.sak]))
+        if self.state == "active" and data[0] == 0xE0:
+            self.fsd = FS[data[1] >> 4]
+            self._cid = data[1] & 0x0F
+            self.state = "protocol"
+            self._reset_protocol()
+            return self._crc(self.ats())
+        return b""
+
+    def ats(self) -> bytes:
+        # T0: TA(1), TB(1), TC(1) present, FSCI. No NAD nor CID support.
+        ats = bytes([0x70 | self.fsci, 0x80, 0x70, 0x00]) + self.historical_bytes
+        return bytes([len(ats) + 1]) + ats
+
+    def atqb(self) -> bytes:
+        # Application data (4 bytes), protocol info: bit rate, FSCI + ISO 14443-4, FWI
+        return bytes([0x50]) + self.pupi + bytes(4) + bytes([0x00, (self.fsci << 4) | 0x01, 0x80])
+
+    def _activate_b(self, data: bytes) -> bytes:
+        if data[0] == 0x05:
+            self.state = "ready"
+            return self._crc(self.atqb())
+        if self.state == "ready" and data[0] == 0x1D and data[1:5] == self.pupi:
+            self.fsd = FS[data[6] & 0x0F]
+            self._cid = data[8] & 0x0F
+            self.state = "protocol"
+            self._reset_protocol()
+            return self._crc(bytes([self._cid]))
+        return b""
+
+    def _block(self, pcb: int, inf: bytes = b"") -> bytes:
+        self._last_block = self._crc(bytes([pcb]) + inf)
+        return self._last_block
+
+    def _process_block(self, data: bytes) -> bytes:
+        pcb = data[0]
+        # PPS
+        if self.mode == "A" and (pcb & 0xF0) == 0xD0:
+            return self._crc(data[:1])
+        if len(data) + 2 > self.fsc:
+            raise Exception(f"Frame of {len(data) + 2} bytes larger than the card FSC ({self.fsc} bytes)")
+        self.nb_tpdus += 1
+        inf = data[1 + ((pcb & 0x08) >> 3) + ((pcb & 0x04) >> 2):]
+        block_nb = pcb & 0x01
+
+        # I-block
+        if (pcb & 0xC0) == 0x00:
+            self._command += inf
+            if pcb & 0x10:
+                # R(ACK)
+                self._block_nb = block_nb
+                return self._block(0xA2 | block_nb)
+            apdu, self._command = self._command, b""
+            if self.processing_time:
+                time.sleep(self.processing_time)
+            self._chain_response(self.apdu_handler(apdu), block_nb)
+            if self.wtx:
+                self._wtx_left = self.wtx - 1
+                return self._block(0xF2, bytes([self.wtxm]))
+            return self._next_response()
+
+        # R-block
+        if (pcb & 0xC0) == 0x80:
+            if block_nb == self._block_nb:
+                # R(NAK) or R(ACK) of the current block number: retransmission
+                return self._last_block
+            if pcb & 0x10:
+                # R(NAK) of another block number: the card did not get the last block (R(ACK))
+                return self._crc(bytes([0xA2 | self._block_nb]))
+            self._block_nb = block_nb
+            return self._next_response()
+
+        # S-block
+        if (pcb & 0x30) == 0x30:
+            if self._wtx_left:
+                self._wtx_left -= 1
+                return self._block(0xF2, bytes([self.wtxm]))
+            return self._next_response()
+        # DESELECT
+        self.state = "idle"
+        return self._block(0xC2)
+
+    def _chain_response(self, rapdu: bytes, block_nb: int):
+        size = self.fsd - 3
+        self._response = [rapdu[hit:hit + size] for hit in range(0, max(len(rapdu), 1), size)]
+        self._block_nb = block_nb
+
+    def _next_response(self) -> bytes:
+        if not self._response:
+            return self._block(0xA2 | self._block_nb)
+        inf = self._response.pop(0)
+        chaining = 0x10 if self._response else 0x00
+        return self._block(0x02 | chaining | self._block_nb, inf)
@@ -0,0 +1,243 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import multiprocessing
+import multiprocessing.connection
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class ReaderStats(object):
+
+    def __init__(self, port: str):
+        self.port = port
+        self.jobs = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.jobs / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return f"{self.port}: {self.jobs} jobs, {self.errors} errors, {self.throughput:.1f} jobs/s"
+
+
+def open_session(drv_class, session_class, port, drv_kwargs, session_kwargs):
+    drv = drv_class(port, **drv_kwargs)
+    session = session_class(drv=drv, **session_kwargs)
+    session.connect()
+    return session
+
+
+def run_jobs(port, session, jobs, put_result):
+    """
+    Run the jobs of the queue with one session, until the None sentinel.
+    """
+    stats = ReaderStats(port)
+    start = time.perf_counter()
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        index, job = item
+        job_start = time.perf_counter()
+        try:
+            result = job(session)
+        except Exception as e:
+            result = e
+            stats.errors += 1
+        stats.busy += time.perf_counter() - job_start
+        stats.jobs += 1
+        put_result(index, result)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def _process_worker(drv_class, session_class, port, drv_kwargs, session_kwargs, jobs, results):
+    """
+    :param results: write end of the pipe of this worker
+    """
+    try:
+        session = open_session(drv_class, session_class, port, drv_kwargs, session_kwargs)
+    except Exception as e:
+        logging.getLogger().error(f"Cannot open reader {port}: {e}")
+        results.send((None, ReaderStats(port)))
+        return
+    stats = run_jobs(port, session, jobs, lambda index, result: results.send((index, result)))
+    session._drv.close()
+    results.send((None, stats))
+
+
+class ReaderPool(object):
+    """
+    Several readers of the same type, driven concurrently.
+
+    A job is a callable taking a connected session (e.g. Iso14443ASession) and
+    returning a result. Jobs are taken from a common queue by one worker per
+    reader: a thread (serial I/O releases the GIL), or a process when
+    use_processes is set. In the latter case, each process opens its own
+    reader and the jobs and their results must be picklable.
+
+        pool = ReaderPool(FlipperZero, Iso15693Session, drv_kwargs={"debug": False})
+        pool.open()
+        memories = pool.run([read_memory] * 1000)
+        pool.close()
+
+    :param drv_class: driver class, or any callable port -> driver
+    :param ports: ports to use. By default, every port found by drv_class.search_ports()
+
+    Each reader process sends its results through its own pipe: a process which
+    dies (crash, OOM kill) closes it, and the job it was running gets an exception
+    as result.
+    """
+
+    def __init__(self, drv_class, session_class, ports=None, drv_kwargs=None, session_kwargs=None,
+                 use_processes=False):
+        self._drv_class = drv_class
+        self._session_class = session_class
+        self._drv_kwargs = drv_kwargs if drv_kwargs is not None else {}
+        self._session_kwargs = session_kwargs if session_kwargs is not None else {}
+        self.use_processes = use_processes
+        self.ports = list(ports) if ports is not None else drv_class.search_ports()
+        if not self.ports:
+            raise Exception("No reader found")
+        self.sessions = {}
+        self.stats = {}
+        self._logger = logging.getLogger()
+
+    def __len__(self):
+        return len(self.ports)
+
+    def _open_session(self, port):
+        return open_session(self._drv_class, self._session_class, port, self._drv_kwargs, self._session_kwargs)
+
+    def open(self):
+        """
+        Open and connect all the readers in parallel. With processes, readers are opened by run().
+        """
+        if self.use_processes:
+            return
+        with ThreadPoolExecutor(len(self.ports)) as executor:
+            futures = [executor.submit(self._open_session, port) for port in self.ports]
+            wait(futures)
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            # Do not leak the readers already opened
+            for future in futures:
+                if future.exception() is None:
+                    future.result()._drv.close()
+            raise errors[0]
+        self.sessions = {port: future.result() for port, future in zip(self.ports, futures)}
+
+    def close(self):
+        for session in self.sessions.values():
+            session._drv.close()
+        self.sessions = {}
+
+    def run(self, jobs) -> list:
+        """
+        Run the jobs on all the readers. Results are returned in the order of the jobs,
+        a job raising an exception has the exception as result.
+        """
+        jobs = list(jobs)
+        if self.use_processes:
+            results = self._run_processes(jobs)
+        else:
+            results = self._run_threads(jobs)
+        self.report()
+        return results
+
+    def _run_threads(self, jobs) -> list:
+        results = [None] * len(jobs)
+        job_queue = queue.Queue()
+        for item in enumerate(jobs):
+            job_queue.put(item)
+        for _ in self.sessions:
+            job_queue.put(None)
+
+        def put_result(index, result):
+            results[index] = result
+
+        def worker(port, session):
+            self.stats[port] = run_jobs(port, session, job_queue, put_result)
+
+        threads = [threading.Thread(target=worker, args=(port, session)) for port, session in self.sessions.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _run_processes(self, jobs) -> list:
+        job_queue = multiprocessing.Queue()
+        for item in enumerate(jobs):
+            job_queue.put(item)
+        for _ in self.ports:
+            job_queue.put(None)
+
+        workers = {}
+        for port in self.ports:
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_process_worker,
+                                              args=(self._drv_class, self._session_class, port, self._drv_kwargs,
+                                                    self._session_kwargs, job_queue, writer))
+            process.start()
+            # The pipe is closed once the process has ended, whatever the way
+            writer.close()
+            workers[reader] = (port, process)
+
+        missing = object()
+        results = [missing] * len(jobs)
+        finished = set()
+        while workers:
+            for reader in multiprocessing.connection.wait(list(workers)):
+                port, process = workers[reader]
+                try:
+                    index, result = reader.recv()
+                except EOFError:
+                    del workers[reader]
+                    reader.close()
+                    process.join()
+                    if port not in finished:
+                        self._logger.error(f"Reader {port} process died (exit code {process.exitcode})")
+                        self.stats[port] = ReaderStats(port)
+                    continue
+                if index is None:
+                    self.stats[port] = result
+                    finished.add(port)
+                else:
+                    results[index] = result
+
+        if missing in results:
+            # Job of a dead reader process, or jobs left in the queue if they all died
+            job_queue.cancel_join_thread()
+            results = [Exception("Job lost: its reader process died") if result is missing else result
+                       for result in results]
+        return results
+
+    @property
+    def throughput(self) -> float:
+        return sum(stats.throughput for stats in self.stats.values())
+
+    def report(self):
+        self._logger.info("Reader pool:")
+        for stats in self.stats.values():
+            self._logger.info(f"\t{stats}")
+        self._logger.info(f"\tTotal: {self.throughput:.1f} jobs/s")
+        self._logger.info("")
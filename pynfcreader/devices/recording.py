@@ -0,0 +1,125 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import collections
+import csv
+import threading
+import time
+from pathlib import Path
+
+from pynfcreader.devices import trace
+
+
+class Recorder(object):
+    """
+    Background recorder of the serial exchanges, in the CSV format replayed by SerialCnxVirtual,
+    or in the binary trace format (pynfcreader.devices.trace) when the path ends with ".trace".
+
+    record() only appends the raw event to a deque (atomic, no lock taken) so it
+    costs almost nothing on the I/O path. A writer thread drains the events in
+    batches, encodes them and flushes the file. close(), also registered at exit,
+    writes the remaining events and closes the file.
+
+    An error of the writer thread (e.g. data which is not UTF-8 in the CSV text
+    format) stops the recording: it is raised by the next record(), and by close().
+    """
+
+    def __init__(self, path: str, batch_size: int = 1024, flush_interval: float = 0.5,
+                 device: int = trace.DEVICE_UNKNOWN):
+        self.path = path
+        self.device = device
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events = collections.deque()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._error = None
+        self._file = self._open()
+        self._thread = threading.Thread(target=self._run, name="pynfcreader-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open(self):
+        if trace.is_trace(self.path):
+            self._trace = trace.TraceWriter(self.path, self.device)
+            return self._trace
+        self._trace = None
+        f = Path(self.path).open(mode="w", newline="", encoding="utf-8")
+        self._writer = csv.writer(f)
+        self._writer.writerow(["Type", "Data"])
+        return f
+
+    def _write_batch(self, batch: list):
+        if self._trace is not None:
+            write = self._trace.write
+            for timestamp, mode, data, binary in batch:
+                write(mode, data, binary, timestamp)
+            return
+        self._writer.writerows([mode, data.hex() if binary else data.decode()]
+                               for _, mode, data, binary in batch if mode != "M")
+
+    def record(self, mode: str, data: bytes, binary: bool = False):
+        if self._error is not None:
+            raise Exception(f"Recording of {self.path} failed: {self._error}") from self._error
+        if self._closed:
+            raise Exception(f"Recorder of {self.path} is closed")
+        if type(data) is not bytes:
+            data = bytes(data)
+        self._events.append((time.monotonic_ns(), mode, data, binary))
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    def mark(self, label: str):
+        """
+        Record a marker (e.g. the session command being run). Markers are only kept in the trace format.
+        """
+        self.record("M", label.encode())
+
+    def _drain(self):
+        events = self._events
+        while events:
+            batch = []
+            try:
+                for _ in range(self.batch_size):
+                    batch.append(events.popleft())
+            except IndexError:
+                pass
+            self._write_batch(batch)
+        self._file.flush()
+
+    def _run(self):
+        try:
+            while not self._closed:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self._drain()
+        except Exception as e:
+            self._error = e
+            self._events.clear()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+        try:
+            if self._error is None:
+                self._drain()
+        finally:
+            self._file.close()
+        if self._error is not None:
+            raise Exception(f"Recording of {self.path} failed: {self._error}") from self._error
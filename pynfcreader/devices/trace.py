@@ -0,0 +1,251 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact binary trace of the serial exchanges.
+
+File layout:
+  - header: MAGIC (7 bytes) + format version (1 byte)
+  - records, each one being:
+      - timestamp: monotonic clock, in ns (8 bytes, little endian)
+      - kind: direction (R, W or M for a marker) + BINARY flag (1 byte)
+      - device type (1 byte)
+      - data length (2 bytes, little endian)
+      - data
+
+The BINARY flag tells that the data is not text (HydraNFC BBIO, Flipper Zero binary framing).
+A marker record carries a label (e.g. the session command being run), it is not part of the exchanges.
+"""
+
+import array
+import collections
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+MAGIC = b"PNFCTRC"
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+SUFFIX = ".trace"
+INDEX_SUFFIX = ".idx"
+# Bytes hashed at the beginning and at the end of a trace to check its index
+INDEX_DIGEST_SIZE = 4096
+
+RECORD_HEADER = struct.Struct("<QBBH")
+
+DIRECTION_R = 0
+DIRECTION_W = 1
+DIRECTION_M = 2
+BINARY = 0x80
+
+DIRECTIONS = {"R": DIRECTION_R, "W": DIRECTION_W, "M": DIRECTION_M}
+DIRECTION_NAMES = {value: key for key, value in DIRECTIONS.items()}
+
+DEVICE_UNKNOWN = 0
+DEVICE_FLIPPER_ZERO = 1
+DEVICE_HYDRA_NFC = 2
+DEVICE_HYDRA_NFC_V2 = 3
+
+TraceRecord = collections.namedtuple("TraceRecord", "timestamp direction device binary data")
+
+
+def is_trace(path) -> bool:
+    return str(path).endswith(SUFFIX)
+
+
+class TraceWriter(object):
+    """
+    Streaming writer of the binary trace format.
+
+        with TraceWriter("capture.trace", device=DEVICE_FLIPPER_ZERO) as trace:
+            trace.write("W", b"nfc reqa\\r\\n")
+    """
+
+    def __init__(self, path, device: int = DEVICE_UNKNOWN):
+        self.device = device
+        self._file = Path(path).open(mode="wb")
+        self._file.write(HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, direction: str, data: bytes, binary: bool = False, timestamp: int = None, device: int = None):
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        if device is None:
+            device = self.device
+        if len(data) > 0xFFFF:
+            raise Exception(f"Trace record too long: {len(data)} bytes")
+        kind = DIRECTIONS[direction] | (BINARY if binary else 0)
+        self._file.write(RECORD_HEADER.pack(timestamp, kind, device, len(data)))
+        self._file.write(data)
+
+    def write_record(self, record: TraceRecord):
+        self.write(record.direction, record.data, record.binary, record.timestamp, record.device)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class TraceReader(object):
+    """
+    Streaming reader of the binary trace format: iterate over it to get TraceRecord.
+    """
+
+    def __init__(self, path):
+        self._file = Path(path).open(mode="rb")
+        if self._file.read(len(HEADER)) != HEADER:
+            self._file.close()
+            raise Exception(f"{path} is not a pyNFCReader trace (version {VERSION})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        read = self._file.read
+        unpack = RECORD_HEADER.unpack
+        size = RECORD_HEADER.size
+        while True:
+            header = read(size)
+            if len(header) < size:
+                return
+            timestamp, kind, device, length = unpack(header)
+            yield TraceRecord(timestamp, DIRECTION_NAMES[kind & ~BINARY], device, bool(kind & BINARY), read(length))
+
+    def close(self):
+        self._file.close()
+
+
+class MappedTrace(object):
+    """
+    Read-only, memory-mapped trace with random access to its records.
+
+    The record offsets are saved in a side index (<trace>.idx), rebuilt when
+    missing or stale, so that opening a large trace costs one read of the index.
+    The index starts with the size, the modification time and a digest of the
+    first and last bytes of the indexed trace.
+    A MappedTrace can be shared by several replay cursors (SerialCnxReplay).
+    """
+
+    def __init__(self, path, save_index: bool = True):
+        self.path = Path(path)
+        with self.path.open(mode="rb") as f:
+            self._mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(HEADER)] != HEADER:
+            self._map.close()
+            raise Exception(f"{path} is not a pyNFCReader trace (version {VERSION})")
+        self._index_path = Path(str(path) + INDEX_SUFFIX)
+        self.offsets = self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+            if save_index:
+                self._save_index()
+
+    def _fingerprint(self) -> array.array:
+        digest = hashlib.blake2b(self._map[:INDEX_DIGEST_SIZE], digest_size=8)
+        digest.update(self._map[-INDEX_DIGEST_SIZE:])
+        return array.array("Q", [len(self._map), self._mtime_ns, int.from_bytes(digest.digest(), "little")])
+
+    def _load_index(self):
+        if not self._index_path.exists():
+            return None
+        offsets = array.array("Q")
+        with self._index_path.open(mode="rb") as f:
+            offsets.frombytes(f.read())
+        fingerprint = self._fingerprint()
+        if offsets[:len(fingerprint)] != fingerprint:
+            return None
+        return offsets[len(fingerprint):]
+
+    def _save_index(self):
+        tmp = Path(str(self._index_path) + ".tmp")
+        with tmp.open(mode="wb") as f:
+            self._fingerprint().tofile(f)
+            self.offsets.tofile(f)
+        os.replace(tmp, self._index_path)
+
+    def _build_index(self) -> array.array:
+        offsets = array.array("Q")
+        unpack_from = RECORD_HEADER.unpack_from
+        size = RECORD_HEADER.size
+        offset = len(HEADER)
+        end = len(self._map)
+        while offset + size <= end:
+            offsets.append(offset)
+            offset += size + unpack_from(self._map, offset)[3]
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> TraceRecord:
+        offset = self.offsets[index]
+        timestamp, kind, device, length = RECORD_HEADER.unpack_from(self._map, offset)
+        start = offset + RECORD_HEADER.size
+        return TraceRecord(timestamp, DIRECTION_NAMES[kind & ~BINARY], device, bool(kind & BINARY),
+                           self._map[start:start + length])
+
+    def direction(self, index: int) -> str:
+        return DIRECTION_NAMES[self._map[self.offsets[index] + 8] & ~BINARY]
+
+    def find_marker(self, label: str, start: int = 0) -> int:
+        """
+        :return: index of the first marker with this label from start, -1 if not found
+        """
+        data = label.encode()
+        for index in range(start, len(self.offsets)):
+            if self.direction(index) == "M" and self[index].data == data:
+                return index
+        return -1
+
+    def close(self):
+        self._map.close()
+
+
+def csv_to_trace(csv_path, trace_path, device: int = DEVICE_UNKNOWN, binary: bool = False):
+    """
+    Convert a SerialCnx CSV recording. Timestamps are not recorded in CSV, they are set to 0.
+
+    :param binary: the CSV rows are hex encoded binary data (HydraNFC recordings)
+    """
+    with Path(csv_path).open(mode="r", encoding="utf-8", newline="") as f, TraceWriter(trace_path, device) as trace:
+        reader = csv.reader(f)
+        next(reader)
+        for mode, data in reader:
+            trace.write(mode, bytes.fromhex(data) if binary else data.encode(), binary, timestamp=0)
+
+
+def trace_to_csv(trace_path, csv_path):
+    """
+    Convert a trace to the SerialCnx CSV recording format. Markers are dropped.
+    """
+    with Path(csv_path).open(mode="w", encoding="utf-8", newline="") as f, TraceReader(trace_path) as trace:
+        writer = csv.writer(f)
+        writer.writerow(["Type", "Data"])
+        writer.writerows([record.direction, record.data.hex() if record.binary else record.data.decode()]
+                         for record in trace if record.direction != "M")
@@ -0,0 +1,240 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+
+from pynfcreader.devices.devices import Devices
+from pynfcreader.tools.tracing import get_logger
+
+# Error codes
+ERROR_NOT_SUPPORTED = 0x01
+ERROR_BLOCK_NOT_AVAILABLE = 0x10
+ERROR_BLOCK_LOCKED = 0x12
+
+
+class Vicc(object):
+    """
+    ISO 15693 tag (VICC) simulated by ViccSimulator.
+
+    :param uid: UID, MSB first (E0 ...) as printed by the session
+    :param memory: initial memory content, zero-filled up to nb_blocks * block_size
+    :param locked: numbers of the locked blocks
+    """
+
+    def __init__(self, uid: bytes, nb_blocks: int = 28, block_size: int = 4, memory: bytes = b"", locked=(),
+                 dsfid: int = 0x00, afi: int = 0x00, ic_reference: int = 0x01):
+        assert len(uid) == 8
+        assert 1 <= nb_blocks <= 256 and 1 <= block_size <= 32
+        self.uid = uid
+        self.nb_blocks = nb_blocks
+        self.block_size = block_size
+        self.memory = bytearray(memory.ljust(nb_blocks * block_size, b"\x00"))
+        self.locked = [block in locked for block in range(nb_blocks)]
+        self.dsfid = dsfid
+        self.afi = afi
+        self.ic_reference = ic_reference
+        self.state = "ready"
+
+    @property
+    def uid_lsb(self) -> bytes:
+        return self.uid[::-1]
+
+    @property
+    def uid_int(self) -> int:
+        return int.from_bytes(self.uid, "big")
+
+    def block(self, block_nb: int) -> bytes:
+        return bytes(self.memory[block_nb * self.block_size:(block_nb + 1) * self.block_size])
+
+    def _read_blocks(self, first: int, nb: int, option: bool) -> bytes:
+        if first + nb > self.nb_blocks:
+            return bytes([0x01, ERROR_BLOCK_NOT_AVAILABLE])
+        resp = bytearray(b"\x00")
+        for block_nb in range(first, first + nb):
+            if option:
+                resp.append(int(self.locked[block_nb]))
+            resp += self.block(block_nb)
+        return bytes(resp)
+
+    def _write_blocks(self, first: int, nb: int, data: bytes) -> bytes:
+        if first + nb > self.nb_blocks or len(data) != nb * self.block_size:
+            return bytes([0x01, ERROR_BLOCK_NOT_AVAILABLE])
+        if any(self.locked[first:first + nb]):
+            return bytes([0x01, ERROR_BLOCK_LOCKED])
+        self.memory[first * self.block_size:(first + nb) * self.block_size] = data
+        return b"\x00"
+
+    def inventory(self) -> bytes:
+        return bytes([0x00, self.dsfid]) + self.uid_lsb
+
+    def process(self, flags: int, command: int, params: bytes):
+        """
+        :return: the response, None when the tag does not answer
+        """
+        option = bool(flags & 0x40)
+        if command == 0x02:
+            self.state = "quiet"
+            return None
+        if command == 0x20:
+            return self._read_blocks(params[0], 1, option)
+        if command == 0x21:
+            return self._write_blocks(params[0], 1, params[1:])
+        if command == 0x23:
+            return self._read_blocks(params[0], params[1] + 1, option)
+        if command == 0x24:
+            return self._write_blocks(params[0], params[1] + 1, params[2:])
+        if command == 0x25:
+            self.state = "selected"
+            return b"\x00"
+        if command == 0x26:
+            self.state = "ready"
+            return b"\x00"
+        if command == 0x2B:
+            # DSFID, AFI, memory size and IC reference present
+            return (bytes([0x00, 0x0F]) + self.uid_lsb +
+                    bytes([self.dsfid, self.afi, self.nb_blocks - 1, self.block_size - 1, self.ic_reference]))
+        if command == 0x2C:
+            first, nb = params[0], params[1] + 1
+            if first + nb > self.nb_blocks:
+                return bytes([0x01, ERROR_BLOCK_NOT_AVAILABLE])
+            return b"\x00" + bytes(int(locked) for locked in self.locked[first:first + nb])
+        return bytes([0x01, ERROR_NOT_SUPPORTED])
+
+
+class ViccSimulator(Devices):
+    """
+    Software ISO 15693 reader field with any number of simulated tags (Vicc), seen through
+    the reader driver interface. Responses are returned without their CRC, as a reader returns them.
+
+    Requests are executed by the tags according to their state (ready, quiet, selected)
+    and to the request flags (select, address, AFI, inventory mask). When several tags
+    answer, the reader sees a collision: write() returns nothing and collision is set.
+
+    A 16 slots inventory returns the answer of the first slot, send_eof() switches to
+    the next slot and returns its answer (see Iso15693Session.inventory_all()).
+
+        tags = [Vicc(uid=bytes.fromhex(f"E0040100{hit:08X}")) for hit in range(100)]
+        hn = Iso15693Session(drv=ViccSimulator(tags))
+
+    :param response_time: response time (seconds) of the tags to each request
+    """
+
+    def __init__(self, tags=None, response_time: float = 0.0, debug: bool = False):
+        self.tags = list(tags) if tags is not None else [Vicc(uid=bytes.fromhex("E004010012345678"))]
+        self.response_time = response_time
+        self.field = False
+        self.collision = False
+        self.nb_requests = 0
+        self.nb_collisions = 0
+        self._slots = []
+
+        self.__logger = get_logger(debug)
+
+        self._python_ver = sys.version[0]
+
+    def connect(self):
+        self.__logger.info("Connect to the VICC simulator")
+        self.__logger.info("")
+
+    def close(self):
+        pass
+
+    def get_logger(self):
+        return self.__logger
+
+    def set_mode_iso15693(self):
+        pass
+
+    def set_mode_iso14443A(self):
+        raise Exception("ISO 14443 is not supported by the VICC simulator")
+
+    def set_mode_iso14443B(self):
+        raise Exception("ISO 14443 is not supported by the VICC simulator")
+
+    def field_off(self):
+        self.__logger.debug("Field off")
+        self.field = False
+
+    def field_on(self):
+        self.__logger.debug("Field on")
+        if not self.field:
+            for tag in self.tags:
+                tag.state = "ready"
+        self.field = True
+
+    def write_bits(self, data=b"", num_bits=0):
+        return b""
+
+    def _answer(self, responses: list) -> bytes:
+        if responses and self.response_time:
+            time.sleep(self.response_time)
+        self.collision = len(responses) > 1
+        if self.collision:
+            self.nb_collisions += 1
+            return b""
+        return responses[0] if responses else b""
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        self.nb_requests += 1
+        self._slots = []
+        if not self.field:
+            return self._answer([])
+        data = bytes(data)
+        flags, command = data[0], data[1]
+        if flags & 0x04:
+            return self._inventory(flags, data[2:])
+
+        params = data[2:]
+        if flags & 0x10:
+            tags = [tag for tag in self.tags if tag.state == "selected"]
+        elif flags & 0x20:
+            uid, params = params[:8][::-1], params[8:]
+            tags = [tag for tag in self.tags if tag.uid == uid]
+            if command == 0x25:
+                # A selected tag receiving a Select with another UID returns to the ready state
+                for tag in self.tags:
+                    if tag.state == "selected" and tag.uid != uid:
+                        tag.state = "ready"
+        else:
+            tags = [tag for tag in self.tags if tag.state != "quiet"]
+
+        responses = [tag.process(flags, command, params) for tag in tags]
+        return self._answer([resp for resp in responses if resp is not None])
+
+    def _inventory(self, flags: int, params: bytes) -> bytes:
+        afi = None
+        if flags & 0x10:
+            afi, params = params[0], params[1:]
+        mask_len = params[0]
+        mask = int.from_bytes(params[1:1 + (mask_len + 7) // 8], "little") & ((1 << mask_len) - 1)
+        tags = [tag for tag in self.tags
+                if tag.state != "quiet"
+                and (afi is None or afi == 0 or tag.afi == afi)
+                and (tag.uid_int & ((1 << mask_len) - 1)) == mask]
+
+        if flags & 0x20:
+            return self._answer([tag.inventory() for tag in tags])
+
+        self._slots = [[] for _ in range(16)]
+        for tag in tags:
+            self._slots[(tag.uid_int >> mask_len) & 0xF].append(tag.inventory())
+        self._slots.reverse()
+        return self._answer(self._slots.pop())
+
+    def send_eof(self) -> bytes:
+        """
+        EOF of a 16 slots inventory: switch to the next slot.
+        """
+        return self._answer(self._slots.pop() if self._slots else [])
@@ -0,0 +1,62 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Session requests shared by the blocking and the asyncio drivers.
+
+A request is written once, as a generator yielding each driver call (or session
+request) and getting its response back:
+
+    def _send_pps_exchange(self, cid):
+        data = bytes([0xD0 + cid, 0x01])
+        resp = yield self._drv.write(data=data, resp_len=3, transmitter_add_crc=True)
+        return self.check_pps(resp, cid)
+
+    def send_pps(self, cid=0):
+        return self._run(self._send_pps_exchange(cid))
+
+With a blocking driver, the call has already returned the response, which run()
+sends back. With an asyncio driver, the call is a coroutine: run_async() awaits
+it, so send_pps() returns a coroutine.
+"""
+
+
+def run(exchange):
+    """
+    :return: the value returned by the exchange generator
+    """
+    try:
+        resp = next(exchange)
+        while True:
+            resp = exchange.send(resp)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_async(exchange):
+    """
+    asyncio version of run(): the yielded coroutines are awaited, and their
+    exceptions raised in the exchange.
+    """
+    try:
+        request = next(exchange)
+        while True:
+            try:
+                resp = await request
+            except BaseException as error:
+                request = exchange.throw(error)
+            else:
+                request = exchange.send(resp)
+    except StopIteration as stop:
+        return stop.value
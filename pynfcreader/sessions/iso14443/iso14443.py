@@ -13,13 +13,45 @@
 # limitations under the License.
 
 
+import contextlib
+import time
+
+from pynfcreader.sessions.exchange import run, run_async
 from pynfcreader.sessions.iso14443.tpdu import Tpdu
-from pynfcreader.tools import utils
+from pynfcreader.tools.crc import CRC_A
+from pynfcreader.tools.latency import LatencyRecorder
+from pynfcreader.tools.tracing import (ApduReceived, ApduSent, Comment, FrameReceived, FrameSent, LoggingSink,
+                                       Tracer)
 
+# Frame sizes (FSD, FSC) by FSDI/FSCI
+FRAME_SIZES = (16, 24, 32, 40, 48, 64, 96, 128, 256)
 
-class Iso14443Session(object):
 
-    def __init__(self, cid=0, nad=0, drv=None, block_size=16, mode: str = "reader"):
+def frame_size(fsxi: int) -> int:
+    # FSDI/FSCI above 8 (RFU, or frames larger than 256 bytes) are read as 256 bytes
+    return FRAME_SIZES[min(fsxi, 8)]
+
+
+class Iso14443Session(object):
+    """
+    :param block_size: size of the INF field of the I-blocks. By default, the I-blocks fill
+                       the card frames, whose size (FSC) is given by the ATS or the ATQB
+    :param check_crc: check the CRC of the TPDU responses
+    :param retries: number of R(NAK) (or R(ACK) during the card chaining) sent to get
+                    a missing or corrupted TPDU response, before raising an exception
+    :param tracer: receives the frames, APDUs and comments of the session (see pynfcreader.tools.tracing).
+                   By default, they are logged in the driver logger
+    :param latency: records the durations of the session and driver requests (see pynfcreader.tools.latency)
+
+    The requests are exchange generators (see pynfcreader.sessions.exchange), run by _run().
+    """
+
+    crc = CRC_A
+    _run = staticmethod(run)
+
+    def __init__(self, cid=0, nad=0, drv=None, block_size: int = None, mode: str = "reader",
+                 check_crc: bool = False, retries: int = 2, tracer: Tracer = None,
+                 latency: LatencyRecorder = None):
         self._init_pcb_block_nb()
         self._addNAD: bool = False
         self._addCID: bool = False
@@ -30,12 +62,24 @@ class Iso14443Session(object):
         self._pcb_block_number = None
         self._drv = drv
         self._logger = self._drv.get_logger()
+        # Default FSC and FSD, until the ATS (or ATQB) and RATS (or ATTRIB)
+        self.fsc = 32
+        self.fsd = 16
+        self.tracer = tracer if tracer is not None else Tracer(LoggingSink(self._logger))
+        self.latency = latency
+        if latency is not None:
+            self._drv.latency = latency
         self.block_size = block_size
         assert mode in ["card", "reader"]
         if mode == "card":
             self.card_emu = True
         else:
             self.card_emu = False
+        self.check_crc = check_crc
+        self.retries = retries
+        self.nb_crc_errors = 0
+        self.nb_timeouts = 0
+        self.nb_retries = 0
 
     def connect(self):
         self._drv.connect()
@@ -50,19 +94,42 @@ class Iso14443Session(object):
         self._drv.field_off()
 
     def polling(self):
-        self.send_reqa()
-        self.send_select_full()
-        self.send_pps()
+        return self._run(self._polling_exchange())
+
+    def _polling_exchange(self):
+        with self.transaction("session.polling"):
+            yield self.send_reqa()
+            yield self.send_select_full()
+            yield self.send_pps()
+
+    def transaction(self, name: str):
+        """
+        Latency span of a block of requests (see LatencyRecorder.span), nothing without recorder
+        """
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.span(name)
 
     @property
     def block_size(self):
+        if self._block_size is None:
+            # PCB, CID, NAD and CRC
+            return self.fsc - 3 - int(self._addCID) - int(self._addNAD)
         return self._block_size
 
     @block_size.setter
     def block_size(self, size):
-        assert (0 <= size <= 256)
+        assert size is None or (0 <= size <= 256)
         self._block_size = size
 
+    @property
+    def max_fsdi(self) -> int:
+        """
+        FSDI of the largest frames the driver can receive
+        """
+        max_frame_size = getattr(self._drv, "max_frame_size", 256)
+        return max(fsdi for fsdi, size in enumerate(FRAME_SIZES) if size <= max_frame_size)
+
     def get_and_update_iblock_pcb_number(self):
         self._iblock_pcb_number ^= 1
         if self.card_emu:
@@ -71,17 +138,24 @@ class Iso14443Session(object):
             return self._iblock_pcb_number ^ 1
 
     def send_pps(self, cid=0x0, pps1=False, dri=0x0, dsi=0x0):
+        return self._run(self._send_pps_exchange(cid, pps1, dri, dsi))
+
+    def _send_pps_exchange(self, cid, pps1, dri, dsi):
         self._logger.info("PPS")
         self._logger.info("\tPCD selected options:")
-        pps0_pps1 = [0x01]
+        # PPS0: PPS1 present (b5). PPS1: DSI (b4-b3), DRI (b2-b1)
+        pps0_pps1 = [0x11 if pps1 else 0x01]
         if pps1:
-            pps0_pps1.append(dri << 4 + dsi)
+            pps0_pps1.append((dsi << 2) | dri)
         self._logger.info("\tCID : 0x%X" % cid)
         self._logger.info("\tPPS1 %stransmitted" % ("not " * (not pps1)))
 
         data = bytes([0xD0 + cid] + pps0_pps1)
         self.comment_data("PPS:", data)
-        resp = self._drv.write(data=data, resp_len=3, transmitter_add_crc=True)
+        resp = yield self._drv.write(data=data, resp_len=3, transmitter_add_crc=True)
+        return self.check_pps(resp, cid)
+
+    def check_pps(self, resp, cid=0x0):
         self.comment_data("PPS response:", resp)
         if resp[0] == (0xD0 + cid):
             self._logger.info("\tPPS accepted")
@@ -122,7 +196,7 @@ class Iso14443Session(object):
             pcb |= 0x08
             data = f"{self._cid:02X} "
 
-        if block_number:
+        if block_number is not None:
             pcb |= block_number
         else:
             pcb |= self.get_and_update_iblock_pcb_number()
@@ -187,67 +261,144 @@ class Iso14443Session(object):
 
         return block_lst
 
-    def _send_tpdu(self, tpdu: bytes, add_crc: bool = True) -> bytes:
-        self._logger.info("\t\t" + "TPDU command:")
-        for hit in utils.get_pretty_print_block(tpdu):
-            self._logger.info("\t\t" + hit)
-
-        resp = self._drv.write(data=tpdu, resp_len=16, transmitter_add_crc=add_crc)
+    def _send_tpdu(self, tpdu: bytes, add_crc: bool = True) -> Tpdu:
+        return self._run(self._send_tpdu_exchange(tpdu, add_crc))
+
+    def _send_tpdu_exchange(self, tpdu: bytes, add_crc: bool = True):
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        if self.tracer.enabled:
+            self.tracer.emit(FrameSent(time.monotonic_ns(), tpdu))
+
+        resp = yield self._drv.write(data=tpdu, resp_len=16, transmitter_add_crc=add_crc)
+        retry = self._build_retry(tpdu)
+        for _ in range(self.retries):
+            if not self._check_tpdu_resp(resp):
+                self.comment_data("\t\tTPDU retransmission request:", retry)
+                request = retry
+            elif self._is_iblock_lost(tpdu, resp):
+                self.comment_data("\t\tI-block not received by the card, sent again:", tpdu)
+                request = tpdu
+            else:
+                break
+            self.nb_retries += 1
+            resp = yield self._drv.write(data=request, resp_len=16, transmitter_add_crc=add_crc)
+        else:
+            if not self._check_tpdu_resp(resp) or self._is_iblock_lost(tpdu, resp):
+                raise Exception(f"No valid TPDU response after {self.retries} retries")
 
+        if self.tracer.enabled:
+            self.tracer.emit(FrameReceived(time.monotonic_ns(), resp))
         resp = Tpdu(resp)
-        self._logger.info("\t\t" + "TPDU response:")
-        for hit in utils.get_pretty_print_block(resp.get_tpdu()):
-            self._logger.info("\t\t" + hit)
+        if self.latency is not None:
+            self.latency.record_span("session.send_tpdu", start, time.perf_counter_ns())
         return resp
 
+    def _build_retry(self, tpdu: bytes) -> bytes:
+        """
+        Block asking the card to send its last block again: the R(ACK) itself during
+        the card chaining, R(NAK) with the current block number otherwise.
+        """
+        if (tpdu[0] & 0xF6) == 0xA2:
+            return tpdu
+        block_number = self._iblock_pcb_number if self.card_emu else self._iblock_pcb_number ^ 1
+        return self.build_rblock_ll(ack=False, cid=self._addCID, block_number=block_number)
+
+    @staticmethod
+    def _is_iblock_lost(tpdu: bytes, resp: bytes) -> bool:
+        """
+        ISO 14443-4 rule 6: an R(ACK) with another block number than the I-block
+        sent means that the card did not receive it.
+        """
+        return (tpdu[0] & 0xC0) == 0x00 and (resp[0] & 0xF6) == 0xA2 and (resp[0] ^ tpdu[0]) & 0x01 == 1
+
+    def _check_tpdu_resp(self, resp: bytes) -> bool:
+        # An empty response is a timeout (FWT elapsed)
+        if not resp:
+            self.nb_timeouts += 1
+            self.comment("\t\tNo TPDU response")
+            return False
+        if self.check_crc and (len(resp) < 3 or not self.crc.check(resp)):
+            self.nb_crc_errors += 1
+            self.comment_data("\t\tTPDU response with a wrong CRC:", resp)
+            return False
+        return True
+
     def send_apdu(self, apdu):
+        return self._run(self._send_apdu_exchange(apdu))
+
+    def _send_apdu_exchange(self, apdu):
+        if self.latency is not None:
+            begin = time.perf_counter_ns()
         apdu = bytes.fromhex(apdu)
-        self._logger.info("APDU command:")
-        for hit in utils.get_pretty_print_block(apdu):
-            self._logger.info("\t" + hit)
+        if self.tracer.enabled:
+            start = time.monotonic_ns()
+            self.tracer.emit(ApduSent(start, apdu))
 
         block_lst = self.chaining_iblock(data=apdu)
 
         if len(block_lst) == 1:
-            resp = self._send_tpdu(block_lst[0])
+            resp = yield from self._send_tpdu_exchange(block_lst[0])
         else:
-            self._logger.info("Block chaining, %d blocks to send" % len(block_lst))
+            self.comment(f"Block chaining, {len(block_lst)} blocks to send")
             for iblock in block_lst:
-                resp = self._send_tpdu(iblock)
+                resp = yield from self._send_tpdu_exchange(iblock)
 
         while resp.is_wtx():
             wtx_reply = resp.get_wtx_reply()
-            resp = self._send_tpdu(wtx_reply)
+            resp = yield from self._send_tpdu_exchange(wtx_reply)
 
         rapdu = resp.inf
 
         while resp.is_chaining():
             rblock = self.build_rblock()
 
-            resp = self._send_tpdu(rblock)
+            resp = yield from self._send_tpdu_exchange(rblock)
 
             rapdu += resp.inf
 
-        self._logger.info("APDU response:")
-        for hit in utils.get_pretty_print_block(rapdu):
-            self._logger.info("\t" + hit)
+        if self.tracer.enabled:
+            end = time.monotonic_ns()
+            self.tracer.emit(ApduReceived(end, rapdu, end - start))
+        if self.latency is not None:
+            self.latency.record_span("session.send_apdu", begin, time.perf_counter_ns())
         return rapdu
 
     def send_raw_bytes(self, data, transmitter_add_crc=True):
-        self._logger.info("Send Raw Bytes:")
+        return self._run(self._send_raw_bytes_exchange(data, transmitter_add_crc))
 
-        for hit in utils.get_pretty_print_block(data):
-            self._logger.info("\t" + hit)
+    def _send_raw_bytes_exchange(self, data, transmitter_add_crc):
+        self.comment_data("Send Raw Bytes:", data)
+        resp = yield self._drv.write(data=data, transmitter_add_crc=transmitter_add_crc)
+        self.comment_data("Response:", resp)
+        return resp
 
-        resp = self._drv.write(data=data, transmitter_add_crc=transmitter_add_crc)
-        self._logger.info("Response:")
+    def comment(self, msg):
+        if self.tracer.enabled:
+            self.tracer.emit(Comment(time.monotonic_ns(), msg, None))
 
-        for hit in utils.get_pretty_print_block(resp):
-            self._logger.info("\t" + hit)
+    def comment_data(self, msg, data):
+        if self.tracer.enabled:
+            self.tracer.emit(Comment(time.monotonic_ns(), msg, data))
 
-        return resp
 
-    def comment_data(self, msg, data):
-        self._logger.info(msg)
-        for hit in utils.get_pretty_print_block(data):
-            self._logger.info("\t" + hit)
+class AsyncIso14443Session(Iso14443Session):
+    """
+    asyncio version of Iso14443Session, to be used with an asyncio driver (AsyncFlipperZero, AsyncHydraNFCv2).
+
+    The requests (polling(), send_apdu()...) return coroutines.
+    """
+
+    _run = staticmethod(run_async)
+
+    async def connect(self):
+        await self._drv.connect()
+        await self._drv.set_mode_iso14443A()
+
+    async def field_on(self):
+        self._logger.info("field on")
+        await self._drv.field_on()
+
+    async def field_off(self):
+        self._logger.info("field off")
+        await self._drv.field_off()
@@ -13,23 +13,56 @@
 # limitations under the License.
 
 
-from pynfcreader.sessions.iso14443.iso14443 import Iso14443Session
+from pynfcreader.sessions.iso14443.iso14443 import AsyncIso14443Session, Iso14443Session, frame_size
 from pynfcreader.tools import utils
+from pynfcreader.tools.latency import LatencyRecorder
+from pynfcreader.tools.tracing import Tracer
 
 
 class Iso14443ASession(Iso14443Session):
 
-    def __init__(self, cid=0, nad=0, drv=None, block_size=16):
-        Iso14443Session.__init__(self, cid, nad, drv, block_size)
+    def __init__(self, cid=0, nad=0, drv=None, block_size: int = None, check_crc: bool = False, retries: int = 2,
+                 tracer: Tracer = None, latency: LatencyRecorder = None):
+        Iso14443Session.__init__(self, cid, nad, drv, block_size, check_crc=check_crc, retries=retries,
+                                 tracer=tracer, latency=latency)
 
     def connect(self):
         self._drv.connect()
         self._drv.set_mode_iso14443A()
 
-    def polling(self):
-        self.send_reqa()
-        self.send_select_full()
-        self.send_pps()
+    def polling_burst(self, fsdi=None, cid="0"):
+        """
+        Same activation as polling() for drivers able to send several frames at once (burst()).
+
+        REQA and the cascade level 1 anticollision go in a first burst. The SELECT needs the UID,
+        so it is sent with RATS and PPS in a second one.
+        """
+        with self._drv.burst() as burst:
+            burst.write_bits(b'\x26', 7)
+            burst.write(data=bytes([0x93, 0x20]), transmitter_add_crc=False)
+        atqa, uid1 = burst.results
+        self.comment_data("REQA (7 bits):", b"\x26")
+        if not atqa:
+            raise Exception("REQ A failure")
+        self.comment_data("ATQA:", atqa)
+        self.comment_data("Select cascade level 1:", bytes([0x93, 0x20]))
+        self.comment_data("Select cascade level 1 response:", uid1)
+
+        select = bytes([0x93, 0x70]) + uid1
+        rats = self._build_rats(fsdi, cid)
+        pps = bytes([0xD0, 0x01])
+        with self._drv.burst() as burst:
+            burst.write(data=select, resp_len=3, transmitter_add_crc=True)
+            burst.write(data=rats, resp_len=20, transmitter_add_crc=True)
+            burst.write(data=pps, resp_len=3, transmitter_add_crc=True)
+        sak, ats, pps_resp = burst.results
+        self.comment_data("Select cascade level 1:", select)
+        self.comment_data("Select cascade level 1 response:", sak)
+        ats = self.parse_ats(ats)
+        self.comment_data("PPS:", pps)
+        self.check_pps(pps_resp)
+
+        return uid1, ats
 
     def send_reqa(self):
         """
@@ -40,8 +73,11 @@ class Iso14443ASession(Iso14443Session):
           - nothing
           - ATQA (Answer To Request - Type A)
         """
+        return self._run(self._send_reqa_exchange())
+
+    def _send_reqa_exchange(self):
         self.comment_data("REQA (7 bits):", b"\x26")
-        resp = self._drv.write_bits(b'\x26', 7)
+        resp = yield self._drv.write_bits(b'\x26', 7)
         if not resp:
             raise Exception("REQ A failure")
         self.comment_data("ATQA:", resp)
@@ -56,16 +92,21 @@ class Iso14443ASession(Iso14443Session):
           - nothing
           - ATQA (Answer To Request - Type A)
         """
+        return self._run(self._send_wupa_exchange())
+
+    def _send_wupa_exchange(self):
         self.comment_data("WUPA (7 bits):", [0x52])
-        resp = self._drv.write_bits(b'\x52', 7)
+        resp = yield self._drv.write_bits(b'\x52', 7)
         self.comment_data("ATQA:", resp)
 
-    def send_select_full(self, fsdi="0", cid="0", do_rats=True):
+    def send_select_full(self, fsdi=None, cid="0", do_rats=True):
         """
         Select
         0x9320 - 8 bits - no CRC
         """
+        return self._run(self._send_select_full_exchange(fsdi, cid, do_rats))
 
+    def _send_select_full_exchange(self, fsdi, cid, do_rats):
         uid1 = bytes()
         uid2 = bytes()
         uid3 = bytes()
@@ -75,7 +116,7 @@ class Iso14443ASession(Iso14443Session):
         # No CRC
         data = bytes([0x93, 0x20])
         self.comment_data("Select cascade level 1:", data)
-        resp = self._drv.write(data=data, transmitter_add_crc=False)
+        resp = yield self._drv.write(data=data, transmitter_add_crc=False)
         self.comment_data("Select cascade level 1 response:", resp)
 
         # resp : CT + UID (3 bytes) + BCC
@@ -86,7 +127,7 @@ class Iso14443ASession(Iso14443Session):
         uid1 = resp
         data = bytes([0x93, 0x70]) + uid1
         self.comment_data("Select cascade level 1:", data)
-        resp = self._drv.write(data=data, resp_len=3, transmitter_add_crc=True)
+        resp = yield self._drv.write(data=data, resp_len=3, transmitter_add_crc=True)
         self.comment_data("Select cascade level 1 response:", resp)
 
         # if uid1[0] == 0x88:
@@ -133,16 +174,17 @@ class Iso14443ASession(Iso14443Session):
         #
         if do_rats:
             # RATS (Request Answer To Select)
-            resp = self.send_rats_a(fsdi, cid)
+            resp = yield from self._send_rats_a_exchange(fsdi, cid)
         else:
             None
         return uid1 + uid2 + uid3, resp
 
-    def send_rats_a(self, fsdi="0", cid="0"):
+    def send_rats_a(self, fsdi=None, cid="0"):
         """
         Request for answer to select - Type A
         0xE0 - fsdi | cid - CRC_A
         :param fsdi: defines the maximum size of a frame the PCD is able to receive.
+                     By default, the largest one the driver can receive (max_fsdi)
             - 0 : 16 bytes
             - 1 : 24 bytes
             - 2 : 32
@@ -156,23 +198,36 @@ class Iso14443ASession(Iso14443Session):
         :param cid: logical number of the addressed PICC in the range from 0 to 14.
         :return: ATS (Answer to select)
         """
-        dico = {"0": 16, "1": 24, "2": 32, "3": 40, "4": 48, "5": 64, "6": 96, "7": 128, "8": 256}
+        return self._run(self._send_rats_a_exchange(fsdi, cid))
+
+    def _send_rats_a_exchange(self, fsdi, cid):
+        data = self._build_rats(fsdi, cid)
+        resp = yield self._drv.write(data=data, resp_len=20, transmitter_add_crc=True)
+        return self.parse_ats(resp)
+
+    def _build_rats(self, fsdi=None, cid="0") -> bytes:
+        if fsdi is None:
+            fsdi = f"{self.max_fsdi:X}"
+        self.fsd = frame_size(int(fsdi, 16))
         self._logger.info("Request for Answer To Select (RATS):")
         self._logger.info("\tPCD selected options:")
-        self._logger.info("\t\tFSDI : 0x%s => max PCD frame size : %d bytes" % (fsdi, dico[fsdi]))
-        self._logger.info("\t\tCID  : 0x%s" % fsdi)
+        self._logger.info("\t\tFSDI : 0x%s => max PCD frame size : %d bytes" % (fsdi, self.fsd))
+        self._logger.info("\t\tCID  : 0x%s" % cid)
 
         data = bytes([0xE0, int(fsdi + cid, 16)])
         self.comment_data("RATS", data)
-        resp = self._drv.write(data=data, resp_len=20, transmitter_add_crc=True)
+        return data
 
+    def parse_ats(self, resp):
         # resp[0] = TL = length without counting the 2 CRC bytes
         resp = resp[:resp[0] + 2]
         self.comment_data("Answer to Select (ATS = RATS response):", resp)
 
-        t0 = resp[1]
+        # Without T0, FSCI is 2 and TA(1), TB(1), TC(1) are absent
+        t0 = resp[1] if resp[0] > 1 else 0x02
+        self.fsc = frame_size(t0 & 0xF)
         self._logger.info("\tT0 : 0x%02X", t0)
-        self._logger.info("\t\tFSCI : 0x%01X => max card frame size : %d bytes" % (t0 & 0xF, dico[str(t0 & 0xF)]))
+        self._logger.info("\t\tFSCI : 0x%01X => max card frame size : %d bytes" % (t0 & 0xF, self.fsc))
         ta1 = None
         tb1 = None
         tc1 = None
@@ -209,3 +264,9 @@ class Iso14443ASession(Iso14443Session):
         self._logger.info("")
         self._logger.info("")
         return resp
+
+
+class AsyncIso14443ASession(AsyncIso14443Session, Iso14443ASession):
+    """
+    asyncio version of Iso14443ASession.
+    """
@@ -13,13 +13,20 @@
 # limitations under the License.
 
 
-from pynfcreader.sessions.iso14443.iso14443 import Iso14443Session
+from pynfcreader.sessions.iso14443.iso14443 import AsyncIso14443Session, Iso14443Session, frame_size
+from pynfcreader.tools.crc import CRC_B
+from pynfcreader.tools.latency import LatencyRecorder
+from pynfcreader.tools.tracing import Tracer
 
 
 class Iso14443BSession(Iso14443Session):
 
-    def __init__(self, cid=0, nad=0, drv=None, block_size=16):
-        Iso14443Session.__init__(self, cid, nad, drv, block_size)
+    crc = CRC_B
+
+    def __init__(self, cid=0, nad=0, drv=None, block_size: int = None, check_crc: bool = False, retries: int = 2,
+                 tracer: Tracer = None, latency: LatencyRecorder = None):
+        Iso14443Session.__init__(self, cid, nad, drv, block_size, check_crc=check_crc, retries=retries,
+                                 tracer=tracer, latency=latency)
         self.pupi = None
 
     def connect(self):
@@ -27,29 +34,66 @@ class Iso14443BSession(Iso14443Session):
         self._drv.set_mode_iso14443B()
 
     def polling(self):
-        self.send_reqb()
-        self.send_attrib()
+        return self._run(self._polling_exchange())
+
+    def _polling_exchange(self):
+        with self.transaction("session.polling"):
+            yield self.send_reqb()
+            yield self.send_attrib()
         # self.send_select_full()
         # self.send_pps()
 
     def send_reqb(self):
+        return self._run(self._send_reqb_exchange())
+
+    def _send_reqb_exchange(self):
         reqb = bytes.fromhex("050000")
         self.comment_data("REQB:", reqb)
-        resp = self._drv.write(reqb, 1)
+        resp = yield self._drv.write(reqb, 1)
         if not resp:
             raise Exception("REQ B failure")
         self.comment_data("ATQB:", resp)
-        self.pupi = resp[1:5]
+        self.parse_atqb(resp)
         return resp
 
-    def send_attrib(self, pupi=None):
+    def parse_atqb(self, resp):
+        # 50, PUPI, application data (4 bytes), protocol info (3 bytes), CRC_B
+        self.pupi = resp[1:5]
+        if len(resp) >= 11:
+            self.fsc = frame_size(resp[10] >> 4)
+            self._logger.info(f"\tMax_Frame_Size : 0x{resp[10] >> 4:X} => max card frame size : {self.fsc} bytes")
+
+    def _build_attrib(self, pupi=None, fsdi: int = None) -> bytes:
+        """
+        :param fsdi: maximum size of a frame the PCD is able to receive.
+                     By default, the largest one the driver can receive (max_fsdi)
+        """
         if pupi is None:
             pupi = self.pupi
-        reqb = bytes.fromhex(f"1D {pupi.hex()}  00 00 01 00")
+        if fsdi is None:
+            fsdi = self.max_fsdi
+        self.fsd = frame_size(fsdi)
+        return bytes.fromhex(f"1D {pupi.hex()}  00 {fsdi:02X} 01 00")
+
+    def send_attrib(self, pupi=None, fsdi: int = None):
+        return self._run(self._send_attrib_exchange(pupi, fsdi))
+
+    def _send_attrib_exchange(self, pupi, fsdi):
+        reqb = self._build_attrib(pupi, fsdi)
         self.comment_data("REQB:", reqb)
-        resp = self._drv.write(reqb, 1)
+        resp = yield self._drv.write(reqb, 1)
         if not resp:
             raise Exception("REQ B failure")
         self.comment_data("ATQB:", resp)
         # self.pupi = resp[1:5]
         return resp
+
+
+class AsyncIso14443BSession(AsyncIso14443Session, Iso14443BSession):
+    """
+    asyncio version of Iso14443BSession.
+    """
+
+    async def connect(self):
+        await self._drv.connect()
+        await self._drv.set_mode_iso14443B()
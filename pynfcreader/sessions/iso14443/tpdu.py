@@ -13,85 +13,125 @@
 # limitations under the License.
 
 
+# Block types
+IBLOCK, RBLOCK, SBLOCK = "I", "R", "S"
+
+
+def _decode_pcb(pcb: int) -> tuple:
+    """
+    :return: block type (None if invalid), chaining, CID present, NAD present, block number, ACK/NAK bit
+    """
+    cid = bool(pcb & 0x08)
+    # Iblock
+    if (pcb & 0xC0) == 0x00:
+        return IBLOCK, bool(pcb & 0x10), cid, bool(pcb & 0x04), pcb & 0x01, 0
+    # Rblock
+    if (pcb & 0xC0) == 0x80:
+        return RBLOCK, False, cid, False, pcb & 0x01, (pcb & 0x10) >> 4
+    # Sblock
+    if (pcb & 0xC0) == 0xC0:
+        return SBLOCK, False, cid, False, 0, 0
+    return None, False, cid, False, 0, 0
+
+
+# PCB -> (block type, chaining, CID present, NAD present, block number, ACK/NAK bit, INF offset)
+PCB_TABLE = tuple(info + (1 + info[2] + info[3],) for info in map(_decode_pcb, range(256)))
+
+
 class Tpdu(object):
+    """
+    TPDU received with its CRC, in any buffer (bytes, bytearray, memoryview).
+
+    The fields are decoded from the PCB_TABLE entry of the PCB, the INF field is copied
+    only when asked for (inf_view gives it without copy).
+    """
+
+    __slots__ = ("tpdu", "_info", "_inf")
 
     def __init__(self, tpdu: bytes):
-        self.tpdu: bytes = tpdu
-
-        self.pcb, self._nad, self._cid, self._crc = None, None, None, None
-        self._inf_field: bytes = b""
-        self.iblock_is_chaining, self.is_nad_present, self.is_cid_present = False, False, False
-        self.ack_nack_bit: int = 0
-        self.block_nb: int = 0
-        self.i: bool = False
-        self.r: bool = False
-        self.s: bool = False
-        self.parse_block()
-
-    def parse_pcb(self):
-        pcb = self.pcb
-        # Iblock
-        if (pcb & 0xC0) == 0x00:
-            self.iblock_is_chaining = ((pcb & 0x10) == 0x10)
-            self.is_nad_present = (pcb & 0x40) == 0x40
-            self.is_cid_present = (pcb & 0x08) == 0x08
-            self.i = True
-        # Rblock
-        elif (pcb & 0xC0) == 0x80:
-            self.is_cid_present = (pcb & 0x08) == 0x08
-            self.is_nad_present = False
-            self.ack_nack_bit = (pcb & 0x10) >> 4
-            self.block_nb = pcb & 1
-            self.r = True
-        # Sblock
-        elif (pcb & 0xC0) == 0xC0:
-            self.is_cid_present = (pcb & 0x08) == 0x08
-            self.is_nad_present = False
-            self.s = True
-
-    def parse_block(self):
-        self.pcb = self.tpdu[0]
-        self.parse_pcb()
-        cmpt = 1
-        if self.is_cid_present:
-            self._cid = self.tpdu[cmpt]
-            cmpt += 1
-
-        if self.is_nad_present:
-            self._nad = self.tpdu[cmpt]
-            cmpt += 1
-
-        self._inf_field = self.tpdu[cmpt:-2]
-        self._crc = self.tpdu[-2:]
+        self.tpdu = tpdu
+        self._info = PCB_TABLE[tpdu[0]]
+        self._inf = None
+
+    @property
+    def pcb(self) -> int:
+        return self.tpdu[0]
+
+    @property
+    def i(self) -> bool:
+        return self._info[0] == IBLOCK
+
+    @property
+    def r(self) -> bool:
+        return self._info[0] == RBLOCK
+
+    @property
+    def s(self) -> bool:
+        return self._info[0] == SBLOCK
+
+    @property
+    def iblock_is_chaining(self) -> bool:
+        return self._info[1]
+
+    @property
+    def is_cid_present(self) -> bool:
+        return self._info[2]
+
+    @property
+    def is_nad_present(self) -> bool:
+        return self._info[3]
+
+    @property
+    def block_nb(self) -> int:
+        return self._info[4]
+
+    @property
+    def ack_nack_bit(self) -> int:
+        return self._info[5]
+
+    @property
+    def _cid(self):
+        return self.tpdu[1] if self._info[2] else None
+
+    @property
+    def _nad(self):
+        return self.tpdu[1 + self._info[2]] if self._info[3] else None
+
+    @property
+    def _crc(self) -> bytes:
+        return self.tpdu[-2:]
 
     def get_tpdu(self):
         return self.tpdu
 
+    @property
+    def inf_view(self) -> memoryview:
+        return memoryview(self.tpdu)[self._info[6]:-2]
+
     @property
     def inf(self) -> bytes:
-        return self._inf_field
+        if self._inf is None:
+            self._inf = bytes(self.tpdu[self._info[6]:-2])
+        return self._inf
 
     @inf.setter
     def inf(self, data: bytes):
-        self._inf_field = data
+        self._inf = data
 
     def is_chaining(self):
-        return self.iblock_is_chaining
+        return self._info[1]
 
     def is_wtx(self):
-        return (self.pcb & 0xF0) == 0xF0
+        return (self.tpdu[0] & 0xF0) == 0xF0
 
     def get_wtx_reply(self):
 
-        resp = [self.pcb]
-
-        if self.is_cid_present:
-            resp.append(self._cid)
+        resp = [self.tpdu[0]]
 
-        if self.is_nad_present:
-            resp.append(self._nad)
+        if self._info[2]:
+            resp.append(self.tpdu[1])
 
         # inf field
-        resp.append(self._inf_field[0] & 0x3F)
+        resp.append(self.inf[0] & 0x3F)
 
-        return resp
+        return bytes(resp)
@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import time
+
+from pynfcreader.sessions.exchange import run, run_async
 from pynfcreader.sessions.iso15693.requests import \
     RequestInventory, \
     RequestReadSingleBlock, \
@@ -21,15 +25,42 @@ from pynfcreader.sessions.iso15693.requests import \
     RequestWriteSingleBlock, \
     RequestWriteMultipleBlock, \
     RequestSelect, \
+    RequestResetToReady, \
     RequestGetMultipleBlockSecurityStatus
 from pynfcreader.tools import utils
+from pynfcreader.tools.crc import CRC_ISO15693
+from pynfcreader.tools.latency import LatencyRecorder
+from pynfcreader.tools.tracing import Comment, LoggingSink, RequestSent, ResponseReceived, Tracer
 
 
 class Iso15693Session(object):
-
-    def __init__(self, drv=None):
+    """
+    :param check_crc: the driver returns the responses with their CRC, to check and remove
+    :param retries: number of retransmissions of a request without a valid response, after
+                    which the request raises an exception.
+                    The 16 slots inventories and the requests without answer are not retransmitted.
+    :param tracer: receives the requests, responses and comments of the session (see pynfcreader.tools.tracing).
+                   By default, they are logged in the driver logger
+    :param latency: records the durations of the session and driver requests (see pynfcreader.tools.latency)
+
+    The requests are exchange generators (see pynfcreader.sessions.exchange), run by _run().
+    """
+
+    _run = staticmethod(run)
+
+    def __init__(self, drv=None, check_crc: bool = False, retries: int = 1, tracer: Tracer = None,
+                 latency: LatencyRecorder = None):
         self._drv = drv
+        self.check_crc = check_crc
+        self.retries = retries
+        self.nb_crc_errors = 0
+        self.nb_timeouts = 0
+        self.nb_retries = 0
         self._logger = self._drv.get_logger()
+        self.tracer = tracer if tracer is not None else Tracer(LoggingSink(self._logger))
+        self.latency = latency
+        if latency is not None:
+            self._drv.latency = latency
         self.last_request = None
         self._memory_block = {}
         self._lock_status = {}
@@ -52,47 +83,115 @@ class Iso15693Session(object):
 
         return self._drv.write(data=cmd, resp_len=16, transmitter_add_crc=True)
 
-    def send_cmd(self, cmd, no_answer=False):
-        self._logger.info(f"Command {cmd.name}")
-
-        for hit in utils.get_pretty_print_block(cmd()):
-            self._logger.info(f"{hit}")
-
-        for key, value in cmd.items.items():
-            if value != b"":
-                self._logger.info(f"\t{key:20}: {utils.bytes_to_str(value)}")
-        self._logger.info("")
+    @staticmethod
+    def _expects_answer(cmd: bytes, no_answer: bool) -> bool:
+        # In a 16 slots inventory, a silent slot is not an error
+        return not no_answer and (cmd[0] & 0x24) != 0x04
+
+    def _check_resp(self, resp: bytes):
+        """
+        :return: the response without its CRC, None if it is missing or corrupted
+        """
+        if not resp:
+            # A collision is an answer: retransmitting would collide again
+            if getattr(self._drv, "collision", False):
+                return b""
+            self.nb_timeouts += 1
+            return None
+        if self.check_crc:
+            if len(resp) < 3 or not CRC_ISO15693.check(resp):
+                self.nb_crc_errors += 1
+                self.comment(f"Response with a wrong CRC: {utils.bytes_to_str(resp)}")
+                return None
+            resp = resp[:-2]
+        return resp
 
-        resp = self.send(cmd())
+    def send_cmd(self, cmd, no_answer=False):
+        return self._run(self._send_cmd_exchange(cmd, no_answer))
+
+    def _send_cmd_exchange(self, cmd, no_answer):
+        if self.latency is not None:
+            start = time.perf_counter_ns()
+        data = cmd()
+        if self.tracer.enabled:
+            self.tracer.emit(RequestSent(time.monotonic_ns(), cmd))
+
+        expects_answer = self._expects_answer(data, no_answer)
+        resp = self._check_resp((yield self.send(data)))
+        for _ in range(self.retries if expects_answer else 0):
+            if resp is not None:
+                break
+            self.nb_retries += 1
+            self.comment("Request retransmission")
+            resp = self._check_resp((yield self.send(data)))
+        if resp is None:
+            if expects_answer:
+                raise Exception(f"No valid response after {self.retries} retries")
+            resp = b""
 
         self.last_request = cmd
 
         if no_answer:
+            if self.latency is not None:
+                self.latency.record_span("session.send_cmd", start, time.perf_counter_ns())
             return
 
-        self._logger.info("Response:")
-        if resp:
-            for hit in utils.get_pretty_print_block(resp):
-                self._logger.info(hit)
-        else:
-            self._logger.info("")
+        self._parse_resp(cmd, resp)
+
+        if self.latency is not None:
+            self.latency.record_span("session.send_cmd", start, time.perf_counter_ns())
+        return resp
+
+    def _parse_resp(self, cmd, resp):
         try:
             cmd.resp_pretty_print(resp)
         except:  # noqa: E722
             pass
-        for key, value in cmd.resp.items():
-            if value != b"":
-                self._logger.info(
-                    f"\t{key:25}: {utils.bytes_to_str(value['raw'])}")
-                if value["pretty"] != "":
-                    self._logger.info(f"\t{' ' * 25}: {value['pretty']}")
-        self._logger.info("")
+        if self.tracer.enabled:
+            self.tracer.emit(ResponseReceived(time.monotonic_ns(), cmd, resp))
 
-        return resp
+    def comment(self, msg):
+        if self.tracer.enabled:
+            self.tracer.emit(Comment(time.monotonic_ns(), msg, None))
+
+    def transaction(self, name: str):
+        """
+        Latency span of a block of requests (see LatencyRecorder.span), nothing without recorder
+        """
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.span(name)
 
     def inventory(self, flags=b"\x26", afi_opt=b"", mask=b""):
         return self.send_cmd(RequestInventory(flags, afi_opt, mask))
 
+    def inventory_all(self, flags=b"\x06", afi_opt=b""):
+        """
+        Inventory of all the tags in the field, with the 16 slots anticollision.
+
+        The driver switches to the next slot with send_eof(), and reports a collision
+        in the last slot with its collision attribute (see ViccSimulator).
+
+        :return: the UIDs, MSB first
+        """
+        return self._run(self._inventory_all_exchange(flags, afi_opt))
+
+    def _inventory_all_exchange(self, flags, afi_opt):
+        uids = []
+        masks = [(0, 0)]
+        while masks:
+            mask_len, mask = masks.pop()
+            mask_opt = mask.to_bytes((mask_len + 7) // 8, "little")
+            resp = yield self.send_cmd(RequestInventory(flags, afi_opt, mask_opt, mask_len))
+            for slot in range(16):
+                if slot:
+                    resp = yield self._drv.send_eof()
+                if self._drv.collision:
+                    masks.append((mask_len + 4, mask | (slot << mask_len)))
+                elif resp:
+                    uids.append(resp[2:10][::-1])
+        return uids
+
     def stay_quiet(self, flags=b"\x22", uid=b""):
         return self.send_cmd(RequestStayQuiet(flags, uid), no_answer=True)
 
@@ -123,6 +222,9 @@ class Iso15693Session(object):
     def select(self, flags=b"\x22", uid=b""):
         return self.send_cmd(RequestSelect(flags, uid))
 
+    def reset_to_ready(self, flags=b"\x02", uid_opt=b""):
+        return self.send_cmd(RequestResetToReady(flags, uid_opt))
+
     def get_multiple_blocks_security_status(self, flags=b"\x02", uid_opt=b"",
                                             first_block_nb=b"\x00",
                                             nb_blocks=b"\x00"):
@@ -131,24 +233,31 @@ class Iso15693Session(object):
                                                   first_block_nb, nb_blocks))
 
     def get_all_auto(self):
-        uid = self.inventory()[2:][::-1]
-        self.get_system_info(uid_opt=uid)
-        nb_block = self.last_request.nb_block
-        self.get_all_memory_info(nb_block)
+        return self._run(self._get_all_auto_exchange())
 
-        self._logger.info("\tMemory dump")
-        self._logger.info("")
+    def _get_all_auto_exchange(self):
+        with self.transaction("session.get_all_auto"):
+            uid = (yield self.inventory())[2:][::-1]
+            yield self.get_system_info(uid_opt=uid)
+            nb_block = self.last_request.nb_block
+            yield from self._get_all_memory_info_exchange(nb_block)
 
-        for hit in range(nb_block):
-            block = utils.int_array_to_hex_str(self._memory_block[hit])
-            block_ascii = utils.bytes_to_ascii_printable_str(
-                self._memory_block[hit])
-            status = "Locked  " if (
-                    self._lock_status[hit][0] & 0x1) else "Unlocked"
-            self._logger.info(
-                f"\t\t[{hit:3d}] - {status} -  {block} | {block_ascii}")
+            self._logger.info("\tMemory dump")
+            self._logger.info("")
+
+            for hit in range(nb_block):
+                block = utils.int_array_to_hex_str(self._memory_block[hit])
+                block_ascii = utils.bytes_to_ascii_printable_str(
+                    self._memory_block[hit])
+                status = "Locked  " if (
+                        self._lock_status[hit][0] & 0x1) else "Unlocked"
+                self._logger.info(
+                    f"\t\t[{hit:3d}] - {status} -  {block} | {block_ascii}")
 
     def get_all_memory_info(self, block_num):
+        return self._run(self._get_all_memory_info_exchange(block_num))
+
+    def _get_all_memory_info_exchange(self, block_num):
         self._logger.info("Get and print all memory")
 
         self._memory_block = {}
@@ -157,9 +266,32 @@ class Iso15693Session(object):
         self._logger.info("\tGet all memory")
         for hit in range(block_num):
             block_nb = bytes([hit])
-            resp = self.read_single_block(block_nb=block_nb)[2:]
-            if len(resp) == 0:
-                self.read_single_block(block_nb=block_nb)[2:]
+            if not (yield self.read_single_block(block_nb=block_nb)):
+                raise Exception(f"No response to the read of the block {hit}")
             self._memory_block[hit] = self.last_request.resp["data"]["raw"]
             self._lock_status[hit] = \
                 self.last_request.resp["block_security_status"]["raw"]
+
+
+class AsyncIso15693Session(Iso15693Session):
+    """
+    asyncio version of Iso15693Session, to be used with an asyncio driver (AsyncFlipperZero, AsyncHydraNFCv2).
+
+    The requests (inventory(), read_single_block(), get_all_auto()...) return coroutines.
+    """
+
+    _run = staticmethod(run_async)
+
+    async def connect(self):
+        await self._drv.connect()
+        await self._drv.set_mode_iso15693()
+
+    async def field_on(self):
+        self._logger.info("field on")
+        await self._drv.field_on()
+        self._logger.info("")
+
+    async def field_off(self):
+        self._logger.info("field off")
+        await self._drv.field_off()
+        self._logger.info("")
@@ -135,12 +135,13 @@ class Request(object):
 
 class RequestInventory(Request):
 
-    def __init__(self, flags=b"\x00", afi_opt=b"", mask_opt=b""):
+    def __init__(self, flags=b"\x00", afi_opt=b"", mask_opt=b"", mask_len=None):
+        # Mask length in bits, the whole mask_opt bytes by default
         Request.__init__(self,
                          flags=flags,
                          command=b"\x01",
                          afi_opt=afi_opt,
-                         mask_len=bytes([len(mask_opt)]),
+                         mask_len=bytes([8 * len(mask_opt) if mask_len is None else mask_len]),
                          mask_opt=mask_opt)
 
     def resp_pretty_print(self, resp=b""):
@@ -297,7 +298,7 @@ class RequestResetToReady(Request):
                  uid_opt=b""):
         Request.__init__(self,
                          flags=flags,
-                         command=b"\x25",
+                         command=b"\x26",
                          uid_opt=uid_opt)
 
 
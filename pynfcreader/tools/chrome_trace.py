@@ -0,0 +1,150 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Chrome trace-event JSON export of the session timelines, for chrome://tracing or
+https://ui.perfetto.dev.
+
+A ChromeTraceRecorder is a LatencyRecorder (see pynfcreader.tools.latency) which also
+writes each span as a complete event when it ends. In the timeline, the driver requests
+(and their encode/io/decode parts) are nested in the TPDUs, the TPDUs in the APDUs, and
+the APDUs in the transactions (polling(), get_all_auto(), span()). Each recorder, one
+per session, is a row of the timeline.
+
+    with ChromeTraceWriter("session.json") as writer:
+        hn = Iso14443ASession(drv=drv, latency=writer.recorder("reader 1"))
+        hn.polling()
+        with hn.transaction("personalisation"):
+            hn.send_apdu(...)
+
+The events are written as they come: the memory does not grow with the trace. With
+min_duration, only the transactions lasting at least min_duration (ns) are exported,
+the events of a transaction being held until its end.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+from pynfcreader.tools.latency import LatencyRecorder
+
+
+class ChromeTraceRecorder(LatencyRecorder):
+
+    def __init__(self, writer: "ChromeTraceWriter", tid: int):
+        LatencyRecorder.__init__(self)
+        self.writer = writer
+        self.tid = tid
+        # Events of the current transaction, if they are filtered by duration
+        self._pending = None
+        # JSON beginning of the events, by span name
+        self._headers = {}
+
+    def _event(self, name: str, start: int, end: int) -> str:
+        header = self._headers.get(name)
+        if header is None:
+            category = name.split(".", 1)[0] if "." in name else "transaction"
+            header = self._headers[name] = (f'{{"name":{json.dumps(name)},"cat":"{category}","ph":"X",'
+                                            f'"pid":{self.writer.pid},"tid":{self.tid},')
+        return f'{header}"ts":{start / 1000},"dur":{(end - start) / 1000}}}'
+
+    def record_span(self, name: str, start: int, end: int):
+        LatencyRecorder.record_span(self, name, start, end)
+        event = self._event(name, start, end)
+        if self._pending is not None:
+            self._pending.append(event)
+        else:
+            self.writer.write((event,))
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        outermost = self._pending is None and self.writer.min_duration > 0
+        if outermost:
+            self._pending = []
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            if outermost:
+                events, self._pending = self._pending, None
+                LatencyRecorder.record_span(self, name, start, end)
+                if end - start >= self.writer.min_duration:
+                    events.append(self._event(name, start, end))
+                    self.writer.write(events)
+            else:
+                self.record_span(name, start, end)
+
+
+class ChromeTraceWriter(object):
+    """
+    Trace-event file (JSON array format) shared by the recorders of several sessions,
+    possibly in different threads.
+
+    :param out: path, or text stream
+    :param min_duration: minimum duration (ns) of the exported transactions, 0 to export everything
+    """
+
+    def __init__(self, out, min_duration: int = 0):
+        self._close_out = isinstance(out, (str, os.PathLike))
+        self._out = open(out, "w") if self._close_out else out
+        self.min_duration = min_duration
+        self.pid = os.getpid()
+        self.nb_events = 0
+        self._nb_recorders = 0
+        self._lock = threading.Lock()
+        self._out.write("[")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def recorder(self, name: str = "") -> ChromeTraceRecorder:
+        """
+        :param name: name of the timeline row (reader, session...)
+        """
+        with self._lock:
+            self._nb_recorders += 1
+            tid = self._nb_recorders
+        self.write((json.dumps({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                                "args": {"name": name or f"session {tid}"}}),))
+        return ChromeTraceRecorder(self, tid)
+
+    def write(self, events):
+        """
+        :param events: JSON encoded events
+        """
+        if not events:
+            return
+        with self._lock:
+            if not self.nb_events:
+                self._out.write("\n")
+            else:
+                self._out.write(",\n")
+            self._out.write(",\n".join(events))
+            self.nb_events += len(events)
+
+    def close(self):
+        if self._out is None:
+            return
+        self._out.write("\n]\n")
+        if self._close_out:
+            self._out.close()
+        else:
+            self._out.flush()
+        self._out = None
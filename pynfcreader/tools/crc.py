@@ -0,0 +1,96 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+CRC of the NFC frames: ISO 14443 CRC_A and CRC_B, ISO 15693 CRC.
+
+The CRC functions and their tables are built once, at import. All the functions
+accept bytes, bytearray and memoryview. The CRC is sent LSB first.
+
+    CRC_A.append(b"\\x93\\x70" + uid)
+    CRC_B.check(frame)
+    crc = CRC_A.stream()
+    crc.update(block_1)
+    crc.update(block_2)
+    crc.get()
+"""
+
+import crcmod
+
+
+class Crc16(object):
+    """
+    Reflected CRC-16 (polynomial x^16 + x^12 + x^5 + 1).
+
+    :param init: initial value of the CRC register
+    :param xor_out: value XORed with the register to get the CRC
+    """
+
+    def __init__(self, name: str, init: int, xor_out: int):
+        self.name = name
+        self.init = init
+        self.xor_out = xor_out
+        # crcmod initial value is given after the final XOR
+        self._fun = crcmod.mkCrcFun(0x11021, initCrc=init ^ xor_out, xorOut=xor_out, rev=True)
+        # CRC of any frame followed by its own CRC
+        self.residue = self._fun(self.get(b""))
+
+    def compute(self, data, crc: int = None) -> int:
+        """
+        :param crc: CRC of the previous data, to continue the computation
+        """
+        if crc is None:
+            return self._fun(data)
+        return self._fun(data, crc)
+
+    def get(self, data) -> bytes:
+        return self._fun(data).to_bytes(2, "little")
+
+    def append(self, data) -> bytes:
+        return bytes(data) + self._fun(data).to_bytes(2, "little")
+
+    def check(self, frame) -> bool:
+        """
+        :param frame: data followed by its CRC
+        """
+        return len(frame) >= 2 and self._fun(frame) == self.residue
+
+    def check_many(self, frames) -> list:
+        fun = self._fun
+        residue = self.residue
+        return [len(frame) >= 2 and fun(frame) == residue for frame in frames]
+
+    def stream(self) -> "Crc16Stream":
+        return Crc16Stream(self)
+
+
+class Crc16Stream(object):
+    """
+    CRC computed over data received in several parts.
+    """
+
+    def __init__(self, crc: Crc16):
+        self._fun = crc._fun
+        self.value = crc.compute(b"")
+
+    def update(self, data):
+        self.value = self._fun(data, self.value)
+
+    def get(self) -> bytes:
+        return self.value.to_bytes(2, "little")
+
+
+CRC_A = Crc16("CRC_A", init=0x6363, xor_out=0x0000)
+CRC_B = Crc16("CRC_B", init=0xFFFF, xor_out=0xFFFF)
+CRC_ISO15693 = Crc16("ISO 15693 CRC", init=0xFFFF, xor_out=0xFFFF)
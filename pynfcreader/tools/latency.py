@@ -0,0 +1,199 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Latency histograms of the drivers and sessions.
+
+Given to a session, a LatencyRecorder is shared with its driver, and times:
+
+    - the session: "session.send_apdu", "session.send_tpdu" (retransmissions included),
+      "session.send_cmd" (ISO 15693)
+    - the serial readers: "drv.field_on", "drv.field_off", "drv.write" and "drv.write_bits",
+      split in ".encode" (request building), ".io" (serial write and wait for the
+      response: USB link and card) and ".decode" (response parsing)
+
+A session slower than its driver writes is Python overhead, a long ".io" is the
+card or the link. The user-level transactions are timed with span() (polling()
+and get_all_auto() are "session.polling" and "session.get_all_auto").
+
+    latency = LatencyRecorder()
+    hn = Iso14443ASession(drv=drv, latency=latency)
+    ...
+    print(latency.summary())
+
+Without recorder (latency=None), the drivers and sessions do not read the clock.
+"""
+
+import collections
+import contextlib
+import sys
+import time
+
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram(object):
+    """
+    Durations (ns) counted in log-linear buckets, as HdrHistogram: exact values
+    below 2 * 2 ** SUB_BITS, then 2 ** SUB_BITS buckets per power of 2 (relative
+    error below 1 / 2 ** SUB_BITS).
+    """
+
+    SUB_BITS = 4
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value: int) -> int:
+        shift = value.bit_length() - cls.SUB_BITS - 1
+        if shift <= 0:
+            return value
+        return (shift << cls.SUB_BITS) + (value >> shift)
+
+    @classmethod
+    def bucket_bounds(cls, index: int) -> tuple:
+        shift = (index >> cls.SUB_BITS) - 1
+        if shift <= 0:
+            return index, index
+        low = (index - (shift << cls.SUB_BITS)) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """
+        :return: the highest value of the bucket of the percentile (0: min, 100: max)
+        """
+        if not self.count:
+            return 0
+        if percentile <= 0:
+            return self.min
+        rank = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def buckets(self) -> list:
+        """
+        :return: [(low, high, count)], by increasing durations
+        """
+        return [self.bucket_bounds(index) + (self.counts[index],) for index in sorted(self.counts)]
+
+
+class LatencyRecorder(object):
+
+    def __init__(self):
+        self.histograms = collections.defaultdict(Histogram)
+
+    def __getitem__(self, name: str) -> Histogram:
+        return self.histograms[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.histograms
+
+    def record(self, name: str, duration: int):
+        self.histograms[name].record(duration)
+
+    def record_span(self, name: str, start: int, end: int):
+        """
+        :param start: time.perf_counter_ns() at the beginning of the span
+        :param end: time.perf_counter_ns() at its end
+        """
+        self.histograms[name].record(end - start)
+
+    def record_split(self, name: str, start: int, sent: int, received: int, end: int):
+        """
+        Span of a driver request: building until sent, serial I/O until received,
+        parsing until end.
+        """
+        self.record_span(name, start, end)
+        self.record_span(name + ".encode", start, sent)
+        self.record_span(name + ".io", sent, received)
+        self.record_span(name + ".decode", received, end)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """
+        Span of a block of requests (transaction, APDU script):
+
+            with latency.span("provisioning"):
+                hn.polling()
+                ...
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record_span(name, start, time.perf_counter_ns())
+
+    def reset(self):
+        self.histograms.clear()
+
+    def stats(self, percentiles=PERCENTILES) -> dict:
+        """
+        :return: {span name: {"count", "min", "mean", "p<percentile>"..., "max"}}, durations in microseconds
+        """
+        stats = {}
+        for name, histogram in sorted(self.histograms.items()):
+            stats[name] = dict(count=histogram.count, min=histogram.min / 1000, mean=histogram.mean / 1000,
+                               **{f"p{hit}": histogram.percentile(hit) / 1000 for hit in percentiles},
+                               max=histogram.max / 1000)
+        return stats
+
+    def summary(self, percentiles=PERCENTILES) -> str:
+        lines = ["latency (us):"]
+        for name, values in self.stats(percentiles).items():
+            columns = "  ".join(f"{key} {value:9.1f}" for key, value in values.items() if key != "count")
+            lines.append(f"\t{name:24} {values['count']:8d}  {columns}")
+        return "\n".join(lines)
+
+    def dump(self, out=None):
+        """
+        Write the buckets of all the histograms in a text stream (sys.stdout by default):
+        one "name low_ns high_ns count" line per bucket.
+        """
+        out = out if out is not None else sys.stdout
+        for name, histogram in sorted(self.histograms.items()):
+            out.write("".join(f"{name} {low} {high} {count}\n" for low, high, count in histogram.buckets()))
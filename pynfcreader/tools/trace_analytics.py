@@ -0,0 +1,300 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Latency and error statistics of recorded captures (requires NumPy).
+
+The captures are decoded by pynfcreader.tools.trace_decoder in a process pool. A
+binary trace is split in shards starting at a mode change or a field on, so that
+each shard is decoded on its own. A CSV log is one shard.
+
+    stats = analyse(["reader_1.trace", "reader_2.trace"])
+    print(summary(stats))
+
+Latencies are measured from the command write to the end of the response read,
+per command: REQA, SELECT, RATS... each APDU INS and each ISO 15693 command code.
+A CSV log has no timestamps: its latencies are 0.
+"""
+
+import array
+import bisect
+import concurrent.futures
+import itertools
+import os
+
+import numpy
+
+from pynfcreader.devices import trace
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.hydra_nfc_v2 import BbioFrameBuilder
+from pynfcreader.tools import trace_decoder
+
+PERCENTILES = (50, 90, 99)
+
+# Command codes: ISO 14443 frames, APDU INS (0x100 + INS), ISO 15693 command codes (0x200 + code)
+CODE_NAMES = ["REQA", "WUPA", "ANTICOLLISION", "SELECT", "RATS", "PPS", "REQB", "ATTRIB", "TPDU", "DESELECT",
+              "OTHER"]
+CODES = {name: code for code, name in enumerate(CODE_NAMES)}
+CODE_APDU = 0x100
+CODE_ISO15693 = 0x200
+
+HYDRA_NFC_SHARD_OPCODES = (BbioFrameBuilder.OPCODE_FIELD_ON,
+                           BbioFrameBuilder.OPCODE_MODE_ISO14443A,
+                           BbioFrameBuilder.OPCODE_MODE_ISO14443B,
+                           BbioFrameBuilder.OPCODE_MODE_ISO15693)
+HYDRA_NFC_MODES = {BbioFrameBuilder.OPCODE_MODE_ISO14443A: b"14443A",
+                   BbioFrameBuilder.OPCODE_MODE_ISO14443B: b"14443B",
+                   BbioFrameBuilder.OPCODE_MODE_ISO15693: b"15693"}
+
+
+def code_name(code: int) -> str:
+    if code >= CODE_ISO15693:
+        return f"ISO 15693 {code - CODE_ISO15693:02X}"
+    if code >= CODE_APDU:
+        return f"APDU INS {code - CODE_APDU:02X}"
+    return CODE_NAMES[code]
+
+
+def frame_code(frame: trace_decoder.Frame, mode: bytes) -> int:
+    command = frame.command
+    if frame.kind == "bits":
+        return CODES["WUPA"] if command[:1] == b"\x52" else CODES["REQA"]
+    if not command:
+        return CODES["OTHER"]
+    if mode == b"15693":
+        return CODE_ISO15693 + command[1] if len(command) > 1 else CODES["OTHER"]
+    first = command[0]
+    if first in (0x93, 0x95, 0x97):
+        return CODES["SELECT"] if command[1:2] == b"\x70" else CODES["ANTICOLLISION"]
+    if first == 0xE0:
+        return CODES["RATS"]
+    if (first & 0xF0) == 0xD0:
+        return CODES["PPS"]
+    if first == 0x05:
+        return CODES["REQB"]
+    if first == 0x1D:
+        return CODES["ATTRIB"]
+    if (first & 0xF7) == 0xC2:
+        return CODES["DESELECT"]
+    if (first & 0xE2) == 0x02 or (first & 0xE6) == 0xA2 or (first & 0xF7) == 0xF2:
+        return CODES["TPDU"]
+    return CODES["OTHER"]
+
+
+def _shard_start(record: trace.TraceRecord):
+    """
+    :return: (True, mode or None) if the record is a mode change or a field on, (False, None) otherwise
+    """
+    data = record.data
+    if not data:
+        return False, None
+    if record.device == trace.DEVICE_FLIPPER_ZERO:
+        if record.binary:
+            if data[0] != FlipperZero.FRAME_CLI:
+                return False, None
+            data = data[3:]
+        line = bytes(data[:24]).split(b"\r\n")[0]
+        kind, command = trace_decoder.FLIPPER_ZERO_COMMANDS.get(line, (None, None))
+        return kind in ("field_on", "mode"), command if kind == "mode" else None
+    if data[0] in HYDRA_NFC_SHARD_OPCODES:
+        return True, HYDRA_NFC_MODES.get(data[0])
+    return False, None
+
+
+def shards(path, nb_shards: int) -> list:
+    """
+    :return: (start, stop, mode) record ranges of a binary trace, starting at a mode change or a field on
+    """
+    mapped = trace.MappedTrace(path)
+    starts = [(0, None)]
+    mode = None
+    try:
+        for index in range(len(mapped)):
+            if mapped.direction(index) != "W":
+                continue
+            start, new_mode = _shard_start(mapped[index])
+            mode = new_mode or mode
+            if start and index:
+                starts.append((index, mode))
+        size = len(mapped)
+    finally:
+        mapped.close()
+
+    # Evenly sized shards, made of the nearest session starts
+    indexes = [index for index, _ in starts]
+    bounds = []
+    for hit in range(nb_shards):
+        candidate = bisect.bisect_left(indexes, size * hit // nb_shards)
+        if candidate < len(starts) and (not bounds or starts[candidate][0] > bounds[-1][0]):
+            bounds.append(starts[candidate])
+    return [(start, bounds[hit + 1][0] if hit + 1 < len(bounds) else size, mode)
+            for hit, (start, mode) in enumerate(bounds)]
+
+
+def _mapped_records(path, start: int, stop: int):
+    mapped = trace.MappedTrace(path)
+    try:
+        for index in range(start, stop):
+            yield mapped[index]
+    finally:
+        mapped.close()
+
+
+def _analyse_shard(path, device: int, start: int = 0, stop: int = None, mode: bytes = None) -> dict:
+    if stop is None:
+        records = trace_decoder.read_records(path, device)
+    else:
+        records = _mapped_records(path, start, stop)
+    first = next(records, None)
+    if first is None:
+        return {}
+    if device == trace.DEVICE_UNKNOWN:
+        device = first.device
+    records = itertools.chain([first], records)
+
+    frame_codes, frame_latencies = array.array("H"), array.array("q")
+    apdu_codes, apdu_latencies, apdu_times = array.array("H"), array.array("q"), array.array("q")
+    apdu_depths, apdu_retransmissions = array.array("H"), array.array("H")
+    counters = {"nb_tpdus": 0, "nb_timeouts": 0, "nb_crc_errors": 0}
+
+    def observe_frames(frames):
+        current_mode = mode
+        for frame in frames:
+            if frame.kind == "mode":
+                current_mode = frame.command
+            elif frame.kind in ("frame", "bits"):
+                frame_codes.append(frame_code(frame, current_mode))
+                frame_latencies.append(frame.end - frame.timestamp)
+            yield frame
+
+    def observe_tpdus(exchanges):
+        for exchange in exchanges:
+            counters["nb_tpdus"] += 1
+            if exchange.response is None:
+                counters["nb_timeouts"] += 1
+            elif not exchange.valid:
+                counters["nb_crc_errors"] += 1
+            yield exchange
+
+    frames = observe_frames(trace_decoder.DEVICE_FRAMES[device](records))
+    for exchange in trace_decoder.apdus(observe_tpdus(trace_decoder.tpdus(frames))):
+        apdu_codes.append(CODE_APDU + exchange.capdu[1] if len(exchange.capdu) > 1 else CODES["OTHER"])
+        apdu_latencies.append(exchange.end - exchange.timestamp)
+        apdu_times.append(exchange.timestamp)
+        apdu_depths.append(exchange.nb_tpdus - exchange.nb_wtx - exchange.nb_retransmissions)
+        apdu_retransmissions.append(exchange.nb_retransmissions)
+
+    result = {key: numpy.frombuffer(value, dtype=value.typecode) for key, value in (
+        ("frame_codes", frame_codes), ("frame_latencies", frame_latencies),
+        ("apdu_codes", apdu_codes), ("apdu_latencies", apdu_latencies), ("apdu_times", apdu_times),
+        ("apdu_depths", apdu_depths), ("apdu_retransmissions", apdu_retransmissions))}
+    result.update(counters)
+    result["first_timestamp"] = first.timestamp
+    return result
+
+
+def _latency_stats(codes: numpy.ndarray, latencies: numpy.ndarray, percentiles) -> dict:
+    """
+    :return: {command name: {"count", "mean", "max", "p<percentile>"...}}, latencies in microseconds
+    """
+    if not len(codes):
+        return {}
+    order = numpy.argsort(codes, kind="stable")
+    codes, latencies = codes[order], latencies[order] / 1000
+    splits = numpy.flatnonzero(numpy.diff(codes)) + 1
+    stats = {}
+    for group_codes, group in zip(numpy.split(codes, splits), numpy.split(latencies, splits)):
+        values = numpy.percentile(group, percentiles)
+        stats[code_name(int(group_codes[0]))] = dict(count=len(group), mean=float(group.mean()),
+                                                     max=float(group.max()),
+                                                     **{f"p{p}": float(v) for p, v in zip(percentiles, values)})
+    return stats
+
+
+def analyse(paths, device: int = trace.DEVICE_UNKNOWN, processes: int = None, shards_per_process: int = 4,
+            percentiles=PERCENTILES) -> dict:
+    """
+    :param paths: captures (binary traces or CSV logs of the same reader if device is given)
+    :param processes: size of the process pool, os.cpu_count() by default
+    :return: statistics, latencies in microseconds, throughput in APDU/s: for each capture,
+             the number of APDUs of each second since its first record
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    processes = processes or os.cpu_count() or 1
+
+    jobs = []
+    captures = []
+    for capture, path in enumerate(paths):
+        if trace.is_trace(path):
+            shard_jobs = [(path, device, start, stop, mode) for start, stop, mode in
+                          shards(path, processes * shards_per_process)]
+        else:
+            shard_jobs = [(path, device, 0, None, None)]
+        jobs += shard_jobs
+        captures += [capture] * len(shard_jobs)
+
+    if processes == 1:
+        results = [_analyse_shard(*job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_analyse_shard, *zip(*jobs)))
+    captures = [capture for capture, result in zip(captures, results) if result]
+    results = [result for result in results if result]
+
+    def merge(key, dtype):
+        return numpy.concatenate([result[key] for result in results] or [numpy.empty(0, dtype)])
+
+    apdu_depths = merge("apdu_depths", numpy.uint16)
+    nb_tpdus = sum(result["nb_tpdus"] for result in results)
+
+    # APDUs per second of each capture: the clocks of different captures are not comparable
+    throughput = []
+    for capture in range(len(paths)):
+        shard_results = [result for hit, result in zip(captures, results) if hit == capture]
+        if shard_results:
+            times = numpy.concatenate([result["apdu_times"] for result in shard_results])
+            origin = min(result["first_timestamp"] for result in shard_results)
+            throughput.append(numpy.bincount((times - origin) // 1_000_000_000))
+        else:
+            throughput.append(numpy.empty(0, numpy.int64))
+
+    return {"nb_shards": len(jobs),
+            "commands": _latency_stats(merge("frame_codes", numpy.uint16), merge("frame_latencies", numpy.int64),
+                                       percentiles),
+            "apdus": _latency_stats(merge("apdu_codes", numpy.uint16), merge("apdu_latencies", numpy.int64),
+                                    percentiles),
+            "nb_apdus": sum(len(result["apdu_times"]) for result in results),
+            "nb_tpdus": nb_tpdus,
+            "timeout_rate": sum(result["nb_timeouts"] for result in results) / max(nb_tpdus, 1),
+            "crc_error_rate": sum(result["nb_crc_errors"] for result in results) / max(nb_tpdus, 1),
+            "retry_rate": int(merge("apdu_retransmissions", numpy.uint16).sum()) / max(nb_tpdus, 1),
+            "chaining_depth": {"mean": float(apdu_depths.mean()) if len(apdu_depths) else 0.0,
+                               "max": int(apdu_depths.max()) if len(apdu_depths) else 0},
+            "throughput": throughput,
+            "throughput_peak": max((int(counts.max()) for counts in throughput if len(counts)), default=0)}
+
+
+def summary(stats: dict) -> str:
+    lines = [f"{stats['nb_apdus']} APDUs, {stats['nb_tpdus']} TPDUs ({stats['nb_shards']} shards)",
+             f"timeouts {stats['timeout_rate']:.2%}, CRC errors {stats['crc_error_rate']:.2%}, "
+             f"retransmissions {stats['retry_rate']:.2%}",
+             f"chaining depth: mean {stats['chaining_depth']['mean']:.2f}, max {stats['chaining_depth']['max']}",
+             f"throughput: peak {stats['throughput_peak']} APDU/s"]
+    for title in ("commands", "apdus"):
+        lines.append(f"{title} latency (us):")
+        for name, values in sorted(stats[title].items(), key=lambda item: -item[1]["mean"] * item[1]["count"]):
+            columns = "  ".join(f"{key} {value:9.1f}" for key, value in values.items() if key != "count")
+            lines.append(f"\t{name:16} {values['count']:8d}  {columns}")
+    return "\n".join(lines)
@@ -0,0 +1,333 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Decoding of the recorded reader exchanges (SerialCnx CSV log or binary trace).
+
+Each stage is a generator reading the previous one, so a capture of any size is
+decoded in constant memory:
+
+    records  ->  frames  ->  tpdus  ->  apdus
+    (serial)     (NFC)       (ISO 14443-4 blocks)  (C-APDU / R-APDU)
+
+    for exchange in read_apdus("capture.trace"):
+        print(exchange.capdu.hex(), exchange.rapdu.hex(), exchange.nb_wtx)
+
+The reader serial protocol (Flipper Zero CLI, text or binary framing, HydraNFC BBIO)
+is given by the device code of the trace records. A CSV log has no device code:
+it must be given (pynfcreader.devices.trace.DEVICE_*).
+"""
+
+import collections
+import csv
+import itertools
+import struct
+from pathlib import Path
+
+from pynfcreader.devices import trace
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.hydra_nfc_v2 import BbioFrameBuilder
+from pynfcreader.sessions.iso14443.tpdu import Tpdu
+from pynfcreader.tools.crc import CRC_A, CRC_B
+
+# Reader exchange. kind: "frame" (transceive), "bits" (REQA), "field_on", "field_off",
+# "mode" (command: b"14443A", b"14443B" or b"15693") or "marker" (command: label)
+Frame = collections.namedtuple("Frame", "timestamp end kind command response add_crc")
+
+# ISO 14443-4 block sent by the reader and the card answer (None if there is none).
+# valid: the response CRC is right
+TpduExchange = collections.namedtuple("TpduExchange", "timestamp end command response valid")
+
+# C-APDU and R-APDU reassembled from their chained I-blocks
+ApduExchange = collections.namedtuple("ApduExchange",
+                                      "timestamp end capdu rapdu nb_tpdus nb_wtx nb_rblocks nb_retransmissions")
+
+HYDRA_NFC_OPCODES = {BbioFrameBuilder.OPCODE_FIELD_OFF: ("field_off", b""),
+                     BbioFrameBuilder.OPCODE_FIELD_ON: ("field_on", b""),
+                     BbioFrameBuilder.OPCODE_MODE_ISO14443A: ("mode", b"14443A"),
+                     BbioFrameBuilder.OPCODE_MODE_ISO14443B: ("mode", b"14443B"),
+                     BbioFrameBuilder.OPCODE_MODE_ISO15693: ("mode", b"15693")}
+
+FLIPPER_ZERO_COMMANDS = {b"nfc on": ("field_on", b""),
+                         b"nfc off": ("field_off", b""),
+                         b"nfc mode_14443_a": ("mode", b"14443A"),
+                         b"nfc mode_14443_b": ("mode", b"14443B"),
+                         b"nfc mode_15693": ("mode", b"15693"),
+                         b"nfc reqa": ("bits", b"\x26"),
+                         b"nfc binary": ("binary", b"")}
+
+FRAME_HEADER = struct.Struct("<BH")
+
+
+def read_records(path, device: int = trace.DEVICE_UNKNOWN):
+    """
+    Records of a binary trace, or rows of a CSV log as TraceRecord. The data of a
+    CSV row is the recorded text (hexadecimal for the binary framings): binary is None.
+    """
+    if trace.is_trace(path):
+        with trace.TraceReader(path) as reader:
+            yield from reader
+        return
+    with Path(path).open(mode="r", encoding="utf-8", newline="") as log:
+        rows = csv.reader(log)
+        # Header
+        next(rows, None)
+        for row in rows:
+            yield trace.TraceRecord(0, row[0], device, None, row[1].encode())
+
+
+def _pop_events(pending: collections.deque):
+    # Operations without response queued before the next awaited response
+    while pending and pending[0][1] not in ("frame", "bits"):
+        timestamp, kind, command, _ = pending.popleft()
+        yield Frame(timestamp, timestamp, kind, command, b"", False)
+
+
+def hydra_nfc_frames(records):
+    """
+    Frames of the HydraNFC (v1 and v2) BBIO NFC reader mode.
+    """
+    pending = collections.deque()
+    rx = bytearray()
+    for record in records:
+        if record.direction == "M":
+            yield Frame(record.timestamp, record.timestamp, "marker", record.data, b"", False)
+            continue
+        # The BBIO exchanges are always recorded as binary
+        data = bytes.fromhex(record.data.decode()) if record.binary is None else record.data
+
+        if record.direction == "W":
+            index = 0
+            while index < len(data):
+                opcode = data[index]
+                if opcode == BbioFrameBuilder.OPCODE_TRANSCEIVE:
+                    size = data[index + 2]
+                    pending.append((record.timestamp, "frame", bytes(data[index + 3:index + 3 + size]),
+                                    bool(data[index + 1])))
+                    index += 3 + size
+                elif opcode == BbioFrameBuilder.OPCODE_WRITE_BITS:
+                    pending.append((record.timestamp, "bits", bytes(data[index + 1:index + 2]), False))
+                    index += 3
+                elif opcode == BbioFrameBuilder.OPCODE_REQA:
+                    pending.append((record.timestamp, "bits", b"\x26", False))
+                    index += 1
+                else:
+                    # BBIO mode selection or reset otherwise
+                    if opcode in HYDRA_NFC_OPCODES:
+                        pending.append((record.timestamp,) + HYDRA_NFC_OPCODES[opcode] + (False,))
+                    index += 1
+            yield from _pop_events(pending)
+            continue
+
+        # Responses: length (1 byte) + data. Other bytes (BBIO banners) are not awaited.
+        if not pending:
+            continue
+        rx += data
+        while pending and rx and len(rx) >= 1 + rx[0]:
+            timestamp, kind, command, add_crc = pending.popleft()
+            yield Frame(timestamp, record.timestamp, kind, command, bytes(rx[1:1 + rx[0]]), add_crc)
+            del rx[:1 + rx[0]]
+            yield from _pop_events(pending)
+        if not pending:
+            rx.clear()
+
+
+def _flipper_zero_command(line: bytes) -> tuple:
+    if line.startswith(b"nfc send "):
+        _, _, add_crc, data = line.split()
+        return "frame", bytes.fromhex(data.decode()), add_crc == b"1"
+    kind, command = FLIPPER_ZERO_COMMANDS.get(line, ("cli", line))
+    return kind, command, False
+
+
+def flipper_zero_frames(records):
+    """
+    Frames of the Flipper Zero NFC CLI, text and binary framings.
+
+    In a CSV log, the switch to the binary framing is found from the "nfc binary" command.
+    """
+    pending = collections.deque()
+    rx = bytearray()
+    binary = False
+    for record in records:
+        if record.direction == "M":
+            yield Frame(record.timestamp, record.timestamp, "marker", record.data, b"", False)
+            continue
+        data = record.data
+        if record.binary is None:
+            data = bytes.fromhex(data.decode()) if binary else data
+        else:
+            binary = record.binary
+
+        if record.direction == "W":
+            if binary:
+                index = 0
+                while index + FRAME_HEADER.size <= len(data):
+                    frame_type, size = FRAME_HEADER.unpack_from(data, index)
+                    payload = bytes(data[index + FRAME_HEADER.size:index + FRAME_HEADER.size + size])
+                    index += FRAME_HEADER.size + size
+                    if frame_type == FlipperZero.FRAME_SEND:
+                        pending.append((record.timestamp, "frame", payload[1:], bool(payload[0])))
+                    elif frame_type == FlipperZero.FRAME_REQA:
+                        pending.append((record.timestamp, "bits", b"\x26", False))
+                    elif frame_type == FlipperZero.FRAME_CLI:
+                        pending.append((record.timestamp,) + _flipper_zero_command(payload))
+            else:
+                for line in bytes(data).split(b"\r\n"):
+                    if line:
+                        pending.append((record.timestamp,) + _flipper_zero_command(line))
+            continue
+
+        # Responses of the commands, in order. The banner printed at the connection is not awaited.
+        if not pending:
+            rx.clear()
+            continue
+        rx += data
+        while pending:
+            if binary:
+                if len(rx) < FRAME_HEADER.size:
+                    break
+                frame_type, size = FRAME_HEADER.unpack_from(rx)
+                if len(rx) < FRAME_HEADER.size + size:
+                    break
+                resp = bytes(rx[FRAME_HEADER.size:FRAME_HEADER.size + size])
+                del rx[:FRAME_HEADER.size + size]
+                if frame_type not in (FlipperZero.FRAME_CLI_RESP, FlipperZero.FRAME_RESP):
+                    continue
+            else:
+                index = rx.find(FlipperZero.PROMPT)
+                if index == -1:
+                    break
+                resp = bytes(rx[:index])
+                del rx[:index + len(FlipperZero.PROMPT)]
+
+            timestamp, kind, command, add_crc = pending.popleft()
+            if kind in ("frame", "bits"):
+                if not binary:
+                    # Command echo, then the response
+                    lines = resp.split(b"\r\n")
+                    resp = bytes.fromhex(lines[1].decode()) if len(lines) > 1 else b""
+                yield Frame(timestamp, record.timestamp, kind, command, resp, add_crc)
+            elif kind == "binary":
+                binary = binary or b"Binary mode" in resp
+            elif kind != "cli":
+                yield Frame(timestamp, record.timestamp, kind, command, b"", False)
+
+
+DEVICE_FRAMES = {trace.DEVICE_FLIPPER_ZERO: flipper_zero_frames,
+                 trace.DEVICE_HYDRA_NFC: hydra_nfc_frames,
+                 trace.DEVICE_HYDRA_NFC_V2: hydra_nfc_frames}
+
+
+def read_frames(path, device: int = trace.DEVICE_UNKNOWN):
+    records = read_records(path, device)
+    if device == trace.DEVICE_UNKNOWN:
+        first = next(records, None)
+        if first is None:
+            return
+        device = first.device
+        records = itertools.chain([first], records)
+    if device not in DEVICE_FRAMES:
+        raise Exception(f"Unknown reader in {path}: give its device code")
+    yield from DEVICE_FRAMES[device](records)
+
+
+def tpdus(frames):
+    """
+    ISO 14443-4 blocks exchanged once the card is activated (RATS or ATTRIB), until
+    its deselection, a REQA, a mode change or the field off.
+    """
+    crc = CRC_A
+    active = False
+    pps = False
+    for frame in frames:
+        if frame.kind == "mode":
+            crc = CRC_B if frame.command == b"14443B" else CRC_A
+        if frame.kind != "frame":
+            if frame.kind != "marker":
+                active = False
+            continue
+
+        command = frame.command
+        if not active:
+            # RATS (type A) or ATTRIB (type B)
+            if frame.response and command[:1] in (b"\xE0", b"\x1D"):
+                active = True
+                pps = command[0] == 0xE0
+                crc = CRC_A if pps else CRC_B
+            continue
+        if pps and (command[0] & 0xF0) == 0xD0:
+            continue
+        pps = False
+
+        if frame.add_crc:
+            command = crc.append(command)
+        response = Tpdu(frame.response) if frame.response else None
+        yield TpduExchange(frame.timestamp, frame.end, Tpdu(command), response,
+                           response is not None and crc.check(frame.response))
+        # DESELECT
+        if (command[0] & 0xF7) == 0xC2 and response is not None:
+            active = False
+
+
+def apdus(exchanges):
+    """
+    C-APDU and R-APDU of the ISO 14443-4 blocks exchanges (reader side):
+    chained I-blocks are reassembled, the S(WTX) and R-blocks exchanges are counted.
+    A reader R-block asking for the last block again (R(NAK) or same R(ACK)) is a retransmission.
+    """
+    capdu, rapdu = bytearray(), bytearray()
+    start = None
+    last_pcb = None
+    for exchange in exchanges:
+        command, response = exchange.command, exchange.response
+        if start is None:
+            start = exchange.timestamp
+            nb_tpdus = nb_wtx = nb_rblocks = nb_retransmissions = 0
+        nb_tpdus += 1
+
+        if command.i:
+            capdu += command.inf
+        elif command.r:
+            nb_rblocks += 1
+            if command.ack_nack_bit or command.pcb == last_pcb:
+                nb_retransmissions += 1
+        elif command.is_wtx():
+            nb_wtx += 1
+        else:
+            # DESELECT
+            start = None
+            capdu.clear()
+            rapdu.clear()
+            continue
+        last_pcb = command.pcb
+
+        if not exchange.valid or not response.i:
+            continue
+        rapdu += response.inf
+        if not response.is_chaining():
+            yield ApduExchange(start, exchange.end, bytes(capdu), bytes(rapdu),
+                               nb_tpdus, nb_wtx, nb_rblocks, nb_retransmissions)
+            start = None
+            last_pcb = None
+            capdu.clear()
+            rapdu.clear()
+
+
+def read_tpdus(path, device: int = trace.DEVICE_UNKNOWN):
+    return tpdus(read_frames(path, device))
+
+
+def read_apdus(path, device: int = trace.DEVICE_UNKNOWN):
+    return apdus(tpdus(read_frames(path, device)))
@@ -0,0 +1,152 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Events of the sessions (frames, APDUs, comments), given to the sinks subscribed to their Tracer.
+
+The sessions check Tracer.enabled before building an event: without any sink,
+nothing is built nor formatted. A sink is any callable taking an event.
+
+    events = []
+    hn = Iso14443ASession(drv=drv, tracer=Tracer(events.append))
+
+By default, the sessions log their events with LoggingSink, which formats them
+only if its logger is enabled for its level.
+"""
+
+import collections
+import logging
+
+from pynfcreader.tools import utils
+
+# ISO 14443-4 blocks
+FrameSent = collections.namedtuple("FrameSent", "timestamp data")
+FrameReceived = collections.namedtuple("FrameReceived", "timestamp data")
+# duration: from the APDU command, in nanoseconds
+ApduSent = collections.namedtuple("ApduSent", "timestamp data")
+ApduReceived = collections.namedtuple("ApduReceived", "timestamp data duration")
+# ISO 15693 requests (pynfcreader.sessions.iso15693.requests.Request) and their responses
+RequestSent = collections.namedtuple("RequestSent", "timestamp request")
+ResponseReceived = collections.namedtuple("ResponseReceived", "timestamp request data")
+# Message, with data to dump (or None)
+Comment = collections.namedtuple("Comment", "timestamp message data")
+
+
+class Tracer(object):
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+        self.enabled = bool(self.sinks)
+
+    def subscribe(self, sink):
+        self.sinks.append(sink)
+        self.enabled = True
+
+    def unsubscribe(self, sink):
+        self.sinks.remove(sink)
+        self.enabled = bool(self.sinks)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink(event)
+
+
+class LoggingSink(object):
+    """
+    Hexdump of the events in a logger, as printed by the sessions.
+    """
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger()
+        self.level = level
+
+    def _dump(self, title: str, data, indent: str = "\t"):
+        log = self.logger.log
+        log(self.level, title)
+        for hit in utils.iter_pretty_print_block(data, indent):
+            log(self.level, hit)
+
+    def __call__(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        kind = type(event)
+        if kind is FrameSent:
+            self._dump("\t\tTPDU command:", event.data, "\t\t")
+        elif kind is FrameReceived:
+            self._dump("\t\tTPDU response:", event.data, "\t\t")
+        elif kind is ApduSent:
+            self._dump("APDU command:", event.data)
+        elif kind is ApduReceived:
+            self._dump("APDU response:", event.data)
+        elif kind is RequestSent:
+            self._log_request(event.request)
+        elif kind is ResponseReceived:
+            self._log_response(event.request, event.data)
+        elif kind is Comment:
+            if event.data is None:
+                self.logger.log(self.level, event.message)
+            else:
+                self._dump(event.message, event.data)
+
+    def _log_request(self, request):
+        log = self.logger.log
+        log(self.level, f"Command {request.name}")
+        for hit in utils.iter_pretty_print_block(request()):
+            log(self.level, hit)
+        for key, value in request.items.items():
+            if value != b"":
+                log(self.level, f"\t{key:20}: {utils.bytes_to_str(value)}")
+        log(self.level, "")
+
+    def _log_response(self, request, resp):
+        log = self.logger.log
+        log(self.level, "Response:")
+        if resp:
+            for hit in utils.iter_pretty_print_block(resp):
+                log(self.level, hit)
+        else:
+            log(self.level, "")
+        for key, value in request.resp.items():
+            if value != b"":
+                log(self.level, f"\t{key:25}: {utils.bytes_to_str(value['raw'])}")
+                if value["pretty"] != "":
+                    log(self.level, f"\t{' ' * 25}: {value['pretty']}")
+        log(self.level, "")
+
+
+def get_logger(debug: bool = False) -> logging.Logger:
+    """
+    Root logger of the drivers, printing to the console. The console handler is
+    added once, whatever the number of drivers.
+
+    The levels are only made more verbose: to INFO when the logging is not
+    configured yet, to DEBUG with debug. A level set by the application is kept.
+    """
+    logger = logging.getLogger()
+    level = logging.DEBUG if debug else logging.INFO
+    handler = next((hit for hit in logger.handlers if getattr(hit, "pynfcreader", False)), None)
+    if handler is None:
+        if not logger.handlers and logger.level > level:
+            logger.setLevel(level)
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(levelname)s  ::  %(message)s'))
+        handler.setLevel(level)
+        handler.pynfcreader = True
+        logger.addHandler(handler)
+    elif debug:
+        handler.setLevel(min(handler.level, level))
+
+    if debug and logger.level > level:
+        logger.setLevel(level)
+    return logger
@@ -13,9 +13,7 @@
 # limitations under the License.
 
 
-import re
-
-import crcmod
+from pynfcreader.tools.crc import CRC_A, CRC_B
 
 manufacturer_codes_iso_7816_6 = {
     "01": "Motorola",
@@ -40,43 +38,75 @@ manufacturer_codes_iso_7816_6 = {
     "33": "AMIC"}
 
 
+# Printable ASCII, '.' for the other bytes
+ASCII_PRINTABLE = bytes(hit if 0x20 <= hit <= 0x7E else 0x2E for hit in range(256))
+
+# Bytes formatted at once by the hexdump generators (256 lines)
+HEXDUMP_CHUNK = 16 * 256
+
+
 def int_array_to_hex_str(array):
-    return " ".join(f"{hit:02X}" for hit in array)
+    return bytes(array).hex(" ").upper()
 
 
 def bytes_to_ascii_printable_str(data):
-    data = data.decode(encoding='ascii', errors='replace')
-    return re.sub(r'[^\x20-\x7E]', '.', data)
+    return bytes(data).translate(ASCII_PRINTABLE).decode("ascii")
 
 
 def bytes_to_str(data_b):
-    return ' '.join(f'{hit:02X}' for hit in data_b)
+    return bytes(data_b).hex(" ").upper()
+
+
+def iter_pretty_print_block(msg, indent: str = ""):
+    """
+    Hexdump lines of msg (16 bytes per line), generated chunk by chunk: each chunk is
+    converted to hex and ASCII at once, then sliced into lines.
+    """
+    if not isinstance(msg, (bytes, bytearray, memoryview)):
+        msg = bytes(msg)
+    msg = memoryview(msg)
+    for offset in range(0, len(msg), HEXDUMP_CHUNK):
+        chunk = msg[offset:offset + HEXDUMP_CHUNK]
+        hexa = chunk.hex(" ").upper()
+        text = bytes(chunk).translate(ASCII_PRINTABLE).decode("ascii")
+        for hit in range(0, len(chunk), 16):
+            # 3 characters per byte, the last one of the line without its separator
+            lpart = f"{hexa[hit * 3:hit * 3 + 23]}   {hexa[hit * 3 + 24:hit * 3 + 47]}"
+            yield f"{indent}{lpart:<49}      {text[hit:hit + 8]}   {text[hit + 8:hit + 16]}"
 
 
 def get_pretty_print_block(msg):
-    lst = []
-
-    for hit in range(0, len(msg), 16):
-        block1 = msg[hit:hit + 8]
-        hex1 = " ".join(f"{c:02X}" for c in block1)
-        str1 = bytes_to_ascii_printable_str(block1)
-        block2 = msg[hit + 8:hit + 16]
-        hex2 = " ".join(f"{c:02X}" for c in block2)
-        str2 = bytes_to_ascii_printable_str(block2)
-
-        lpart = f"{hex1}   {hex2}"
-        lst.append(f'{lpart}{" " * (49 - len(lpart))}      {str1}   {str2}')
-    return lst
+    return list(iter_pretty_print_block(msg))
+
+
+def write_pretty_print_block(out, msg, indent: str = "", nb_lines: int = 256):
+    """
+    Write the hexdump of msg in a text stream (file, sys.stdout, socket.makefile("w")...),
+    nb_lines lines per write.
+    """
+    lines = []
+    for line in iter_pretty_print_block(msg, indent):
+        lines.append(line)
+        if len(lines) == nb_lines:
+            lines.append("")
+            out.write("\n".join(lines))
+            lines.clear()
+    if lines:
+        lines.append("")
+        out.write("\n".join(lines))
 
 
 def crc_iso14443a_get(data: bytes) -> bytes:
-    crc16 = crcmod.mkCrcFun(0x11021, initCrc=0x6363, xorOut=0x0000, rev=True)
-    return crc16(data).to_bytes(2, "little")
+    return CRC_A.get(data)
+
 
 def crc_iso14443a_append(data: bytes) -> bytes:
-    crc16 = crcmod.mkCrcFun(0x11021, initCrc=0x6363, xorOut=0x0000, rev=True)
-    return data + crc16(data).to_bytes(2, "little")
+    return CRC_A.append(data)
+
+
+def crc_iso14443a_check(data: bytes) -> bool:
+    return CRC_A.check(data)
+
 
-def crc_iso14443a_check(data:bytes) -> bool:
-    crc16 = crcmod.mkCrcFun(0x11021, initCrc=0x6363, xorOut=0x0000, rev=True)
-    return crc16(data[:-2]).to_bytes(2, "little") == data[-2:]
\ No newline at end of file
+def crc_iso14443b_append(data: bytes) -> bytes:
+    return CRC_B.append(data)
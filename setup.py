@@ -33,7 +33,8 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/gvinet/pynfcreader",
     packages=setuptools.find_packages(),
-    install_requires=['pyHydrabus'],
+    install_requires=['pyserial', 'crcmod'],
+    extras_require={'analytics': ['numpy']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
@@ -0,0 +1,50 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import socket
+
+from pynfcreader.devices.connection import AsyncSerialCnx
+
+
+class FirmwareProtocol(asyncio.Protocol):
+    """
+    Serves a stand-in firmware (FlipperZeroFirmware, HydraNFCv2Firmware) on an asyncio transport.
+    """
+
+    def __init__(self, firmware, banner: bytes = b""):
+        self.firmware = firmware
+        self.banner = banner
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.banner:
+            asyncio.get_running_loop().call_later(0.01, transport.write, self.banner)
+
+    def data_received(self, data: bytes):
+        out = self.firmware.feed(data)
+        if out:
+            self.transport.write(out)
+
+
+async def open_stand_in(firmware, banner: bytes = b"") -> AsyncSerialCnx:
+    """
+    AsyncSerialCnx connected to the stand-in firmware through an in-memory socket pair.
+    """
+    loop = asyncio.get_running_loop()
+    host, device = socket.socketpair()
+    await loop.create_connection(lambda: FirmwareProtocol(firmware, banner), sock=device)
+    _, cnx = await loop.create_connection(AsyncSerialCnx, sock=host)
+    return cnx
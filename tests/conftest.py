@@ -1,7 +1,25 @@
+from pathlib import Path
+
 import pytest
 from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
 
 
+def pytest_addoption(parser):
+    parser.addoption("--hydranfc-record", default="",
+                     help="directory where the HydraNFC exchanges of each test are recorded")
+    parser.addoption("--hydranfc-replay", default="",
+                     help="directory of the recorded HydraNFC exchanges to replay, instead of using the reader")
+
+
 @pytest.fixture
-def hydranfc_connection():
-    return HydraNFCv2(port="/dev/ttyACM0", debug=False)
+def hydranfc_connection(request):
+    record = request.config.getoption("--hydranfc-record")
+    replay = request.config.getoption("--hydranfc-replay")
+    if replay:
+        drv = HydraNFCv2(debug=False, log=str(Path(replay) / f"{request.node.name}.trace"))
+    else:
+        recording = str(Path(record) / f"{request.node.name}.trace") if record else ""
+        drv = HydraNFCv2(port="/dev/ttyACM0", debug=False, recording=recording)
+    yield drv
+    if drv._hydranfc is not None:
+        drv.close()
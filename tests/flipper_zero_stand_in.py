@@ -0,0 +1,194 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import struct
+import threading
+import time
+
+BANNER = (b"Welcome to Flipper Zero Command Line Interface!\r\n"
+          b"Firmware version: stand-in\r\n"
+          b"\r\n>: ")
+
+
+class FlipperZeroFirmware:
+    """
+    Reader side of the Flipper Zero NFC CLI, text and binary framing.
+
+    feed() takes the bytes received from the host and returns the bytes to send back.
+    """
+
+    def __init__(self, card=None, binary_supported: bool = True):
+        self.card = card if card is not None else (lambda data: bytes.fromhex("9000"))
+        self.binary_supported = binary_supported
+        self.binary = False
+        self._rx = bytearray()
+
+    def run_command(self, line: str) -> str:
+        args = line.split()
+        if args[:2] == ["nfc", "send"]:
+            return self.card(bytes.fromhex(args[3])).hex().upper()
+        if args[:2] == ["nfc", "reqa"]:
+            return "4400"
+        if line == "nfc binary" and self.binary_supported:
+            self.binary = True
+            return "Binary mode"
+        return {"nfc on": "Field is on",
+                "nfc off": "Field is off",
+                "nfc mode_14443_a": "Set mode ISO 14443 A",
+                "nfc mode_14443_b": "Set mode ISO 14443 B",
+                "nfc mode_15693": "Set mode ISO 15693"}.get(line, f"`{line}` command not found")
+
+    def _run_frame(self, frame_type: int, payload: bytes) -> bytes:
+        if frame_type == 0x01:
+            return self._frame(0x81, self.card(payload[1:]))
+        if frame_type == 0x02:
+            return self._frame(0x81, bytes.fromhex("4400"))
+        return self._frame(0x80, self.run_command(payload.decode()).encode())
+
+    @staticmethod
+    def _frame(frame_type: int, payload: bytes) -> bytes:
+        return struct.pack("<BH", frame_type, len(payload)) + payload
+
+    def feed(self, data: bytes) -> bytes:
+        self._rx += data
+        out = bytearray()
+        while True:
+            if self.binary:
+                if len(self._rx) < 3:
+                    break
+                frame_type, size = struct.unpack_from("<BH", self._rx)
+                if len(self._rx) < 3 + size:
+                    break
+                payload = bytes(self._rx[3:3 + size])
+                del self._rx[:3 + size]
+                out += self._run_frame(frame_type, payload)
+            else:
+                index = self._rx.find(b"\r\n")
+                if index == -1:
+                    break
+                line = self._rx[:index].decode()
+                del self._rx[:index + 2]
+                out += f"{line}\r\n{self.run_command(line)}\r\n\r\n>: ".encode()
+        return bytes(out)
+
+
+class ScriptedFlipperZero:
+    """
+    Scripted stand-in for the serial port of a Flipper Zero running the NFC CLI.
+
+    It exposes the subset of the pyserial API used by SerialCnx. The output of
+    each write is made available `latency` seconds later.
+    A read with nothing available waits for the serial timeout, like a real port.
+    """
+
+    def __init__(self, latency: float = 0.001, card=None, binary_supported: bool = True):
+        self.timeout = None
+        self.latency = latency
+        self.firmware = FlipperZeroFirmware(card, binary_supported)
+        self._pending = []
+        self._rx = bytearray()
+        self._queue(BANNER)
+
+    def _queue(self, data: bytes):
+        self._pending.append((time.perf_counter() + self.latency, data))
+
+    def _move_ready(self, wait: bool):
+        if not self._pending:
+            if wait and self.timeout:
+                time.sleep(self.timeout)
+            return
+        ready, data = self._pending[0]
+        delay = ready - time.perf_counter()
+        if delay > 0:
+            if not wait:
+                return
+            if self.timeout is not None and delay > self.timeout:
+                time.sleep(self.timeout)
+                return
+            time.sleep(delay)
+        self._pending.pop(0)
+        self._rx += data
+
+    @property
+    def in_waiting(self) -> int:
+        self._move_ready(wait=False)
+        return len(self._rx)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self._rx:
+            self._move_ready(wait=True)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readline(self) -> bytes:
+        while b"\n" not in self._rx:
+            before = len(self._rx) + len(self._pending)
+            self._move_ready(wait=True)
+            if len(self._rx) + len(self._pending) == before:
+                break
+        index = self._rx.find(b"\n")
+        size = index + 1 if index != -1 else len(self._rx)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data: bytes):
+        out = self.firmware.feed(data)
+        if out:
+            self._queue(out)
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PtyFlipperZero:
+    """
+    Flipper Zero stand-in served on a local pseudo terminal, from a background thread.
+
+    Open `port` with the regular drivers, then call start() to print the CLI banner.
+    """
+
+    def __init__(self, card=None, binary_supported: bool = True):
+        self.firmware = FlipperZeroFirmware(card, binary_supported)
+        self._master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        time.sleep(0.05)
+        os.write(self._master, BANNER)
+        while True:
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            out = self.firmware.feed(data)
+            if out:
+                os.write(self._master, out)
+
+    def close(self):
+        os.close(self._slave)
+        os.close(self._master)
@@ -0,0 +1,134 @@
+# Copyright (C) 2015-2024 Guillaume VINET
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+
+class HydraNFCv2Firmware:
+    """
+    BBIO NFC reader mode of the HydraNFC v2 firmware (and of the v1 one: NFC1 mode, bits write).
+
+    feed() takes the bytes received from the host and returns the bytes to send back.
+    """
+
+    def __init__(self, card=None, atqa: bytes = bytes.fromhex("4400")):
+        self.card = card if card is not None else (lambda data: bytes.fromhex("9000"))
+        self.atqa = atqa
+        self.field = False
+        self.mode = None
+        self._rx = bytearray()
+
+    def feed(self, data: bytes) -> bytes:
+        self._rx += data
+        out = bytearray()
+        while self._rx:
+            opcode = self._rx[0]
+            if opcode == 0x05:
+                if len(self._rx) < 3 or len(self._rx) < 3 + self._rx[2]:
+                    break
+                size = self._rx[2]
+                resp = self.card(bytes(self._rx[3:3 + size]))
+                del self._rx[:3 + size]
+                out += bytes([len(resp)]) + resp
+                continue
+            if opcode == 0x04:
+                # Bits write: data byte + number of bits
+                if len(self._rx) < 3:
+                    break
+                del self._rx[:3]
+                out += bytes([len(self.atqa)]) + self.atqa
+                continue
+            del self._rx[0]
+            if opcode == 0x00:
+                out += b"BBIO1"
+            elif opcode == 0x0E:
+                out += b"NFC2"
+            elif opcode == 0x0C:
+                out += b"NFC1"
+            elif opcode in (0x02, 0x03):
+                self.field = opcode == 0x03
+            elif opcode in (0x06, 0x07, 0x09):
+                self.mode = opcode
+            elif opcode == 0x08:
+                out += bytes([len(self.atqa)]) + self.atqa
+        return bytes(out)
+
+
+class ScriptedHydraNFCv2:
+    """
+    Scripted stand-in for the serial port of a HydraNFC v2 in BBIO NFC reader mode.
+
+    Every write call costs `write_cost` seconds, like a USB CDC transfer, and
+    its answer is available `latency` seconds after the write (USB round trip).
+    """
+
+    def __init__(self, card=None, write_cost: float = 0.0, latency: float = 0.0):
+        self.timeout = None
+        self.write_cost = write_cost
+        self.latency = latency
+        self._ready = 0
+        self.nb_writes = 0
+        self.firmware = HydraNFCv2Firmware(card)
+        self._rx = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def write(self, data) -> int:
+        self.nb_writes += 1
+        if self.write_cost:
+            time.sleep(self.write_cost)
+        self._rx += self.firmware.feed(bytes(data))
+        self._ready = time.perf_counter() + self.latency
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        delay = self._ready - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def iso14443a_card(data: bytes) -> bytes:
+    """
+    Minimal ISO 14443 A card answering the activation sequence and echoing I-blocks.
+
+    The 2 trailing bytes stand for the CRC_A.
+    """
+    if data == bytes.fromhex("9320"):
+        return bytes.fromhex("0102030404")
+    if data[:2] == bytes.fromhex("9370"):
+        return bytes.fromhex("20FC70")
+    if data[0] == 0xE0:
+        return bytes.fromhex("0578807002A0B1")
+    if data[0] == 0xD0:
+        return bytes.fromhex("D07387")
+    return data + b"\x00\x00"
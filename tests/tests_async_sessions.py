@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from pynfcreader.devices.flipper_zero import AsyncFlipperZero
+from pynfcreader.devices.hydra_nfc_v2 import AsyncHydraNFCv2
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.devices.vicc_simulator import Vicc, ViccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import AsyncIso14443ASession, Iso14443ASession
+from pynfcreader.sessions.iso14443.iso14443b import AsyncIso14443BSession, Iso14443BSession
+from pynfcreader.sessions.iso15693.iso15693 import AsyncIso15693Session
+from pynfcreader.tools.latency import LatencyRecorder
+from tests.async_stand_in import open_stand_in
+from tests.flipper_zero_stand_in import BANNER, FlipperZeroFirmware
+from tests.hydra_nfc_v2_stand_in import HydraNFCv2Firmware, iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+UID = bytes.fromhex("E004010012345678")
+
+
+async def flipper_zero_session(binary=False):
+    cnx = await open_stand_in(FlipperZeroFirmware(card=iso14443a_card), BANNER)
+    hn = AsyncIso14443ASession(drv=AsyncFlipperZero(debug=False, cnx=cnx, binary=binary))
+    await hn.connect()
+    return hn
+
+
+def test_async_flipper_zero_session():
+    async def run():
+        hn = await flipper_zero_session()
+        await hn.field_on()
+        await hn.polling()
+        return await hn.send_apdu(APDU)
+
+    assert asyncio.run(run()) == bytes.fromhex(APDU)
+
+
+def test_async_concurrent_readers():
+    async def run(binary):
+        sessions = [await flipper_zero_session(binary) for _ in range(8)]
+        await asyncio.gather(*(hn.polling() for hn in sessions))
+        return await asyncio.gather(*(hn.send_apdu(APDU) for hn in sessions))
+
+    assert asyncio.run(run(False)) == [bytes.fromhex(APDU)] * 8
+    assert asyncio.run(run(True)) == [bytes.fromhex(APDU)] * 8
+
+
+def test_async_hydranfc_v2_session():
+    async def run():
+        cnx = await open_stand_in(HydraNFCv2Firmware(card=iso14443a_card))
+        hn = AsyncIso14443ASession(drv=AsyncHydraNFCv2(debug=False, cnx=cnx))
+        await hn.connect()
+        await hn.field_on()
+        uid, ats = await hn.send_select_full()
+        return uid, await hn.send_apdu(APDU)
+
+    assert asyncio.run(run()) == (bytes.fromhex("0102030404"), bytes.fromhex(APDU))
+
+
+def test_async_timeout():
+    async def run():
+        cnx = await open_stand_in(HydraNFCv2Firmware(card=lambda data: b""))
+        cnx.set_timeout(0.05)
+        # The stand-in firmware never answers to an unknown opcode
+        cnx.write(b"\x7F")
+        await cnx.read(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+
+class AsyncSimulator:
+    """
+    asyncio driver on top of a card or tag simulator.
+    """
+
+    IO = {"connect", "set_mode_iso14443A", "set_mode_iso14443B", "set_mode_iso15693", "field_on", "field_off",
+          "write", "write_bits", "send_eof"}
+
+    def __init__(self, drv):
+        self.drv = drv
+
+    def __getattr__(self, name):
+        method = getattr(self.drv, name)
+        if name not in self.IO:
+            return method
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+def exchanges(drv) -> list:
+    frames = []
+    write = drv.write
+
+    def recorded_write(data=b"", resp_len=None, transmitter_add_crc=True):
+        resp = write(data, resp_len, transmitter_add_crc)
+        frames.append((bytes(data), resp))
+        return resp
+
+    drv.write = recorded_write
+    return frames
+
+
+@pytest.mark.parametrize("sync_class, async_class", [(Iso14443ASession, AsyncIso14443ASession),
+                                                     (Iso14443BSession, AsyncIso14443BSession)])
+@pytest.mark.parametrize("apdu", [APDU, bytes(range(200)).hex()])
+def test_async_session_same_exchanges(sync_class, async_class, apdu):
+    # The sync and async sessions run the same requests: the exchanges must not differ
+    def card():
+        card = PiccSimulator(apdu_handler=lambda data: data + bytes.fromhex("9000"), wtx=1)
+        card.max_frame_size = 64
+        return card
+
+    sync_card = card()
+    frames = exchanges(sync_card)
+    hn = sync_class(drv=sync_card, check_crc=True)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    rapdu = bytes.fromhex(apdu) + bytes.fromhex("9000")
+    assert hn.send_apdu(apdu) == rapdu
+
+    async def run():
+        async_card = card()
+        async_frames = exchanges(async_card)
+        hn = async_class(drv=AsyncSimulator(async_card), check_crc=True)
+        await hn.connect()
+        await hn.field_on()
+        await hn.polling()
+        return await hn.send_apdu(apdu), async_frames
+
+    assert asyncio.run(run()) == (rapdu, frames)
+
+
+def test_async_iso15693_session():
+    memory = bytes(range(16))
+
+    async def run():
+        hn = AsyncIso15693Session(drv=AsyncSimulator(ViccSimulator([Vicc(UID, nb_blocks=4, memory=memory)])))
+        await hn.connect()
+        await hn.field_on()
+        await hn.get_all_auto()
+        return [hn._memory_block[hit] for hit in range(4)], await hn.inventory_all()
+
+    assert asyncio.run(run()) == ([memory[hit:hit + 4] for hit in range(0, 16, 4)], [UID])
+
+
+def test_async_exception_in_exchange():
+    # The driver exceptions are raised in the exchanges: the transaction span is closed
+    latency = LatencyRecorder()
+
+    async def run():
+        tag = ViccSimulator([Vicc(UID)])
+        hn = AsyncIso15693Session(drv=AsyncSimulator(tag), latency=latency)
+        await hn.connect()
+        await hn.field_on()
+
+        def lost(*args, **kwargs):
+            raise Exception("Link lost")
+
+        tag.write = lost
+        await hn.get_all_auto()
+
+    with pytest.raises(Exception, match="Link lost"):
+        asyncio.run(run())
+    assert latency["session.get_all_auto"].count == 1
@@ -0,0 +1,60 @@
+import json
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.tools.chrome_trace import ChromeTraceWriter
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def get_session(writer: ChromeTraceWriter, name: str) -> Iso14443ASession:
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(iso14443a_card)))
+    hn = Iso14443ASession(drv=drv, block_size=120, latency=writer.recorder(name))
+    hn.connect()
+    hn.field_on()
+    return hn
+
+
+def inside(event: dict, parents: list) -> bool:
+    return any(hit["ts"] <= event["ts"] and event["ts"] + event["dur"] <= hit["ts"] + hit["dur"] for hit in parents)
+
+
+def test_chrome_trace(tmp_path):
+    path = tmp_path / "session.json"
+    with ChromeTraceWriter(str(path)) as writer:
+        hn1 = get_session(writer, "reader 1")
+        hn2 = get_session(writer, "reader 2")
+        hn1.polling()
+        with hn1.transaction("script"):
+            hn1.send_apdu(APDU)
+            hn1.send_apdu(APDU)
+        hn2.polling()
+
+    events = json.loads(path.read_text())
+    assert len(events) == writer.nb_events
+    assert [hit["args"]["name"] for hit in events if hit["ph"] == "M"] == ["reader 1", "reader 2"]
+    spans = [hit for hit in events if hit["ph"] == "X" and hit["tid"] == 1]
+    by_name = {name: [hit for hit in spans if hit["name"] == name]
+               for name in ("script", "session.polling", "session.send_apdu", "session.send_tpdu", "drv.write")}
+    assert len(by_name["script"]) == 1 and len(by_name["session.send_apdu"]) == 2
+    # Device I/O inside TPDU inside APDU inside the transaction
+    assert all(inside(hit, by_name["script"]) for hit in by_name["session.send_apdu"])
+    assert all(inside(hit, by_name["session.send_apdu"]) for hit in by_name["session.send_tpdu"])
+    assert all(inside(hit, by_name["session.send_tpdu"] + by_name["session.polling"]) for hit in by_name["drv.write"])
+    assert "session.polling" in [hit["name"] for hit in events if hit["tid"] == 2]
+    assert hn1.latency["session.send_apdu"].count == 2
+
+
+def test_chrome_trace_min_duration(tmp_path):
+    path = tmp_path / "session.json"
+    with ChromeTraceWriter(str(path), min_duration=10 ** 12) as writer:
+        hn = get_session(writer, "reader")
+        hn.polling()
+        hn.send_apdu(APDU)
+    names = [hit["name"] for hit in json.loads(path.read_text())]
+    # The polling transaction is too short: only the spans outside of any transaction are kept
+    assert "session.polling" not in names and "drv.write_bits" not in names
+    assert "drv.field_on" in names and "session.send_apdu" in names
+    assert hn.latency["session.polling"].count == 1
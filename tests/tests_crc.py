@@ -0,0 +1,29 @@
+from pynfcreader.tools import utils
+from pynfcreader.tools.crc import CRC_A, CRC_B, CRC_ISO15693
+
+
+def test_crc_vectors():
+    # ISO/IEC 14443-3 Annex B examples
+    assert CRC_A.get(bytes.fromhex("0000")) == bytes.fromhex("A01E")
+    assert CRC_B.get(bytes.fromhex("000000")) == bytes.fromhex("CCC6")
+    assert CRC_B.get(bytes.fromhex("0FAAFF")) == bytes.fromhex("FCD1")
+    # ISO/IEC 15693-3 Annex C example
+    assert CRC_ISO15693.get(bytes.fromhex("01020304")) == bytes.fromhex("9139")
+
+
+def test_crc_stream_and_check():
+    frame = bytes(range(64))
+    crc = CRC_A.stream()
+    view = memoryview(frame)
+    for hit in range(0, 64, 10):
+        crc.update(view[hit:hit + 10])
+    assert crc.get() == CRC_A.get(frame)
+
+    frames = [CRC_B.append(frame[:size]) for size in range(10)]
+    frames.append(frame[:12])
+    assert CRC_B.check_many(frames) == [True] * 10 + [False]
+    assert CRC_B.check(memoryview(frames[5]))
+    assert not CRC_B.check(b"\x00")
+
+    assert utils.crc_iso14443a_append(frame) == frame + CRC_A.get(frame)
+    assert utils.crc_iso14443a_check(utils.crc_iso14443a_append(frame))
@@ -0,0 +1,89 @@
+from pynfcreader.devices.connection import ResponseFramer, SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+
+
+class ChunkedLink:
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def test_framer_split_terminator():
+    framer = ResponseFramer(ChunkedLink([b"nfc on\r\nField", b" is on\r\n", b"\r\n>", b": nfc off"]))
+    assert framer.read_until(FlipperZero.PROMPT) == b"nfc on\r\nField is on\r\n\r\n>: "
+    assert framer.read_until(FlipperZero.PROMPT) == b"nfc off"
+
+
+def test_framer_grow_buffer():
+    framer = ResponseFramer(ChunkedLink([b"A" * 30, b"B" * 30, b"\r\n>: "]), size=8)
+    assert framer.read_until(FlipperZero.PROMPT) == b"A" * 30 + b"B" * 30 + b"\r\n>: "
+
+
+def test_flipper_zero_prompt_framing():
+    stand_in = ScriptedFlipperZero(latency=0, card=lambda data: data[::-1])
+    fz = FlipperZero(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=stand_in))
+    fz.connect()
+    fz.field_on()
+    assert fz.write(bytes.fromhex("0102")) == bytes.fromhex("0201")
+    assert fz.write_bits(b"\x26", 7) == bytes.fromhex("4400")
+
+
+def test_flipper_zero_pipeline():
+    stand_in = ScriptedFlipperZero(latency=0, card=lambda data: data[::-1])
+    fz = FlipperZero(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=stand_in))
+    fz.connect()
+    with fz.pipeline() as pipe:
+        assert pipe.reqa() == 0
+        for hit in range(1, 10):
+            assert pipe.send(bytes([hit, 0xAA])) == hit
+    assert pipe.results == [bytes.fromhex("4400")] + [bytes([0xAA, hit]) for hit in range(1, 10)]
+
+
+def test_flipper_zero_pipeline_flushes():
+    stand_in = ScriptedFlipperZero(latency=0, card=lambda data: data[::-1])
+    fz = FlipperZero(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=stand_in))
+    fz.connect()
+    pipe = fz.pipeline()
+    assert pipe.send(bytes.fromhex("0102")) == 0
+    assert pipe.flush() == [bytes.fromhex("0201")]
+    assert pipe.flush() == []
+    assert pipe.reqa() == 1
+    assert pipe.send(bytes.fromhex("0304")) == 2
+    assert pipe.flush() == [bytes.fromhex("4400"), bytes.fromhex("0403")]
+    assert pipe.results[2] == bytes.fromhex("0403")
+
+
+def test_flipper_zero_binary_framing(tmp_path):
+    recording = str(tmp_path / "binary.csv")
+    stand_in = ScriptedFlipperZero(latency=0, card=lambda data: data[::-1])
+    fz = FlipperZero(debug=False, binary=True, cnx=SerialCnx("stand-in", 115200, cnx=stand_in, recording=recording))
+    fz.connect()
+    assert fz.binary
+    fz.field_on()
+    assert fz.write(bytes.fromhex("0102")) == bytes.fromhex("0201")
+    with fz.pipeline() as pipe:
+        pipe.reqa()
+        pipe.send(bytes.fromhex("0A0B0C"))
+    assert pipe.results == [bytes.fromhex("4400"), bytes.fromhex("0C0B0A")]
+    fz.close()
+
+    fz = FlipperZero("replay", debug=False, binary=True, log=recording)
+    fz.connect()
+    fz.field_on()
+    assert fz.write(bytes.fromhex("0102")) == bytes.fromhex("0201")
+
+
+def test_flipper_zero_binary_fallback():
+    stand_in = ScriptedFlipperZero(latency=0, binary_supported=False)
+    fz = FlipperZero(debug=False, binary=True, cnx=SerialCnx("stand-in", 115200, cnx=stand_in))
+    fz.connect()
+    assert not fz.binary
+    assert fz.write(bytes.fromhex("00A4040000")) == bytes.fromhex("9000")
@@ -0,0 +1,82 @@
+import pytest
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.hydra_nfc import HydraNFC
+from pynfcreader.devices.hydra_nfc_v2 import BbioFrameBuilder, HydraNFCv2
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def get_hydranfc(card=None) -> HydraNFCv2:
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(card)))
+    drv.enter_bbio()
+    return drv
+
+
+def test_frame_builder():
+    frame = BbioFrameBuilder(size=4)
+    frame.add_opcode(BbioFrameBuilder.OPCODE_FIELD_ON)
+    frame.add_transceive(bytes.fromhex("9320"), transmitter_add_crc=False)
+    assert bytes(frame.frame()) == bytes.fromhex("03 05 00 02 9320")
+    frame.clear()
+    frame.add_transceive(b"\xE0\x80")
+    assert bytes(frame.frame()) == bytes.fromhex("05 01 02 E080")
+
+
+def test_single_write_per_frame():
+    drv = get_hydranfc(card=lambda data: data[::-1])
+    stand_in = drv._hydranfc.cnx
+    nb_writes = stand_in.nb_writes
+    drv.field_on()
+    drv.set_mode_iso14443A()
+    assert drv.write_bits(b"\x26", 7) == bytes.fromhex("4400")
+    assert drv.write(bytes.fromhex("0102")) == bytes.fromhex("0201")
+    assert drv.write(bytes(range(200))) == bytes(range(200))[::-1]
+    assert stand_in.nb_writes - nb_writes == 5
+    assert stand_in.firmware.field
+
+
+def test_burst():
+    drv = get_hydranfc(card=lambda data: data[::-1])
+    stand_in = drv._hydranfc.cnx
+    nb_writes = stand_in.nb_writes
+    with drv.burst() as burst:
+        assert burst.field_on() == 0
+        assert burst.set_mode_iso14443A() == 1
+        assert burst.write_bits(b"\x26", 7) == 2
+        assert burst.write(bytes.fromhex("0102")) == 3
+    assert burst.results == [None, None, bytes.fromhex("4400"), bytes.fromhex("0201")]
+    assert stand_in.nb_writes - nb_writes == 1
+
+
+def test_polling_burst():
+    drv = get_hydranfc(card=iso14443a_card)
+    hn = Iso14443ASession(drv=drv)
+    nb_writes = drv._hydranfc.cnx.nb_writes
+    uid, ats = hn.polling_burst()
+    assert uid == bytes.fromhex("0102030404")
+    assert ats == bytes.fromhex("0578807002A0B1")
+    assert drv._hydranfc.cnx.nb_writes - nb_writes == 2
+    assert hn.polling() is None
+
+
+@pytest.mark.parametrize("drv_class", [HydraNFCv2, HydraNFC])
+@pytest.mark.parametrize("suffix", [".csv", ".trace"])
+def test_record_replay(tmp_path, drv_class, suffix):
+    recording = str(tmp_path / f"session{suffix}")
+    stand_in = SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(iso14443a_card), recording=recording,
+                         device=drv_class.DEVICE)
+    hn = Iso14443ASession(drv=drv_class(debug=False, cnx=stand_in), block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU)
+    hn._drv.close()
+
+    hn = Iso14443ASession(drv=drv_class(debug=False, log=recording), block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU)
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import random
+
+import pytest
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import AsyncFlipperZero
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.devices.vicc_simulator import ViccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import AsyncIso14443ASession, Iso14443ASession
+from pynfcreader.sessions.iso15693.iso15693 import Iso15693Session
+from pynfcreader.tools.latency import Histogram, LatencyRecorder
+from tests.async_stand_in import open_stand_in
+from tests.flipper_zero_stand_in import BANNER, FlipperZeroFirmware
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2, iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def test_histogram():
+    random.seed(0)
+    values = [random.randrange(10 ** random.randrange(1, 9)) for _ in range(5000)]
+    histogram = Histogram()
+    for value in values:
+        low, high = Histogram.bucket_bounds(Histogram.bucket(value))
+        assert low <= value <= high
+        assert high - low <= low / 16
+        histogram.record(value)
+    values.sort()
+    assert (histogram.count, histogram.min, histogram.max) == (len(values), values[0], values[-1])
+    for percentile in (50, 90, 99):
+        exact = values[len(values) * percentile // 100 - 1]
+        assert exact <= histogram.percentile(percentile) <= exact * 17 / 16 + 1
+    assert histogram.percentile(100) == values[-1]
+    assert sum(count for _, _, count in histogram.buckets()) == len(values)
+
+    merged = Histogram()
+    merged.merge(histogram)
+    merged.merge(histogram)
+    assert (merged.count, merged.min, merged.mean) == (2 * len(values), values[0], histogram.mean)
+
+
+def test_latency_spans():
+    latency = LatencyRecorder()
+    drv = HydraNFCv2(debug=False, cnx=SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(iso14443a_card)))
+    hn = Iso14443ASession(drv=drv, block_size=120, latency=latency)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU)
+    assert latency["session.send_apdu"].count == 1
+    assert latency["drv.write_bits"].count == latency["drv.field_on"].count == 1
+    write = latency["drv.write"]
+    assert write.count == latency["drv.write.io"].count > latency["session.send_tpdu"].count > 0
+    assert write.total >= latency["drv.write.io"].total
+    assert "drv.write.decode" in latency.stats()
+    assert "session.send_apdu" in latency.summary()
+
+    out = io.StringIO()
+    latency.dump(out)
+    assert out.getvalue().count("session.send_apdu ") == 1
+
+
+
+@pytest.mark.parametrize("response_time", [0.0, 0.001])
+def test_latency_simulators(response_time):
+    latency = LatencyRecorder()
+    hn = Iso15693Session(drv=ViccSimulator(response_time=response_time), latency=latency)
+    hn.connect()
+    hn.field_on()
+    assert hn.inventory()[2:10] == bytes.fromhex("E004010012345678")[::-1]
+    assert latency["session.send_cmd"].count == 1
+
+    hn = Iso14443ASession(drv=PiccSimulator(apdu_handler=lambda apdu: apdu + bytes.fromhex("9000"),
+                                            processing_time=response_time), latency=latency)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert latency["session.send_apdu"].count == 1
+
+
+def test_async_latency_spans():
+    async def run():
+        latency = LatencyRecorder()
+        cnx = await open_stand_in(FlipperZeroFirmware(card=iso14443a_card), BANNER)
+        hn = AsyncIso14443ASession(drv=AsyncFlipperZero(debug=False, cnx=cnx, binary=True), latency=latency)
+        await hn.connect()
+        await hn.field_on()
+        await hn.polling()
+        assert await hn.send_apdu(APDU) == bytes.fromhex(APDU)
+        return latency
+
+    latency = asyncio.run(run())
+    assert latency["session.send_apdu"].count == 1
+    assert latency["drv.write_bits.io"].count == 1
+    assert latency["drv.write.io"].count == latency["drv.write.encode"].count > 1
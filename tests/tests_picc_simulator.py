@@ -0,0 +1,167 @@
+import pytest
+
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.sessions.iso14443.iso14443b import Iso14443BSession
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def echo(apdu: bytes) -> bytes:
+    return apdu + bytes.fromhex("9000")
+
+
+def get_session(session_class=Iso14443ASession, block_size=120, fsd=16, **kwargs):
+    card = PiccSimulator(apdu_handler=echo, **kwargs)
+    # Reader FSD, negotiated at the polling
+    card.max_frame_size = fsd
+    hn = session_class(drv=card, block_size=block_size)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    return hn
+
+
+def test_picc_simulator_type_a():
+    hn = get_session()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    # 15 bytes response chained in 2 blocks (FSD: 16 bytes)
+    assert hn._drv.nb_tpdus == 2
+
+
+def test_picc_simulator_chaining():
+    # Command chained by 16 bytes blocks, response chained according to the FSD (16 bytes)
+    hn = get_session(block_size=16)
+    apdu = bytes(range(100))
+    assert hn.send_apdu(apdu.hex()) == apdu + bytes.fromhex("9000")
+    assert hn._drv.nb_tpdus == 7 + 7
+
+
+def test_picc_simulator_wtx():
+    hn = get_session(wtx=3)
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert hn._drv.nb_tpdus == 2 + 3
+
+
+def test_picc_simulator_type_b():
+    hn = get_session(Iso14443BSession, pupi=bytes.fromhex("11223344"))
+    assert hn.pupi == bytes.fromhex("11223344")
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+
+
+@pytest.mark.parametrize("session_class", [Iso14443ASession, Iso14443BSession])
+def test_picc_simulator_frame_sizes(session_class):
+    # FSC announced in the ATS / ATQB, FSD in the RATS / ATTRIB: I-blocks filled up to the FSC
+    hn = get_session(session_class, block_size=None, fsd=128, fsci=7)
+    assert (hn.fsc, hn.fsd, hn.block_size) == (128, 128, 125)
+    apdu = bytes(range(250))
+    assert hn.send_apdu(apdu.hex()) == apdu + bytes.fromhex("9000")
+    # 2 command blocks, 3 response blocks (2 R(ACK))
+    assert hn._drv.nb_tpdus == 2 + 2
+    assert hn._drv.fsd == 128
+
+
+def test_picc_simulator_fsc():
+    hn = get_session(fsci=0)
+    with pytest.raises(Exception, match="FSC"):
+        hn.send_apdu(bytes(32).hex())
+
+
+class NoisyPiccSimulator(PiccSimulator):
+    """
+    Card whose responses are lost ("timeout") or corrupted ("crc"), or whose commands
+    are lost ("drop"), by write index.
+    """
+
+    def __init__(self, errors, **kwargs):
+        PiccSimulator.__init__(self, **kwargs)
+        self.errors = errors
+        self.nb_writes = 0
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        error = self.errors.get(self.nb_writes)
+        self.nb_writes += 1
+        if error == "drop":
+            return b""
+        resp = PiccSimulator.write(self, data, resp_len, transmitter_add_crc)
+        if error == "timeout":
+            return b""
+        if error == "crc":
+            return resp[:-1] + bytes([resp[-1] ^ 0xFF])
+        return resp
+
+
+def test_picc_simulator_link_errors():
+    # Polling: 4 writes. The response of the first I-block is corrupted, then
+    # the second block of the chained response is lost.
+    card = NoisyPiccSimulator({4: "crc", 6: "timeout"}, apdu_handler=echo)
+    card.max_frame_size = 16
+    hn = Iso14443ASession(drv=card, block_size=120, check_crc=True)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert (hn.nb_crc_errors, hn.nb_timeouts, hn.nb_retries) == (1, 1, 2)
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+
+    card.errors = {card.nb_writes + hit: "crc" for hit in range(3)}
+    with pytest.raises(Exception, match="after 2 retries"):
+        hn.send_apdu(APDU)
+
+
+def test_picc_simulator_lost_iblock():
+    # Polling: 4 writes, then the I-block and the R(ACK) of the first APDU. The
+    # I-block of the second APDU never reaches the card: it answers the R(NAK)
+    # with an R(ACK) of its own block number, and the I-block is sent again.
+    card = NoisyPiccSimulator({6: "drop"}, apdu_handler=echo)
+    card.max_frame_size = 16
+    hn = Iso14443ASession(drv=card, block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert (hn.nb_timeouts, hn.nb_retries) == (1, 2)
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+
+    card.errors = {card.nb_writes + hit: "drop" for hit in range(3)}
+    with pytest.raises(Exception, match="after 2 retries"):
+        hn.send_apdu(APDU)
+
+
+@pytest.mark.parametrize("session_class", [Iso14443ASession, Iso14443BSession])
+def test_picc_simulator_lost_first_iblock(session_class):
+    # The first I-block after the activation never reaches the card: its block
+    # number is 1, so it answers the R(NAK) of block 0 with an R(ACK).
+    card = NoisyPiccSimulator({}, apdu_handler=echo)
+    card.max_frame_size = 16
+    hn = session_class(drv=card, block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    card.errors = {card.nb_writes: "drop"}
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    assert (hn.nb_timeouts, hn.nb_retries) == (1, 2)
+
+
+def test_pps1():
+    hn = get_session()
+    sent = []
+    write = hn._drv.write
+    hn._drv.write = lambda data=b"", **kwargs: sent.append(data) or write(data, **kwargs)
+    hn.send_pps(pps1=True, dri=1, dsi=2)
+    # PPS0: PPS1 present, PPS1: DSI 2, DRI 1
+    assert sent == [bytes.fromhex("D0 11 09")]
+
+
+def test_picc_simulator_r_nak():
+    hn = get_session()
+    card = hn._drv
+    assert hn.send_apdu(APDU) == bytes.fromhex(APDU) + bytes.fromhex("9000")
+    block_nb = card._block_nb
+    last_block = card._last_block
+    # R(NAK) of the current block number: last block sent again
+    assert card.write(bytes([0xB2 | block_nb]), resp_len=16) == last_block
+    # R(NAK) of the other block number: R(ACK), and the last block is kept
+    assert card.write(bytes([0xB2 | block_nb ^ 1]), resp_len=16)[:1] == bytes([0xA2 | block_nb])
+    assert card._last_block == last_block
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.pool import ReaderPool
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+from tests.hydra_nfc_v2_stand_in import iso14443a_card
+
+
+def stand_in_flipper_zero(port, **kwargs):
+    cnx = SerialCnx(port, 115200, cnx=ScriptedFlipperZero(latency=0.001, card=iso14443a_card))
+    return FlipperZero(port, cnx=cnx, **kwargs)
+
+
+def read_card(session):
+    session.polling()
+    return session.send_apdu("00 B0 00 00 02")
+
+
+def failing_job(session):
+    raise Exception("job failure")
+
+
+def check_pool(use_processes):
+    ports = [f"stand-in-{hit}" for hit in range(4)]
+    pool = ReaderPool(stand_in_flipper_zero, Iso14443ASession, ports=ports, drv_kwargs={"debug": False},
+                      use_processes=use_processes)
+    pool.open()
+    results = pool.run([read_card] * 20 + [failing_job])
+    pool.close()
+
+    assert results[:20] == [bytes.fromhex("00B0000002")] * 20
+    assert str(results[20]) == "job failure"
+    assert sorted(pool.stats) == ports
+    assert sum(stats.jobs for stats in pool.stats.values()) == 21
+    assert sum(stats.errors for stats in pool.stats.values()) == 1
+    assert pool.throughput > 0
+
+
+def test_reader_pool_threads():
+    check_pool(use_processes=False)
+
+
+def test_reader_pool_processes():
+    check_pool(use_processes=True)
+
+
+def crashing_job(session):
+    os._exit(1)
+
+
+def test_reader_pool_process_crash():
+    ports = [f"stand-in-{hit}" for hit in range(2)]
+    pool = ReaderPool(stand_in_flipper_zero, Iso14443ASession, ports=ports, drv_kwargs={"debug": False},
+                      use_processes=True)
+    results = pool.run([read_card] * 4 + [crashing_job] + [read_card] * 4)
+
+    assert "process died" in str(results[4])
+    assert results[:4] + results[5:] == [bytes.fromhex("00B0000002")] * 8
+    assert sorted(pool.stats) == ports
+
+
+def test_reader_pool_open_failure():
+    closed = []
+
+    def stand_in(port, **kwargs):
+        if port == "broken":
+            raise Exception("Cannot open the reader")
+        drv = stand_in_flipper_zero(port, **kwargs)
+        drv.close = lambda: closed.append(port)
+        return drv
+
+    pool = ReaderPool(stand_in, Iso14443ASession, ports=["stand-in-0", "broken", "stand-in-1"],
+                      drv_kwargs={"debug": False})
+    with pytest.raises(Exception, match="Cannot open"):
+        pool.open()
+    assert sorted(closed) == ["stand-in-0", "stand-in-1"]
+    assert not pool.sessions
@@ -0,0 +1,39 @@
+import csv
+
+import pytest
+
+from pynfcreader.devices.recording import Recorder
+
+
+def test_recorder_batches(tmp_path):
+    path = tmp_path / "recording.csv"
+    recorder = Recorder(str(path), batch_size=16)
+    for hit in range(1000):
+        recorder.record("W", f"nfc send 1 {hit:04X}\r\n".encode())
+        recorder.record("R", bytearray([hit & 0xFF, 0x90]), binary=True)
+    recorder.close()
+    recorder.close()
+
+    rows = list(csv.reader(path.open(newline="")))
+    assert rows[0] == ["Type", "Data"]
+    assert len(rows) == 2001
+    assert rows[1] == ["W", "nfc send 1 0000\r\n"]
+    assert rows[2000] == ["R", "e790"]
+
+
+def test_recorder_closed(tmp_path):
+    recorder = Recorder(str(tmp_path / "recording.csv"))
+    recorder.close()
+    with pytest.raises(Exception, match="closed"):
+        recorder.record("W", b"nfc\r\n")
+
+
+def test_recorder_thread_error(tmp_path):
+    recorder = Recorder(str(tmp_path / "recording.csv"), batch_size=1)
+    recorder.record("R", b"\xff\xfe")
+    recorder._thread.join(5)
+    assert not recorder._thread.is_alive()
+    with pytest.raises(Exception, match="failed"):
+        recorder.record("W", b"nfc\r\n")
+    with pytest.raises(Exception, match="failed"):
+        recorder.close()
@@ -0,0 +1,24 @@
+from pynfcreader.sessions.iso14443.tpdu import PCB_TABLE, Tpdu
+
+
+def test_tpdu_fields():
+    # I-block, chaining, CID and NAD
+    tpdu = Tpdu(bytes.fromhex("1F0102A0A1A2CCDD"))
+    assert tpdu.i and not tpdu.r and not tpdu.s
+    assert tpdu.is_chaining() and tpdu.block_nb == 1
+    assert (tpdu._cid, tpdu._nad, tpdu._crc) == (0x01, 0x02, bytes.fromhex("CCDD"))
+    assert tpdu.inf == bytes.fromhex("A0A1A2")
+
+    # R(NAK)
+    tpdu = Tpdu(bytearray.fromhex("B3CCDD"))
+    assert tpdu.r and tpdu.ack_nack_bit == 1 and tpdu.block_nb == 1 and tpdu.inf == b""
+
+    # S(WTX) with CID, without copy of the received frame
+    frame = bytearray.fromhex("FA0501CCDD")
+    tpdu = Tpdu(memoryview(frame))
+    assert tpdu.s and tpdu.is_wtx()
+    assert tpdu.get_wtx_reply() == bytes.fromhex("FA0501")
+    frame[2] = 0x02
+    assert bytes(tpdu.inf_view) == b"\x02"
+
+    assert [PCB_TABLE[pcb][0] for pcb in (0x02, 0x42, 0xA2, 0xC2)] == ["I", None, "R", "S"]
@@ -0,0 +1,184 @@
+import csv
+import os
+
+import pytest
+
+from pynfcreader.devices import trace
+from pynfcreader.devices.connection import ReplayDivergence, SerialCnx, SerialCnxReplay, SerialCnxVirtual
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.recording import Recorder
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+from tests.hydra_nfc_v2_stand_in import iso14443a_card
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def test_trace_write_read(tmp_path):
+    path = tmp_path / "capture.trace"
+    with trace.TraceWriter(path, trace.DEVICE_HYDRA_NFC_V2) as writer:
+        writer.write("M", b"REQA")
+        writer.write("W", bytes.fromhex("0826"), binary=True, timestamp=10)
+        writer.write("R", bytes.fromhex("020400"), binary=True, timestamp=20)
+
+    with trace.TraceReader(path) as reader:
+        records = list(reader)
+    assert [record.direction for record in records] == ["M", "W", "R"]
+    assert records[1] == trace.TraceRecord(10, "W", trace.DEVICE_HYDRA_NFC_V2, True, bytes.fromhex("0826"))
+    assert records[2].data == bytes.fromhex("020400")
+
+
+def test_recorder_trace_and_csv_conversion(tmp_path):
+    path = tmp_path / "capture.trace"
+    recorder = Recorder(str(path), device=trace.DEVICE_FLIPPER_ZERO)
+    recorder.mark("send_reqa")
+    recorder.record("W", b"nfc reqa\r\n")
+    recorder.record("R", b"4400\r\n")
+    recorder.record("R", b"\x81\x02\x00\x44\x00", binary=True)
+    recorder.close()
+
+    with trace.TraceReader(path) as reader:
+        records = list(reader)
+    assert len(records) == 4
+    assert all(record.device == trace.DEVICE_FLIPPER_ZERO for record in records)
+    assert [record.timestamp for record in records] == sorted(record.timestamp for record in records)
+
+    trace.trace_to_csv(path, tmp_path / "capture.csv")
+    rows = list(csv.reader((tmp_path / "capture.csv").open(newline="")))
+    assert rows == [["Type", "Data"], ["W", "nfc reqa\r\n"], ["R", "4400\r\n"], ["R", "8102004400"]]
+
+    trace.csv_to_trace(tmp_path / "capture.csv", tmp_path / "back.trace", trace.DEVICE_FLIPPER_ZERO)
+    with trace.TraceReader(tmp_path / "back.trace") as reader:
+        assert [record.data for record in reader] == [b"nfc reqa\r\n", b"4400\r\n", b"8102004400"]
+
+
+def test_mapped_trace_replay(tmp_path):
+    recording = str(tmp_path / "session.trace")
+    stand_in = ScriptedFlipperZero(latency=0, card=lambda data: data[::-1])
+    fz = FlipperZero(debug=False, binary=True, cnx=SerialCnx("stand-in", 115200, cnx=stand_in, recording=recording))
+    fz.connect()
+    fz.field_on()
+    for hit in range(10):
+        fz.cnx.mark(f"hit {hit}")
+        assert fz.write(bytes([hit, 0xAA])) == bytes([0xAA, hit])
+    fz.close()
+
+    fz = FlipperZero("replay", debug=False, binary=True, log=recording)
+    fz.connect()
+    fz.field_on()
+    assert fz.write(bytes([0, 0xAA])) == bytes([0xAA, 0])
+    fz.close()
+    assert (tmp_path / "session.trace.idx").exists()
+
+    capture = trace.MappedTrace(recording)
+    first = SerialCnxReplay(capture, start=capture.find_marker("hit 7"))
+    second = first.cursor()
+    second.seek_marker("hit 9")
+    fz = FlipperZero("replay", debug=False, cnx=first)
+    fz.binary = True
+    assert fz.write(bytes([7, 0xAA])) == bytes([0xAA, 7])
+    fz.cnx = second
+    assert fz.write(bytes([9, 0xAA])) == bytes([0xAA, 9])
+    assert first.tell() < second.tell() == len(capture)
+    capture.close()
+
+
+def test_mapped_trace_stale_index(tmp_path):
+    path = tmp_path / "capture.trace"
+
+    def record(lengths, mtime_ns):
+        with trace.TraceWriter(path) as writer:
+            for length in lengths:
+                writer.write("R", bytes(length), timestamp=0)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        capture = trace.MappedTrace(path)
+        records = [len(capture[hit].data) for hit in range(len(capture))]
+        capture.close()
+        return records
+
+    assert record([1, 2, 3], 10 ** 18) == [1, 2, 3]
+    # Trace recorded again: same size, other records
+    assert record([2, 2, 2], 10 ** 18) == [2, 2, 2]
+    assert record([3, 2, 1], 2 * 10 ** 18) == [3, 2, 1]
+    assert record([3, 2, 1], 2 * 10 ** 18) == [3, 2, 1]
+
+
+def run_session(drv, apdu):
+    hn = Iso14443ASession(drv=drv, block_size=120)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    return hn.send_apdu(apdu)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".trace"])
+def test_strict_replay(tmp_path, suffix):
+    recording = str(tmp_path / f"session{suffix}")
+    stand_in = ScriptedFlipperZero(latency=0, card=iso14443a_card)
+    drv = FlipperZero(debug=False, binary=True, cnx=SerialCnx("stand-in", 115200, cnx=stand_in, recording=recording))
+    assert run_session(drv, APDU) == bytes.fromhex(APDU)
+    drv.close()
+
+    def replay(strict=True, collect=False):
+        if suffix == ".trace":
+            return SerialCnxReplay(recording, strict=strict, collect=collect)
+        return SerialCnxVirtual(recording, strict=strict, collect=collect)
+
+    assert run_session(FlipperZero("replay", debug=False, binary=True, cnx=replay()), APDU) == bytes.fromhex(APDU)
+
+    with pytest.raises(ReplayDivergence) as divergence:
+        run_session(FlipperZero("replay", debug=False, binary=True, cnx=replay()), APDU.replace("A4", "B0"))
+    assert divergence.value.actual[-2:] == divergence.value.expected[-2:]
+    assert divergence.value.actual != divergence.value.expected
+    assert "exchange" in str(divergence.value)
+
+    cnx = replay(collect=True)
+    run_session(FlipperZero("replay", debug=False, binary=True, cnx=cnx), APDU.replace("A4", "B0"))
+    assert len(cnx.divergences) == 1
+
+
+def test_replay_line_csv(tmp_path):
+    # Recording made before the prompt framing: one R row per line, responses ended by an empty row
+    rows = [["Type", "Data"], ["R", "Firmware version: 0.98\r\n"], ["R", "\r\n"],
+            ["W", "nfc on\r\n"], ["R", "nfc on\r\n"], ["R", "\r\n"], ["R", ">: "], ["R", ""],
+            ["W", "nfc send 1 0102\r\n"], ["R", "nfc send 1 0102\r\n"], ["R", "0201\r\n"], ["R", "\r\n"],
+            ["R", ">: "], ["R", ""],
+            ["W", "nfc send 1 0304\r\n"], ["R", "nfc send 1 0304\r\n"], ["R", "0403\r\n"], ["R", "\r\n"],
+            ["R", ">: "], ["R", ""]]
+    with (tmp_path / "session.csv").open("w", newline="") as file:
+        csv.writer(file).writerows(rows)
+
+    fz = FlipperZero("replay", debug=False, cnx=SerialCnxVirtual(str(tmp_path / "session.csv"), strict=True))
+    fz.connect()
+    fz.field_on()
+    assert fz.write(bytes.fromhex("0102")) == bytes.fromhex("0201")
+    assert fz.write(bytes.fromhex("0304")) == bytes.fromhex("0403")
+
+
+def test_timed_replay(tmp_path):
+    path = tmp_path / "timed.trace"
+    with trace.TraceWriter(path) as writer:
+        for hit in range(4):
+            writer.write("W", b"nfc reqa\r\n", timestamp=hit * 60_000_000)
+            writer.write("R", b"4400\r\n", timestamp=hit * 60_000_000 + 50_000_000)
+
+    def replay(**kwargs):
+        # Simulated clock, only moved by the requested delays
+        now = [0.0]
+        delays = []
+
+        def sleep(delay):
+            delays.append(delay)
+            now[0] += delay
+
+        cnx = SerialCnxReplay(path, clock=lambda: now[0], sleep=sleep, **kwargs)
+        for _ in range(4):
+            cnx.write(b"nfc reqa\r\n")
+            assert cnx.readline() == b"4400\r\n"
+        cnx.close()
+        return delays
+
+    assert replay(speed=1) == pytest.approx([0.05] * 4)
+    assert replay(speed=10) == pytest.approx([0.005] * 4)
+    assert replay() == []
+    assert replay(card_delay=0.01) == pytest.approx([0.01] * 4)
@@ -0,0 +1,110 @@
+import pytest
+
+from pynfcreader.devices import trace
+from pynfcreader.devices.connection import SerialCnx
+from pynfcreader.devices.flipper_zero import FlipperZero
+from pynfcreader.devices.hydra_nfc_v2 import HydraNFCv2
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.tools.trace_decoder import read_apdus, read_frames, read_tpdus
+from tests.flipper_zero_stand_in import ScriptedFlipperZero
+from tests.hydra_nfc_v2_stand_in import ScriptedHydraNFCv2
+
+APDUS = [bytes.fromhex("00A4040007A0000000041010"), bytes(range(40))]
+
+
+def get_card(**kwargs):
+    card = PiccSimulator(apdu_handler=lambda apdu: apdu[::-1] + bytes.fromhex("9000"), **kwargs)
+    card.field_on()
+    card.write_bits(b"\x26", 7)
+    return card
+
+
+def record_session(recording: str, reader: str, card) -> list:
+    if reader == "hydranfc":
+        stand_in = SerialCnx("stand-in", 115200, cnx=ScriptedHydraNFCv2(card.write), recording=recording,
+                             device=trace.DEVICE_HYDRA_NFC_V2)
+        drv = HydraNFCv2(debug=False, cnx=stand_in)
+    else:
+        stand_in = SerialCnx("stand-in", 115200, cnx=ScriptedFlipperZero(latency=0, card=card.write),
+                             recording=recording, device=trace.DEVICE_FLIPPER_ZERO)
+        drv = FlipperZero(debug=False, cnx=stand_in, binary=reader == "flipper_binary")
+    drv.max_frame_size = 16
+    hn = Iso14443ASession(drv=drv, block_size=16, check_crc=True)
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    rapdus = [hn.send_apdu(apdu.hex()) for apdu in APDUS]
+    hn.field_off()
+    drv.close()
+    return rapdus
+
+
+@pytest.mark.parametrize("reader", ["hydranfc", "flipper_text", "flipper_binary"])
+@pytest.mark.parametrize("suffix", [".csv", ".trace"])
+def test_decode_apdus(tmp_path, reader, suffix):
+    recording = str(tmp_path / f"session{suffix}")
+    rapdus = record_session(recording, reader, get_card(wtx=1))
+    device = trace.DEVICE_HYDRA_NFC_V2 if reader == "hydranfc" else trace.DEVICE_FLIPPER_ZERO
+
+    kinds = [frame.kind for frame in read_frames(recording, device)]
+    assert kinds[0] == "mode" and kinds[-1] == "field_off"
+    assert kinds.count("bits") == 1
+
+    exchanges = list(read_apdus(recording, device))
+    assert [exchange.capdu for exchange in exchanges] == APDUS
+    assert [exchange.rapdu for exchange in exchanges] == rapdus
+    # 40 bytes: 3 chained command blocks, 4 response blocks (FSD: 16 bytes), WTX once
+    assert exchanges[1][4:] == (3 + 3 + 1, 1, 3, 0)
+
+
+def test_decode_retransmissions(tmp_path):
+    recording = str(tmp_path / "session.trace")
+    card = get_card()
+    write = card.write
+    nb_writes = [0]
+
+    def noisy_write(data):
+        nb_writes[0] += 1
+        resp = write(data)
+        # Corrupted response of the first I-block of the first APDU, lost response of the next block
+        return {5: resp[:-1] + b"\x00", 7: b""}.get(nb_writes[0], resp)
+
+    card.write = noisy_write
+    rapdus = record_session(recording, "hydranfc", card)
+    exchanges = list(read_apdus(recording))
+    assert [exchange.rapdu for exchange in exchanges] == rapdus
+    assert exchanges[0].nb_retransmissions == 2
+    assert sum(not exchange.valid for exchange in read_tpdus(recording)) == 2
+
+
+def test_trace_analytics(tmp_path):
+    trace_analytics = pytest.importorskip("pynfcreader.tools.trace_analytics")
+    paths = []
+    for hit in range(2):
+        paths.append(str(tmp_path / f"session_{hit}.trace"))
+        record_session(paths[-1], "hydranfc", get_card(wtx=1))
+    paths.append(str(tmp_path / "session.csv"))
+    record_session(paths[-1], "flipper_text", get_card())
+
+    stats = trace_analytics.analyse(paths[:2], processes=2)
+    assert stats["nb_apdus"] == 4
+    assert stats["commands"]["REQA"]["count"] == 2
+    assert stats["commands"]["RATS"]["count"] == 2
+    assert stats["apdus"]["APDU INS A4"]["count"] == 2
+    assert stats["chaining_depth"]["max"] == 3 + 3
+    assert stats["retry_rate"] == 0
+    assert "APDU INS A4" in trace_analytics.summary(stats)
+
+    # Capture of another machine: its clock is far from the first one
+    shifted = str(tmp_path / "shifted.trace")
+    with trace.TraceReader(paths[1]) as reader, trace.TraceWriter(shifted) as writer:
+        for record in reader:
+            writer.write_record(record._replace(timestamp=record.timestamp + 10 ** 18))
+    stats = trace_analytics.analyse([paths[0], shifted], processes=1)
+    assert [counts.sum() for counts in stats["throughput"]] == [2, 2]
+    assert max(len(counts) for counts in stats["throughput"]) < 10
+    assert stats["throughput_peak"] == 2
+
+    stats = trace_analytics.analyse(paths[2], device=trace.DEVICE_FLIPPER_ZERO, processes=1)
+    assert stats["nb_apdus"] == 2 and stats["apdus"]["APDU INS 01"]["p99"] == 0
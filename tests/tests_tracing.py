@@ -0,0 +1,95 @@
+import logging
+
+from pynfcreader.devices.picc_simulator import PiccSimulator
+from pynfcreader.devices.vicc_simulator import ViccSimulator
+from pynfcreader.sessions.iso14443.iso14443a import Iso14443ASession
+from pynfcreader.sessions.iso15693.iso15693 import Iso15693Session
+from pynfcreader.tools.tracing import (ApduReceived, ApduSent, Comment, FrameReceived, FrameSent, LoggingSink,
+                                       RequestSent, ResponseReceived, Tracer, get_logger)
+
+APDU = "00 A4 04 00 07 A0 00 00 00 04 10 10 00"
+
+
+def test_tracing_events():
+    events = []
+    card = PiccSimulator(apdu_handler=lambda apdu: apdu + bytes.fromhex("9000"))
+    card.max_frame_size = 16
+    hn = Iso14443ASession(drv=card, block_size=120, tracer=Tracer(events.append))
+    hn.connect()
+    hn.field_on()
+    hn.polling()
+    del events[:]
+
+    rapdu = hn.send_apdu(APDU)
+    # Response chained in 2 blocks (FSD: 16 bytes)
+    assert [type(hit) for hit in events] == [ApduSent, FrameSent, FrameReceived, FrameSent, FrameReceived,
+                                             ApduReceived]
+    assert events[0].data == bytes.fromhex(APDU)
+    assert events[1].data[1:] == bytes.fromhex(APDU)
+    assert events[-1].data == rapdu
+    assert events[-1].duration == events[-1].timestamp - events[0].timestamp >= 0
+
+    hn.tracer.unsubscribe(events.append)
+    assert not hn.tracer.enabled
+    hn.send_apdu(APDU)
+    assert len(events) == 6
+
+
+def test_tracing_iso15693_events():
+    events = []
+    tag = ViccSimulator()
+    hn = Iso15693Session(drv=tag, tracer=Tracer(events.append))
+    hn.connect()
+    hn.field_on()
+    uid = hn.inventory()[2:][::-1]
+    assert [type(hit) for hit in events] == [RequestSent, ResponseReceived]
+    assert events[1].request.resp["uid"]["raw"][::-1] == uid
+    hn.stay_quiet(uid=uid[::-1])
+    assert type(events[-1]) is RequestSent
+
+
+def test_logging_sink(caplog):
+    logger = logging.getLogger("pynfcreader.tests")
+    sink = LoggingSink(logger)
+    with caplog.at_level(logging.WARNING, logger.name):
+        sink(Comment(0, "Data:", b"\x01\x02"))
+    assert not caplog.records
+    with caplog.at_level(logging.INFO, logger.name):
+        sink(Comment(0, "Data:", b"\x01\x02"))
+        sink(FrameSent(0, b"\x02\x00"))
+    assert caplog.records[0].getMessage() == "Data:"
+    assert "TPDU command:" in caplog.records[2].getMessage()
+
+
+def test_get_logger_single_handler():
+    logger = logging.getLogger()
+    handlers, level = list(logger.handlers), logger.level
+    try:
+        logger.handlers = []
+        logger.setLevel(logging.WARNING)
+        get_logger()
+        assert logger.level == logging.INFO
+        get_logger(debug=True)
+        PiccSimulator()
+        assert len([hit for hit in logger.handlers if getattr(hit, "pynfcreader", False)]) == 1
+        # The next drivers do not reset the debug level
+        assert logger.level == logging.DEBUG
+    finally:
+        logger.handlers = handlers
+        logger.setLevel(level)
+
+
+def test_get_logger_configured_level():
+    logger = logging.getLogger()
+    handlers, level = list(logger.handlers), logger.level
+    try:
+        logger.handlers = [logging.NullHandler()]
+        logger.setLevel(logging.WARNING)
+        get_logger()
+        assert logger.level == logging.WARNING
+        logger.setLevel(logging.DEBUG)
+        get_logger()
+        assert logger.level == logging.DEBUG
+    finally:
+        logger.handlers = handlers
+        logger.setLevel(level)
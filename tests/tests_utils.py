@@ -0,0 +1,33 @@
+import io
+
+from pynfcreader.tools import utils
+
+
+def test_pretty_print_block():
+    data = bytes.fromhex("00A4040007A0000000041010") + b"Hello, world!\x7f"
+    assert utils.get_pretty_print_block(data) == [
+        "00 A4 04 00 07 A0 00 00   00 04 10 10 48 65 6C 6C      ........   ....Hell",
+        "6F 2C 20 77 6F 72 6C 64   21 7F                        o, world   !.",
+    ]
+    assert utils.get_pretty_print_block(b"\x01") == ["01   " + " " * 44 + "      .   "]
+    assert utils.get_pretty_print_block(b"") == []
+    assert utils.get_pretty_print_block([0x52]) == utils.get_pretty_print_block(b"\x52")
+
+
+def test_pretty_print_block_stream():
+    # Across the chunks of the generator
+    data = bytes(range(256)) * 20
+    lines = utils.get_pretty_print_block(data)
+    assert len(lines) == len(data) // 16
+    assert lines[256] == lines[0]
+    assert list(utils.iter_pretty_print_block(data, "\t")) == ["\t" + hit for hit in lines]
+
+    out = io.StringIO()
+    utils.write_pretty_print_block(out, data, nb_lines=100)
+    assert out.getvalue() == "".join(hit + "\n" for hit in lines)
+
+
+def test_hex_str():
+    assert utils.bytes_to_str(b"\x01\xab") == "01 AB"
+    assert utils.int_array_to_hex_str([1, 0xAB]) == "01 AB"
+    assert utils.bytes_to_ascii_printable_str(b"ab\x00\xff") == "ab.."
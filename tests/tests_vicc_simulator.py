@@ -0,0 +1,96 @@
+import pytest
+
+from pynfcreader.devices.vicc_simulator import Vicc, ViccSimulator
+from pynfcreader.sessions.iso15693.iso15693 import Iso15693Session
+from pynfcreader.tools.crc import CRC_ISO15693
+
+UID = bytes.fromhex("E004010012345678")
+
+
+def get_session(tags) -> Iso15693Session:
+    hn = Iso15693Session(drv=ViccSimulator(tags))
+    hn.connect()
+    hn.field_on()
+    return hn
+
+
+def test_vicc_get_all_auto():
+    memory = bytes(range(16))
+    hn = get_session([Vicc(UID, nb_blocks=4, block_size=4, memory=memory, locked=[1])])
+    hn.get_all_auto()
+    assert hn.last_request.resp["data"]["raw"] == memory[12:]
+    assert [hn._memory_block[hit] for hit in range(4)] == [memory[hit:hit + 4] for hit in range(0, 16, 4)]
+    assert [hn._lock_status[hit] for hit in range(4)] == [b"\x00", b"\x01", b"\x00", b"\x00"]
+
+
+def test_vicc_read_write():
+    tag = Vicc(UID, nb_blocks=8, block_size=4, locked=[3])
+    hn = get_session([tag, Vicc(bytes.fromhex("E004010087654321"))])
+    uid = UID[::-1]
+
+    assert hn.write_single_block(flags=b"\x22", uid_opt=uid, block_nb=b"\x02", data=b"ABCD") == b"\x00"
+    assert hn.write_single_block(flags=b"\x22", uid_opt=uid, block_nb=b"\x03", data=b"ABCD") == b"\x01\x12"
+    assert hn.write_multiple_block(flags=b"\x22", uid_opt=uid, first_block_nb=b"\x04", nb_blocks=b"\x01",
+                                   data=b"EFGHIJKL") == b"\x00"
+    assert hn.read_multiple_blocks(flags=b"\x22", uid_opt=uid, first_block_nb=b"\x02",
+                                   nb_blocks=b"\x02") == b"\x00ABCD" + bytes(4) + b"EFGH"
+    assert hn.get_multiple_blocks_security_status(flags=b"\x22", uid_opt=uid, first_block_nb=b"\x02",
+                                                  nb_blocks=b"\x02") == b"\x00\x00\x01\x00"
+
+    # Both tags answer a non addressed request
+    assert hn.read_single_block(block_nb=b"\x02") == b""
+    assert hn._drv.collision
+    hn.select(uid=uid)
+    assert hn.read_single_block(flags=b"\x52", block_nb=b"\x05") == b"\x00\x00IJKL"
+    hn.stay_quiet(uid=bytes.fromhex("E004010087654321")[::-1])
+    assert hn.read_single_block(block_nb=b"\x04") == b"\x00\x00EFGH"
+    hn.reset_to_ready(flags=b"\x22", uid_opt=bytes.fromhex("E004010087654321")[::-1])
+    assert hn.read_single_block(block_nb=b"\x04") == b""
+
+
+def test_vicc_inventory_all():
+    uids = [bytes.fromhex(f"E0040100{hit * 0x01010101:08X}") for hit in range(64)]
+    hn = get_session([Vicc(uid) for uid in uids])
+    assert sorted(hn.inventory_all()) == sorted(uids)
+    assert hn._drv.nb_collisions > 0
+
+
+class NoisyViccSimulator(ViccSimulator):
+    """
+    Reader returning the responses with their CRC, lost ("timeout") or corrupted ("crc") by request index.
+    """
+
+    def __init__(self, tags, errors):
+        ViccSimulator.__init__(self, tags)
+        self.errors = errors
+
+    def write(self, data=b"", resp_len=None, transmitter_add_crc=True):
+        resp = ViccSimulator.write(self, data, resp_len, transmitter_add_crc)
+        error = self.errors.get(self.nb_requests - 1)
+        if error == "timeout" or not resp:
+            return b""
+        resp = CRC_ISO15693.append(resp)
+        if error == "crc":
+            return resp[:-1] + bytes([resp[-1] ^ 0xFF])
+        return resp
+
+
+def test_vicc_link_errors():
+    memory = bytes(range(16))
+    drv = NoisyViccSimulator([Vicc(UID, nb_blocks=4, block_size=4, memory=memory)], {2: "crc", 3: "timeout"})
+    hn = Iso15693Session(drv=drv, check_crc=True, retries=2)
+    hn.connect()
+    hn.field_on()
+    assert hn.inventory() == b"\x00\x00" + UID[::-1]
+    assert hn.read_single_block(flags=b"\x02", block_nb=b"\x01") == b"\x00" + memory[4:8]
+    assert hn.read_single_block(flags=b"\x02", block_nb=b"\x02") == b"\x00" + memory[8:12]
+    assert (hn.nb_crc_errors, hn.nb_timeouts, hn.nb_retries) == (1, 1, 2)
+
+    drv.errors = {drv.nb_requests + hit: "timeout" for hit in range(3)}
+    with pytest.raises(Exception, match="after 2 retries"):
+        hn.read_single_block(flags=b"\x02", block_nb=b"\x03")
+    assert hn.nb_timeouts == 4
+
+    # Silent slots of a 16 slots inventory are not errors
+    drv.errors = {}
+    assert hn.inventory_all() == [UID]